@@ -75,6 +75,7 @@ INSTALLED_APPS = [
     'notifications',
     'analytics',
     'gamification',
+    'jobs',
 ]
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
@@ -99,6 +100,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'recommendations.middleware.TrackingBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'StudyGroupFinder.urls'
@@ -113,6 +115,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'groups.context_processors.membership',
             ],
         },
     },
@@ -147,6 +150,67 @@ else:
         }
     }
 
+# ------------------------------------------------------------------
+# Group search
+# ------------------------------------------------------------------
+# 'postgres', 'sqlite_fts' or 'tokens'; 'auto' picks the best one the database supports
+GROUP_SEARCH_BACKEND = os.getenv('GROUP_SEARCH_BACKEND', 'auto')
+# Groups per browse page / infinite-scroll request
+GROUP_BROWSE_PAGE_SIZE = int(os.getenv('GROUP_BROWSE_PAGE_SIZE', '24'))
+# Relevance-ordered results page by offset, so they stop after this many matches
+GROUP_SEARCH_MAX_RESULTS = int(os.getenv('GROUP_SEARCH_MAX_RESULTS', '500'))
+# Seconds browse facet counts stay cached (group and membership changes invalidate them sooner)
+GROUP_FACET_CACHE_TTL = int(os.getenv('GROUP_FACET_CACHE_TTL', '300'))
+# Course codes listed in the course facet, most groups first
+GROUP_FACET_COURSE_LIMIT = int(os.getenv('GROUP_FACET_COURSE_LIMIT', '20'))
+# Pending join requests per creator inbox page
+GROUP_INBOX_PAGE_SIZE = int(os.getenv('GROUP_INBOX_PAGE_SIZE', '25'))
+
+# ------------------------------------------------------------------
+# Study sessions
+# ------------------------------------------------------------------
+# Days ahead that recurring series have their sessions generated (extend_session_series moves the window)
+SESSION_SERIES_WINDOW_DAYS = int(os.getenv('SESSION_SERIES_WINDOW_DAYS', '28'))
+# Days of past sessions kept in .ics calendar feeds
+CALENDAR_FEED_PAST_DAYS = int(os.getenv('CALENDAR_FEED_PAST_DAYS', '30'))
+# Seconds calendar clients may reuse a feed before revalidating it
+CALENDAR_FEED_MAX_AGE = int(os.getenv('CALENDAR_FEED_MAX_AGE', '300'))
+
+# ------------------------------------------------------------------
+# Background jobs (run by `python manage.py run_jobs`)
+# ------------------------------------------------------------------
+# Run each job right after the request that queued it commits, for hosts with no worker (on by default on Vercel)
+JOBS_RUN_INLINE = os.getenv('JOBS_RUN_INLINE', 'True' if os.getenv('VERCEL') else 'False') == 'True'
+# Attempts before a job is marked failed; retries back off from JOB_RETRY_BACKOFF seconds, doubling
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BACKOFF = int(os.getenv('JOB_RETRY_BACKOFF', '30'))
+# Seconds before a job claimed by a worker that stopped responding is retried
+JOB_LOCK_TIMEOUT = int(os.getenv('JOB_LOCK_TIMEOUT', '600'))
+# Seconds the worker sleeps when nothing is due
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+# Days finished jobs are kept
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', '7'))
+
+# ------------------------------------------------------------------
+# Recommendations
+# ------------------------------------------------------------------
+# 'batch' scores with aggregate queries, 'vectorized' with a cached NumPy matrix (batch if NumPy is missing)
+RECOMMENDATION_ENGINE = os.getenv('RECOMMENDATION_ENGINE', 'batch')
+# Seconds before the vectorized engine reloads its group feature matrix
+RECOMMENDATION_MATRIX_TTL = int(os.getenv('RECOMMENDATION_MATRIX_TTL', '300'))
+# Seconds before a user's cached recommendations are rebuilt even if nothing marked them dirty
+RECOMMENDATION_CACHE_TTL = int(os.getenv('RECOMMENDATION_CACHE_TTL', '86400'))
+# Seconds the dashboard serves cached recommendations before revalidating them in the background
+RECOMMENDATION_REVALIDATE_AFTER = int(os.getenv('RECOMMENDATION_REVALIDATE_AFTER', '3600'))
+# Recompute on the run_jobs worker; 'False' recomputes inline after the response data is read
+RECOMMENDATION_BACKGROUND_REFRESH = os.getenv('RECOMMENDATION_BACKGROUND_REFRESH', 'True') == 'True'
+# Buffer GroupView/SearchHistory writes until the end of the request; 'False' writes every row immediately
+RECOMMENDATION_TRACKING_BUFFER = os.getenv('RECOMMENDATION_TRACKING_BUFFER', 'True') == 'True'
+# Seconds during which repeated views of a group / identical searches by a user are coalesced
+RECOMMENDATION_TRACKING_WINDOW = int(os.getenv('RECOMMENDATION_TRACKING_WINDOW', '300'))
+# Days raw GroupView/SearchHistory rows are kept once compact_tracking has rolled them up
+RECOMMENDATION_TRACKING_RETENTION_DAYS = int(os.getenv('RECOMMENDATION_TRACKING_RETENTION_DAYS', '90'))
+
 # ------------------------------------------------------------------
 # Password Validation
 # ------------------------------------------------------------------
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from groups.schedule import DAY_NAMES, EMPTY_SCHEDULE, availability_schedule, schedule_window
 from .models import UserProfile
 
 class UserRegistrationForm(UserCreationForm):
@@ -80,7 +81,31 @@ class UserLoginForm(AuthenticationForm):
 class UserProfileForm(forms.ModelForm):
     """
     Form for editing user profile information
+    Weekly availability is entered as days plus a from/until window
+    and stored as the profile's schedule bitmask
     """
+    available_days = forms.MultipleChoiceField(
+        choices=[(str(index), name.title()) for index, name in enumerate(DAY_NAMES)],
+        required=False,
+        widget=forms.CheckboxSelectMultiple(attrs={
+            'class': 'form-check-input'
+        })
+    )
+    available_from = forms.TimeField(
+        required=False,
+        widget=forms.TimeInput(attrs={
+            'class': 'form-control',
+            'type': 'time'
+        })
+    )
+    available_until = forms.TimeField(
+        required=False,
+        widget=forms.TimeInput(attrs={
+            'class': 'form-control',
+            'type': 'time'
+        })
+    )
+    
     class Meta:
         model = UserProfile
         fields = ['university', 'department', 'semester', 'year', 'phone', 'bio', 'profile_picture']
@@ -113,6 +138,34 @@ class UserProfileForm(forms.ModelForm):
                 'accept': 'image/*'
             })
         }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        days, start, end = schedule_window(self.instance.schedule)
+        self.initial.setdefault('available_days', [str(day) for day in days])
+        self.initial.setdefault('available_from', start)
+        self.initial.setdefault('available_until', end)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        days = cleaned_data.get('available_days')
+        start = cleaned_data.get('available_from')
+        end = cleaned_data.get('available_until')
+        if days and not (start and end):
+            raise forms.ValidationError("Enter the times you are available on the selected days.")
+        if days and start >= end:
+            raise forms.ValidationError("Availability must end after it starts.")
+        return cleaned_data
+    
+    def save(self, commit=True):
+        days = [int(day) for day in self.cleaned_data.get('available_days', [])]
+        if days:
+            self.instance.schedule = availability_schedule(
+                days, self.cleaned_data['available_from'], self.cleaned_data['available_until']
+            )
+        else:
+            self.instance.schedule = EMPTY_SCHEDULE
+        return super().save(commit)
 
 
 class UserUpdateForm(forms.ModelForm):
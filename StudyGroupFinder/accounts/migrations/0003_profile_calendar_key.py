@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:17
+
+import accounts.models
+from django.db import migrations, models
+
+
+def issue_calendar_keys(apps, schema_editor):
+    # AddField gives every existing row the same default; each profile needs its own key
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    for pk in UserProfile.objects.values_list('pk', flat=True).iterator():
+        UserProfile.objects.filter(pk=pk).update(calendar_key=accounts.models.new_calendar_key())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_profile_availability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='calendar_key',
+            field=models.CharField(default=accounts.models.new_calendar_key, editable=False, max_length=32),
+        ),
+        migrations.RunPython(issue_calendar_keys, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,22 @@
+import secrets
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from groups.schedule import WeeklySchedule
+
+
+def new_calendar_key():
+    """Random per-user key; rotating it revokes every calendar feed link"""
+    return secrets.token_hex(16)
 
-class UserProfile(models.Model):
+
+class UserProfile(WeeklySchedule):
     """
     Extended user profile for students with academic information.
     Automatically created when a User is registered.
+    The inherited weekly schedule holds the student's availability.
     """
     SEMESTER_CHOICES = [
         ('1', '1st Semester'),
@@ -38,6 +48,8 @@ class UserProfile(models.Model):
     )
     bio = models.TextField(max_length=500, blank=True, help_text="Brief description about yourself")
     phone = models.CharField(max_length=15, blank=True)
+    # Signs the user's calendar feed links; replacing it revokes every link they have shared
+    calendar_key = models.CharField(max_length=32, default=new_calendar_key, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -64,7 +76,9 @@ def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
 
+
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Save the UserProfile whenever User is saved"""
-    instance.profile.save()
\ No newline at end of file
+def save_user_profile(sender, instance, update_fields=None, **kwargs):
+    """Save the UserProfile whenever User is saved, except partial saves such as the login timestamp"""
+    if update_fields is None:
+        instance.profile.save()
\ No newline at end of file
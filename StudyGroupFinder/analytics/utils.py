@@ -1,4 +1,4 @@
-from django.db.models import Count, Q, Avg
+from django.db.models import Count, Q, Avg, Sum
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import GroupAnalytics, MemberActivity, SessionAttendanceLog
@@ -9,7 +9,7 @@ def calculate_group_analytics(group):
     analytics, created = GroupAnalytics.objects.get_or_create(group=group)
     
     # Member statistics
-    analytics.total_members = group.members.count()
+    analytics.total_members = group.member_count
     
     # Calculate member growth rate (last 30 days)
     thirty_days_ago = timezone.now() - timedelta(days=30)
@@ -28,15 +28,10 @@ def calculate_group_analytics(group):
     # Calculate average attendance rate
     completed_sessions = all_sessions.filter(date__lt=timezone.now().date(), is_cancelled=False)
     if completed_sessions.exists():
-        total_possible_attendees = 0
-        total_actual_attendees = 0
-        
-        for session in completed_sessions:
-            total_possible_attendees += group.members.count()
-            total_actual_attendees += SessionRSVP.objects.filter(
-                session=session,
-                status='attending'
-            ).count()
+        # Stored RSVP tallies, so no per-session COUNT
+        totals = completed_sessions.aggregate(sessions=Count('id'), attendees=Sum('attending_total'))
+        total_possible_attendees = totals['sessions'] * group.member_count
+        total_actual_attendees = totals['attendees'] or 0
         
         if total_possible_attendees > 0:
             analytics.average_attendance_rate = (total_actual_attendees / total_possible_attendees) * 100
@@ -111,15 +106,9 @@ def get_attendance_trends(group, weeks=8):
         )
         
         if sessions_in_week.exists():
-            total_attendees = 0
-            total_possible = 0
-            
-            for session in sessions_in_week:
-                total_possible += group.members.count()
-                total_attendees += SessionRSVP.objects.filter(
-                    session=session,
-                    status='attending'
-                ).count()
+            totals = sessions_in_week.aggregate(sessions=Count('id'), attendees=Sum('attending_total'))
+            total_possible = totals['sessions'] * group.member_count
+            total_attendees = totals['attendees'] or 0
             
             attendance_rate = (total_attendees / max(total_possible, 1)) * 100
         else:
@@ -155,7 +144,7 @@ def get_member_growth_data(group, months=6):
     # Add current month
     growth_data.append({
         'month': now.strftime('%b %Y'),
-        'count': group.members.count()
+        'count': group.member_count
     })
     
     return growth_data
@@ -1,3 +1,39 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from groups.models import GroupMember
+from recommendations.tests import LOCAL_STORAGES, make_user, make_group
+from .models import GroupMessage, MessageRead
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class ChatQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.user = make_user('alice')
+        self.group = make_group(make_user('bob'))
+        GroupMember.objects.create(user=self.user, group=self.group)
+        for n in range(8):
+            member = make_user(f'student{n}')
+            GroupMember.objects.create(user=member, group=self.group)
+            GroupMessage.objects.create(group=self.group, sender=member, message=f'Hello {n}')
+        self.client.force_login(self.user)
+
+    def test_group_chat_marks_messages_read_in_one_insert(self):
+        # The same budget however many messages are unread
+        with self.assertNumQueries(8):
+            self.client.get(reverse('chat:group_chat', args=[self.group.pk]))
+
+        self.assertEqual(MessageRead.objects.filter(user=self.user).count(), 8)
+
+    def test_unread_count_query_budget(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('chat:unread_count', args=[self.group.pk]))
+
+        self.assertEqual(response.json(), {'count': 8})
+
+    def test_non_members_see_no_unread_messages(self):
+        self.client.force_login(make_user('mallory'))
+
+        response = self.client.get(reverse('chat:unread_count', args=[self.group.pk]))
+
+        self.assertEqual(response.json(), {'count': 0})
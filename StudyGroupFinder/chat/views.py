@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.db.models import Q
+from groups.membership import get_membership
 from groups.models import StudyGroup
 from .models import GroupMessage, MessageRead
 from .forms import MessageForm
@@ -13,7 +14,7 @@ def group_chat(request, group_id):
     group = get_object_or_404(StudyGroup, pk=group_id)
     
     # Check if user is a member
-    if request.user not in group.members.all():
+    if not get_membership(request).is_member(group):
         messages.error(request, 'You must be a member to access group chat.')
         return redirect('groups:group_detail', pk=group_id)
     
@@ -25,8 +26,10 @@ def group_chat(request, group_id):
         read_by__user=request.user
     ).exclude(sender=request.user)
     
-    for msg in unread_messages:
-        MessageRead.objects.get_or_create(message=msg, user=request.user)
+    MessageRead.objects.bulk_create(
+        [MessageRead(message_id=message_id, user=request.user) for message_id in unread_messages.values_list('pk', flat=True)],
+        ignore_conflicts=True,
+    )
     
     # Handle new message
     if request.method == 'POST':
@@ -81,13 +84,12 @@ def edit_message(request, message_id):
 @login_required
 def get_unread_count(request, group_id):
     """API endpoint to get unread message count"""
-    group = get_object_or_404(StudyGroup, pk=group_id)
-    
-    if request.user not in group.members.all():
+    if not get_membership(request).is_member(group_id):
+        get_object_or_404(StudyGroup, pk=group_id)
         return JsonResponse({'count': 0})
     
     unread_count = GroupMessage.objects.filter(
-        group=group
+        group_id=group_id
     ).exclude(
         read_by__user=request.user
     ).exclude(
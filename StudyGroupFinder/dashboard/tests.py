@@ -1,3 +1,69 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from groups.models import GroupMember
+from jobs.models import Job
+from jobs.queue import run_pending_jobs
+from recommendations.models import RecommendationScore, RecommendationState
+from recommendations.tests import LOCAL_STORAGES, make_user, make_group
+from recommendations.utils import update_recommendation_cache
+
+
+@override_settings(STORAGES=LOCAL_STORAGES, RECOMMENDATION_BACKGROUND_REFRESH=False)
+class DashboardRecommendationsTests(TestCase):
+    def setUp(self):
+        self.user = make_user('alice', department='Mathematics', semester='3', year='2')
+        creator = make_user('bob', semester='1', year='1')
+        self.algebra = make_group(creator, name='Algebra', course_name='Mathematics')
+        self.poetry = make_group(creator, name='Poetry', course_name='Literature', course_code='LIT 101')
+        GroupMember.objects.create(user=make_user('carol', semester='1', year='1'), group=self.poetry)
+        self.client.force_login(self.user)
+
+    def load_dashboard(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.get(reverse('dashboard:dashboard'))
+        return response.context['recommended_groups'], callbacks
+
+    def test_cold_user_gets_popular_groups_then_a_cache(self):
+        groups, callbacks = self.load_dashboard()
+
+        self.assertEqual(groups, [self.poetry, self.algebra])
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNotNone(RecommendationState.objects.get(user=self.user).refreshed_at)
+
+    def test_expired_cache_is_served_then_revalidated(self):
+        update_recommendation_cache(self.user)
+        RecommendationScore.objects.filter(user=self.user, group=self.poetry).update(score=999)
+        RecommendationState.objects.filter(user=self.user).update(refreshed_at=timezone.now() - timedelta(days=1))
+
+        groups, callbacks = self.load_dashboard()
+
+        self.assertEqual(groups, [self.poetry, self.algebra])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(RecommendationScore.objects.get(user=self.user, group=self.poetry).score, 5 + 5)
+
+    def test_fresh_cache_skips_recompute(self):
+        update_recommendation_cache(self.user)
+
+        groups, callbacks = self.load_dashboard()
+
+        self.assertEqual(groups, [self.algebra, self.poetry])
+        self.assertEqual(callbacks, [])
+
+    @override_settings(RECOMMENDATION_BACKGROUND_REFRESH=True)
+    def test_background_refresh_goes_through_the_job_queue(self):
+        update_recommendation_cache(self.user)
+        RecommendationScore.objects.filter(user=self.user, group=self.poetry).update(is_stale=True)
+        self.load_dashboard()
+        RecommendationState.objects.filter(user=self.user).update(is_dirty=True)
+        self.load_dashboard()
+
+        # Both loads coalesce into one pending job, upgraded to a full rebuild
+        job = Job.objects.get()
+        self.assertEqual(job.payload, {'user_id': self.user.pk, 'rebuild': True})
+
+        self.assertEqual(run_pending_jobs(), (1, 0))
+        self.assertFalse(RecommendationState.objects.get(user=self.user).is_dirty)
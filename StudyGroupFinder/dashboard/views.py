@@ -1,8 +1,10 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.urls import reverse
 from datetime import datetime, timedelta
 from django.db.models import Count, Q, F
 from groups.models import StudyGroup
+from user_sessions.calendar import feed_token
 from user_sessions.models import StudySession, SessionRSVP
 
 @login_required
@@ -33,9 +35,9 @@ def dashboard(request):
     ).values_list('session_id', 'status')
     rsvp_dict = dict(user_rsvps)
     
-    # Get recommended groups (using smart recommendations)
-    from recommendations.utils import calculate_recommendations
-    recommendations_data = calculate_recommendations(user, limit=6)
+    # Get recommended groups from the cache, revalidated in the background
+    from recommendations.utils import get_cached_recommendations
+    recommendations_data = get_cached_recommendations(user, limit=6)
     recommended_groups = [rec['group'] for rec in recommendations_data]
     
     # Calculate statistics
@@ -63,6 +65,9 @@ def dashboard(request):
         'total_groups_created': total_groups_created,
         'total_sessions_attended': total_sessions_attended,
         'total_sessions_scheduled': total_sessions_scheduled,
+        'calendar_url': request.build_absolute_uri(
+            reverse('user_sessions:calendar_feed', args=[feed_token(user)])
+        ),
     }
     
     return render(request, 'dashboard/dashboard.html', context)
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Background gamification jobs.
+
+RSVPs only queue an evaluation; streaks, badges and points are worked out
+by the run_jobs worker, or right after the RSVP commits when JOBS_RUN_INLINE
+is set. Events for the same user coalesce into one pending job, which
+evaluates badges and streaks once and adds up the points.
+"""
+from django.contrib.auth.models import User
+from jobs.queue import register, enqueue
+from .utils import update_user_streak, check_and_award_badges, award_points
+
+EVALUATE_USER = 'gamification.evaluate_user'
+
+# Points for RSVPing 'attending'
+ATTENDING_POINTS = 5
+
+
+def _merge_events(pending, new):
+    points = pending.get('session_points', 0) + new.get('session_points', 0)
+    return {**pending, 'session_points': points}
+
+
+@register(EVALUATE_USER, coalesce=_merge_events)
+def evaluate_user(user_id, session_points=0):
+    """Refresh a user's streak and badges and award the points earned since the last run"""
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    update_user_streak(user)
+    check_and_award_badges(user)
+    if session_points:
+        award_points(user, session_points, 'sessions')
+
+
+def queue_attendance(user):
+    """Queue gamification for an 'attending' RSVP"""
+    return enqueue(
+        EVALUATE_USER,
+        {'user_id': user.pk, 'session_points': ATTENDING_POINTS},
+        key=f'{EVALUATE_USER}:{user.pk}',
+    )
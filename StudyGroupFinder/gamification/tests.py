@@ -1,3 +1,40 @@
-from django.test import TestCase
+from datetime import date, time
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from groups.models import GroupMember
+from jobs.models import Job
+from jobs.queue import run_pending_jobs
+from recommendations.tests import LOCAL_STORAGES, make_user, make_group
+from user_sessions.models import StudySession
+from .models import StudyStreak, UserPoints
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class AttendanceJobTests(TestCase):
+    def setUp(self):
+        self.creator = make_user('bob')
+        self.group = make_group(self.creator)
+        self.student = make_user('alice')
+        GroupMember.objects.create(user=self.student, group=self.group)
+        self.sessions = [
+            StudySession.objects.create(
+                group=self.group, title=f'Review {n}', description='', date=date(2030, 1, n + 1),
+                time=time(18, 0), duration=60, location='Library', created_by=self.creator,
+            )
+            for n in range(2)
+        ]
+        self.client.force_login(self.student)
+
+    def test_rsvp_queues_one_coalesced_evaluation(self):
+        for session in self.sessions:
+            self.client.get(reverse('user_sessions:rsvp_session', args=[session.pk, 'attending']))
+
+        self.assertFalse(UserPoints.objects.filter(user=self.student).exists())
+        job = Job.objects.get()
+        self.assertEqual(job.payload, {'user_id': self.student.pk, 'session_points': 10})
+
+        self.assertEqual(run_pending_jobs(), (1, 0))
+        self.assertEqual(UserPoints.objects.get(user=self.student).points_from_sessions, 10)
+        self.assertEqual(StudyStreak.objects.get(user=self.student).total_sessions_attended, 2)
@@ -1,9 +1,9 @@
 from django.contrib import admin
-from .models import StudyGroup, GroupMember, JoinRequest
+from .models import StudyGroup, GroupMember, JoinRequest, WaitlistEntry
 
 @admin.register(StudyGroup)
 class StudyGroupAdmin(admin.ModelAdmin):
-    list_display = ['name', 'course_code', 'creator', 'group_type', 'current_member_count', 'max_capacity', 'created_at']
+    list_display = ['name', 'course_code', 'creator', 'group_type', 'member_count', 'max_capacity', 'created_at']
     list_filter = ['group_type', 'created_at']
     search_fields = ['name', 'course_name', 'course_code', 'creator__username']
 
@@ -15,4 +15,9 @@ class GroupMemberAdmin(admin.ModelAdmin):
 @admin.register(JoinRequest)
 class JoinRequestAdmin(admin.ModelAdmin):
     list_display = ['user', 'group', 'status', 'created_at']
-    list_filter = ['status', 'created_at']
\ No newline at end of file
+    list_filter = ['status', 'created_at']
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'group', 'created_at']
+    list_filter = ['created_at']
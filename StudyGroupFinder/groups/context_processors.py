@@ -0,0 +1,6 @@
+from .membership import get_membership
+
+
+def membership(request):
+    """Expose the request's lazy MembershipResolver to templates"""
+    return {'membership': get_membership(request)}
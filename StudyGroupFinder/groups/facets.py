@@ -0,0 +1,105 @@
+"""
+Facet counts for browse_groups.
+
+group_type, availability and meeting day are conditional counts in one
+aggregate query; course codes need a GROUP BY, so they take a second one.
+Results are cached per filter signature under a catalog version that is
+bumped after any group or membership change commits, so a cached count is
+never served once the catalog has moved on.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .schedule import DAY_NAMES, day_filter
+
+CATALOG_VERSION_KEY = 'groups:catalog_version'
+
+# Query string parameters, in display order
+FACET_FIELDS = ('course_code', 'group_type', 'availability', 'day')
+
+OPEN = 'open'
+FULL = 'full'
+AVAILABILITY_CHOICES = [(OPEN, 'Has open seats'), (FULL, 'Full')]
+
+
+def _availability_filter(availability):
+    return Q(member_count__lt=F('max_capacity')) if availability == OPEN else Q(member_count__gte=F('max_capacity'))
+
+
+def apply_facet_filters(queryset, filters):
+    """Narrow a StudyGroup queryset by the selected facet values (blank values are ignored)"""
+    from .models import StudyGroup
+    if filters.get('course_code'):
+        queryset = queryset.filter(course_code=filters['course_code'])
+    if filters.get('group_type') in dict(StudyGroup.GROUP_TYPE_CHOICES):
+        queryset = queryset.filter(group_type=filters['group_type'])
+    if filters.get('availability') in dict(AVAILABILITY_CHOICES):
+        queryset = queryset.filter(_availability_filter(filters['availability']))
+    if filters.get('day') in DAY_NAMES:
+        queryset = queryset.filter(day_filter(DAY_NAMES.index(filters['day'])))
+    return queryset
+
+
+def catalog_version():
+    # A fresh key starts from the clock, so versions never repeat after an eviction
+    cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+    return cache.get(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every cached facet count once the current transaction commits"""
+    def bump():
+        try:
+            cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+    transaction.on_commit(bump)
+
+
+def compute_facets(queryset):
+    """Facet counts over queryset in two queries"""
+    from .models import StudyGroup
+    # Counting through pk__in keeps search annotations and ordering out of the aggregates
+    matches = StudyGroup.objects.filter(pk__in=queryset.order_by().values('pk'))
+
+    counts = matches.aggregate(
+        total=Count('id'),
+        **{f'type_{value}': Count('id', filter=Q(group_type=value)) for value, _ in StudyGroup.GROUP_TYPE_CHOICES},
+        **{
+            f'availability_{value}': Count('id', filter=_availability_filter(value))
+            for value, _ in AVAILABILITY_CHOICES
+        },
+        **{f'day_{value}': Count('id', filter=day_filter(DAY_NAMES.index(value))) for value, _ in StudyGroup.DAYS_CHOICES},
+    )
+    course_codes = matches.values('course_code').annotate(count=Count('id')).order_by('-count', 'course_code')
+
+    def facet(prefix, choices):
+        return [(value, label, counts[f'{prefix}_{value}']) for value, label in choices]
+
+    return {
+        'total': counts['total'],
+        'course_code': [
+            (row['course_code'], row['course_code'], row['count'])
+            for row in course_codes[:getattr(settings, 'GROUP_FACET_COURSE_LIMIT', 20)]
+        ],
+        'group_type': facet('type', StudyGroup.GROUP_TYPE_CHOICES),
+        'availability': facet('availability', AVAILABILITY_CHOICES),
+        'day': facet('day', StudyGroup.DAYS_CHOICES),
+    }
+
+
+def get_facets(queryset, signature):
+    """compute_facets(queryset), cached under the filters that produced it and the catalog version"""
+    digest = hashlib.sha1(json.dumps(signature, sort_keys=True).encode()).hexdigest()
+    key = f'groups:facets:{catalog_version()}:{digest}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, getattr(settings, 'GROUP_FACET_CACHE_TTL', 300))
+    return facets
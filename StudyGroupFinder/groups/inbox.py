@@ -0,0 +1,119 @@
+"""
+Creator inbox: pending JoinRequests across all of a creator's groups.
+
+The list pages by keyset on (created_at, id), newest first, so every page is
+one range scan of the (group, status, created_at) index per group. Counts
+per group come from one GROUP BY query, and bulk actions resolve any number
+of requests in one transaction, taking each group's row lock once.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils.dateparse import parse_datetime
+
+from .pagination import encode_cursor, decode_cursor
+
+APPROVE = 'approve'
+REJECT = 'reject'
+
+
+def inbox_requests(creator):
+    """Pending requests to creator's groups, newest first"""
+    from .models import JoinRequest
+    return JoinRequest.objects.filter(group__creator=creator, status='pending').select_related(
+        'user__profile', 'group'
+    ).order_by('-created_at', '-id')
+
+
+def paginate_requests(queryset, cursor=None, page_size=None):
+    """One page of inbox_requests() after cursor; returns (requests, next cursor or None)"""
+    page_size = page_size or getattr(settings, 'GROUP_INBOX_PAGE_SIZE', 25)
+    position = decode_cursor(cursor)
+    if position and len(position) == 2:
+        created_at, last_id = parse_datetime(str(position[0])), position[1]
+        if created_at is not None and isinstance(last_id, int):
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id))
+    join_requests = list(queryset[:page_size + 1])
+    if len(join_requests) <= page_size:
+        return join_requests, None
+    last = join_requests[page_size - 1]
+    return join_requests[:page_size], encode_cursor([last.created_at.isoformat(), last.pk])
+
+
+def pending_counts(creator):
+    """Each of creator's groups with pending requests, with pending and open_seats, in one query"""
+    from .models import StudyGroup
+    return list(
+        StudyGroup.objects.filter(creator=creator)
+        .annotate(pending=Count('joinrequest', filter=Q(joinrequest__status='pending')))
+        .filter(pending__gt=0)
+        .annotate(open_seats=F('max_capacity') - F('member_count'))
+        .order_by('-pending', 'name')
+        .values('pk', 'name', 'course_code', 'pending', 'open_seats')
+    )
+
+
+def _admit(group_id, join_requests):
+    """
+    Approve join_requests (oldest first) into one group while seats last,
+    holding the group row lock; returns the approved requests.
+    """
+    from .models import StudyGroup, GroupMember, JoinRequest
+    # The no-op UPDATE takes the row lock, so the seat count read next cannot go stale
+    if not StudyGroup.objects.filter(pk=group_id).update(member_count=F('member_count')):
+        return []
+    capacity, members = StudyGroup.objects.values_list('max_capacity', 'member_count').get(pk=group_id)
+    already = set(GroupMember.objects.filter(
+        group_id=group_id, user_id__in=[join_request.user_id for join_request in join_requests]
+    ).values_list('user_id', flat=True))
+
+    approved, admitted = [], []
+    for join_request in join_requests:
+        if join_request.user_id in already:
+            approved.append(join_request)
+        elif len(admitted) < capacity - members:
+            admitted.append(join_request)
+            approved.append(join_request)
+    # One create per member: GroupMember.save counts the seat and post_save keeps the
+    # cohort counts, recommendation scores and feature matrix in step
+    for join_request in admitted:
+        GroupMember.objects.create(user_id=join_request.user_id, group_id=group_id)
+    JoinRequest.objects.filter(pk__in=[join_request.pk for join_request in approved]).update(status='approved')
+    return approved
+
+
+def resolve_requests(creator, request_ids, action):
+    """
+    Approve or reject many of creator's pending requests in one transaction.
+
+    Approvals never exceed max_capacity: requests that do not fit stay
+    pending. Returns (resolved, skipped) lists; requesters are notified after
+    commit.
+    """
+    from notifications.utils import notify_request_approved, notify_request_rejected
+    from .models import JoinRequest
+    with transaction.atomic():
+        join_requests = list(
+            JoinRequest.objects.filter(pk__in=request_ids, group__creator=creator, status='pending')
+            .select_related('user', 'group').order_by('created_at', 'id')
+        )
+        if action == REJECT:
+            JoinRequest.objects.filter(pk__in=[join_request.pk for join_request in join_requests]).update(
+                status='rejected'
+            )
+            resolved, notify = join_requests, notify_request_rejected
+        else:
+            by_group = defaultdict(list)
+            for join_request in join_requests:
+                by_group[join_request.group_id].append(join_request)
+            resolved = []
+            for group_id in sorted(by_group):
+                resolved.extend(_admit(group_id, by_group[group_id]))
+            notify = notify_request_approved
+        for join_request in resolved:
+            join_request.status = 'rejected' if action == REJECT else 'approved'
+            transaction.on_commit(lambda join_request=join_request: notify(join_request))
+    resolved_ids = {join_request.pk for join_request in resolved}
+    return resolved, [join_request for join_request in join_requests if join_request.pk not in resolved_ids]
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from groups.search import get_search_backend, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Refill the SQLite FTS search table from every group (Postgres indexes need no rebuild)'
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} groups; search backend: {get_search_backend().name}'
+        ))
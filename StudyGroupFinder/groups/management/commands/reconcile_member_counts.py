@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from groups.utils import find_member_count_drift, repair_member_counts
+
+
+class Command(BaseCommand):
+    help = "Detect StudyGroup.member_count values that drifted from the real membership and repair them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing it')
+
+    def handle(self, *args, **options):
+        drift = find_member_count_drift()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All member counts are exact'))
+            return
+
+        for group_id, stored, actual in drift:
+            self.stdout.write(f'Group {group_id}: stored {stored}, actual {actual}')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} groups drifted (dry run, nothing changed)'))
+            return
+
+        repaired = repair_member_counts([group_id for group_id, _, _ in drift])
+        self.stdout.write(self.style.SUCCESS(f'Repaired {repaired} groups'))
@@ -0,0 +1,47 @@
+"""
+Per-request membership lookups.
+
+get_membership(request) loads every (group id, role) the user holds in one
+query the first time any view or template asks, and memoizes it on the
+request, so membership checks never load a group's member list.
+"""
+from .models import GroupMember
+
+
+class MembershipResolver:
+    """The user's group ids and roles, loaded on first use"""
+
+    def __init__(self, user):
+        self.user = user
+        self._roles = None
+
+    @property
+    def roles(self):
+        """{group id: role} for every group the user belongs to"""
+        if self._roles is None:
+            self._roles = {}
+            if self.user.is_authenticated:
+                self._roles = dict(GroupMember.objects.filter(user=self.user).values_list('group_id', 'role'))
+        return self._roles
+
+    @property
+    def group_ids(self):
+        return self.roles.keys()
+
+    def is_member(self, group):
+        """group may be a StudyGroup or its id"""
+        return getattr(group, 'pk', group) in self.roles
+
+    def role(self, group):
+        return self.roles.get(getattr(group, 'pk', group))
+
+    def clear(self):
+        """Forget the loaded roles after the user joins or leaves a group"""
+        self._roles = None
+
+
+def get_membership(request):
+    """The request's MembershipResolver, created on first use"""
+    if not hasattr(request, '_membership'):
+        request._membership = MembershipResolver(request.user)
+    return request._membership
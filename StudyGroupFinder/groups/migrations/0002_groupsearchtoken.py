@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_search_index(apps, schema_editor):
+    from groups.utils import search_tokens_for
+    StudyGroup = apps.get_model('groups', 'StudyGroup')
+    GroupSearchToken = apps.get_model('groups', 'GroupSearchToken')
+    tokens = []
+    for group_id, name, course_name, course_code in StudyGroup.objects.values_list(
+        'id', 'name', 'course_name', 'course_code'
+    ).iterator():
+        tokens.extend(
+            GroupSearchToken(group_id=group_id, token=token)
+            for token in search_tokens_for(name, course_name, course_code)
+        )
+    GroupSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(db_index=True, max_length=100)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='groups.studygroup')),
+            ],
+            options={
+                'unique_together': {('group', 'token')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
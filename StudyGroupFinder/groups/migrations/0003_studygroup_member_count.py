@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+def count_members(apps, schema_editor):
+    from groups.utils import repair_member_counts
+    repair_member_counts(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0002_groupsearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studygroup',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_members, migrations.RunPython.noop),
+    ]
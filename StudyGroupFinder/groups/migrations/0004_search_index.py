@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from groups.search import install_search_index
+    install_search_index(apps, schema_editor)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from groups.search import uninstall_search_index
+    uninstall_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0003_studygroup_member_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:20
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(fields=['-created_at', '-id'], name='group_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(fields=['-member_count', '-id'], name='group_members_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(models.OrderBy(django.db.models.expressions.CombinedExpression(models.F('max_capacity'), '-', models.F('member_count')), descending=True), models.OrderBy(models.F('id'), descending=True), name='group_open_seats_idx'),
+        ),
+    ]
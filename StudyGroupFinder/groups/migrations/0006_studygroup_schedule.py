@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+def derive_schedules(apps, schema_editor):
+    from groups.schedule import rebuild_group_schedules
+    rebuild_group_schedules(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0005_browse_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studygroup',
+            name='slots_fri',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studygroup',
+            name='slots_mon',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studygroup',
+            name='slots_sat',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studygroup',
+            name='slots_sun',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studygroup',
+            name='slots_thu',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studygroup',
+            name='slots_tue',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studygroup',
+            name='slots_wed',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(derive_schedules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0007_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='joinrequest',
+            index=models.Index(fields=['group', 'status', 'created_at'], name='joinrequest_inbox_idx'),
+        ),
+    ]
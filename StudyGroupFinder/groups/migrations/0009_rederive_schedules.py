@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def derive_schedules(apps, schema_editor):
+    # parse_days now reads plurals ("Mondays") and "Tues"/"Thurs", which 0006 left empty
+    from groups.schedule import rebuild_group_schedules
+    rebuild_group_schedules(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0008_joinrequest_joinrequest_inbox_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(derive_schedules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def reindex_course_codes(apps, schema_editor):
+    # Course codes are now also indexed by their letter and digit runs ("MATH202" -> "math", "202")
+    from groups.search import PG_SEARCH_INDEX, install_search_index, rebuild_search_index
+    from groups.utils import search_tokens_for
+    StudyGroup = apps.get_model('groups', 'StudyGroup')
+    GroupSearchToken = apps.get_model('groups', 'GroupSearchToken')
+    GroupSearchToken.objects.all().delete()
+    tokens = []
+    for group_id, name, course_name, course_code in StudyGroup.objects.values_list(
+        'id', 'name', 'course_name', 'course_code'
+    ).iterator():
+        tokens.extend(
+            GroupSearchToken(group_id=group_id, token=token)
+            for token in search_tokens_for(name, course_name, course_code)
+        )
+    GroupSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+    if schema_editor.connection.vendor == 'postgresql':
+        # The GIN index is over the document expression, which changed
+        schema_editor.execute(f'DROP INDEX IF EXISTS {PG_SEARCH_INDEX}')
+        install_search_index(apps, schema_editor)
+    else:
+        rebuild_search_index(apps, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0009_rederive_schedules'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_course_codes, migrations.RunPython.noop),
+    ]
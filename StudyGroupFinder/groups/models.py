@@ -1,8 +1,13 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .facets import bump_catalog_version
+from .schedule import WeeklySchedule, meeting_schedule, DAY_FIELDS
 
-class StudyGroup(models.Model):
+class StudyGroup(WeeklySchedule):
     """Study group for courses with members"""
     DAYS_CHOICES = [
         ('monday', 'Monday'),
@@ -34,23 +39,44 @@ class StudyGroup(models.Model):
     group_type = models.CharField(max_length=10, choices=GROUP_TYPE_CHOICES, default='public')
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_groups')
     members = models.ManyToManyField(User, through='GroupMember', related_name='joined_groups')
+    member_count = models.PositiveIntegerField(default=0, editable=False)  # Kept exact by GroupMember writes
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination keys for the browse sort modes
+            models.Index(fields=['-created_at', '-id'], name='group_newest_idx'),
+            models.Index(fields=['-member_count', '-id'], name='group_members_idx'),
+            models.Index((F('max_capacity') - F('member_count')).desc(), F('id').desc(), name='group_open_seats_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.course_code}"
     
+    def save(self, *args, **kwargs):
+        # The weekly schedule is derived from the free-text meeting fields
+        self.schedule = meeting_schedule(self.meeting_days, self.meeting_time)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'meeting_days', 'meeting_time'} & set(update_fields):
+            kwargs['update_fields'] = [*update_fields, *DAY_FIELDS]
+        # member_count only changes through F() updates; never write back a stale in-memory copy
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'member_count'
+            ]
+        super().save(*args, **kwargs)
+    
     def current_member_count(self):
-        return self.members.count()
+        return self.member_count
     
     def is_full(self):
-        return self.current_member_count() >= self.max_capacity
+        return self.member_count >= self.max_capacity
     
     def can_join(self, user):
-        return not self.is_full() and user not in self.members.all()
+        return not self.is_full() and not self.groupmember_set.filter(user=user).exists()
 
 
 class GroupMember(models.Model):
@@ -68,6 +94,15 @@ class GroupMember(models.Model):
     class Meta:
         unique_together = ['user', 'group']
     
+    def save(self, *args, **kwargs):
+        # Count the new member in the same transaction as the insert
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            StudyGroup.objects.filter(pk=self.group_id).update(member_count=F('member_count') + 1)
+            bump_catalog_version()
+    
     def __str__(self):
         return f"{self.user.username} in {self.group.name}"
 
@@ -89,6 +124,78 @@ class JoinRequest(models.Model):
     class Meta:
         unique_together = ['user', 'group']
         ordering = ['-created_at']
+        indexes = [
+            # Pending requests per group, newest first (the creator inbox)
+            models.Index(fields=['group', 'status', 'created_at'], name='joinrequest_inbox_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} -> {self.group.name}"
+
+
+class WaitlistEntry(models.Model):
+    """A user's place in the queue for a full public group (lowest id is next)"""
+    group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='waitlist')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['group', 'user']
+        ordering = ['id']
+        indexes = [
+            # Head of the queue and queue positions are range scans of this index
+            models.Index(fields=['group', 'id'], name='waitlist_queue_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} -> {self.group.name}"
\ No newline at end of file
+        return f"{self.user.username} waiting for {self.group.name}"
+
+
+class GroupSearchToken(models.Model):
+    """Inverted index of search tokens (name, course name and code words) per group"""
+    group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=100, db_index=True)
+    
+    class Meta:
+        unique_together = ['group', 'token']
+    
+    def __str__(self):
+        return f"{self.token} -> {self.group_id}"
+
+
+# Signal to keep the search index in step with group details
+@receiver(post_save, sender=StudyGroup)
+def index_study_group(sender, instance, **kwargs):
+    """Re-index a group whenever it is saved (deletes cascade to its tokens)"""
+    from .search import index_search_document
+    from .utils import index_group
+    index_group(instance)
+    index_search_document(instance)
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=StudyGroup)
+def unindex_study_group(sender, instance, **kwargs):
+    """The FTS table has no foreign key to cascade from"""
+    from .search import remove_search_document
+    remove_search_document(instance.pk)
+    bump_catalog_version()
+
+
+# Signal to fill seats from the waitlist when a group's capacity is raised
+@receiver(post_save, sender=StudyGroup)
+def promote_waitlist_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'max_capacity' not in update_fields):
+        return
+    # Leaving already promotes, so a queue only exists while the group is full
+    if not instance.is_full() and instance.waitlist.exists():
+        from .utils import promote_from_waitlist
+        promote_from_waitlist(instance)
+
+
+# Signal to keep member_count exact when memberships are deleted (also on cascades)
+@receiver(post_delete, sender=GroupMember)
+def uncount_group_member(sender, instance, **kwargs):
+    """Runs inside the deletion's transaction"""
+    StudyGroup.objects.filter(pk=instance.group_id).update(member_count=F('member_count') - 1)
+    bump_catalog_version()
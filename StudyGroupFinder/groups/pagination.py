@@ -0,0 +1,104 @@
+"""
+Keyset (cursor) pagination for browse_groups.
+
+Each sort mode orders by an indexed key with id as the tie-breaker, and the
+cursor carries the last row's (key, id), so fetching any page is one index
+range scan of page_size + 1 rows, however deep it is. Relevance order is
+computed by the search backend and cannot be range-scanned; it pages by
+offset over at most GROUP_SEARCH_MAX_RESULTS matches instead.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+NEWEST = 'newest'
+MEMBERS = 'members'
+SEATS = 'seats'
+RELEVANCE = 'relevance'
+
+SORT_CHOICES = [
+    (NEWEST, 'Newest'),
+    (MEMBERS, 'Most members'),
+    (SEATS, 'Most open seats'),
+    (RELEVANCE, 'Best match'),
+]
+
+# Sort mode -> key field; each has a matching index on StudyGroup
+SORT_KEYS = {
+    NEWEST: 'created_at',
+    MEMBERS: 'member_count',
+    SEATS: 'open_seats',
+}
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Values packed by encode_cursor, or None for a missing or malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def sort_groups(queryset, sort):
+    """Apply a sort mode's ordering (relevance keeps the search backend's order)"""
+    if sort == SEATS:
+        queryset = queryset.annotate(open_seats=F('max_capacity') - F('member_count'))
+    if sort in SORT_KEYS:
+        queryset = queryset.order_by(f'-{SORT_KEYS[sort]}', '-id')
+    return queryset
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _key_value(group, key):
+    value = getattr(group, key)
+    return value.isoformat() if key == 'created_at' else value
+
+
+def paginate_groups(queryset, sort, cursor=None, page_size=None):
+    """One page of sort_groups(queryset, sort) after cursor; returns (groups, next cursor or None)"""
+    page_size = page_size or getattr(settings, 'GROUP_BROWSE_PAGE_SIZE', 24)
+    position = decode_cursor(cursor)
+    queryset = sort_groups(queryset, sort)
+
+    if sort not in SORT_KEYS:
+        max_results = getattr(settings, 'GROUP_SEARCH_MAX_RESULTS', 500)
+        offset = position[0] if position and _is_int(position[0]) else 0
+        # A tampered offset restarts from the first page
+        if not 0 <= offset <= max_results:
+            offset = 0
+        groups = list(queryset[offset:min(offset + page_size + 1, max_results)])
+        more = len(groups) > page_size
+        return groups[:page_size], encode_cursor([offset + page_size]) if more else None
+
+    key = SORT_KEYS[sort]
+    if position and len(position) == 2:
+        value, last_id = position
+        if key == 'created_at':
+            try:
+                value = parse_datetime(str(value))
+            except ValueError:
+                value = None
+        elif not _is_int(value):
+            value = None
+        # A cursor whose values do not fit the sort key restarts from the first page
+        if value is not None and _is_int(last_id):
+            queryset = queryset.filter(Q(**{f'{key}__lt': value}) | Q(**{key: value, 'id__lt': last_id}))
+    groups = list(queryset[:page_size + 1])
+    if len(groups) <= page_size:
+        return groups, None
+    last = groups[page_size - 1]
+    return groups[:page_size], encode_cursor([_key_value(last, key), last.pk])
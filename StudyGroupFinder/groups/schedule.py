@@ -0,0 +1,174 @@
+"""
+Weekly schedules as 7 x 48 half-hour bitmasks.
+
+Each weekday is one 48-bit integer column (bit n = the half hour starting at
+n * 30 minutes), so overlap is a bitwise AND: in SQL through F().bitand()
+for filtering, per group for the batch scorer, and in NumPy over a
+(groups x 7) matrix for the vectorized one (NumPy is only imported there).
+StudyGroup derives its schedule from meeting_days/meeting_time on save;
+UserProfile stores the student's availability in the same columns.
+"""
+import re
+from datetime import time
+
+from django.apps import apps as global_apps
+from django.db import models
+from django.db.models import F, Q
+from django.db.models.lookups import GreaterThan
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+# Meetings have a start time but no length
+DEFAULT_MEETING_MINUTES = 60
+
+DAY_NAMES = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+DAY_FIELDS = tuple(f'slots_{day[:3]}' for day in DAY_NAMES)
+EMPTY_SCHEDULE = (0,) * len(DAY_NAMES)
+
+_DAY_WORDS = {
+    'weekday': range(5), 'weekdays': range(5), 'weekend': range(5, 7), 'weekends': range(5, 7),
+    'daily': range(7), 'everyday': range(7),
+}
+
+
+class WeeklySchedule(models.Model):
+    """Abstract base adding one half-hour bitmask column per weekday"""
+    slots_mon = models.BigIntegerField(default=0, editable=False)
+    slots_tue = models.BigIntegerField(default=0, editable=False)
+    slots_wed = models.BigIntegerField(default=0, editable=False)
+    slots_thu = models.BigIntegerField(default=0, editable=False)
+    slots_fri = models.BigIntegerField(default=0, editable=False)
+    slots_sat = models.BigIntegerField(default=0, editable=False)
+    slots_sun = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def schedule(self):
+        """Day masks, Monday first"""
+        return tuple(getattr(self, field) for field in DAY_FIELDS)
+
+    @schedule.setter
+    def schedule(self, masks):
+        for field, mask in zip(DAY_FIELDS, masks):
+            setattr(self, field, mask)
+
+    def has_schedule(self):
+        return any(self.schedule)
+
+
+def parse_days(text):
+    """Weekday indexes named in free text ("Mon, Wednesday", "Tues and Thurs", "weekends")"""
+    days = set()
+    for word in re.findall(r'[a-z]+', text.lower()):
+        if word in _DAY_WORDS:
+            days.update(_DAY_WORDS[word])
+            continue
+        # Plurals ("Mondays") and "Tues"/"Thurs" match once the trailing s is dropped
+        if len(word) > 3 and word.endswith('s'):
+            word = word[:-1]
+        if len(word) >= 3:
+            days.update(index for index, name in enumerate(DAY_NAMES) if name.startswith(word))
+    return sorted(days)
+
+
+def slot_mask(start, minutes):
+    """Bits for the half hours from start for minutes, clipped at midnight"""
+    first = (start.hour * 60 + start.minute) // SLOT_MINUTES
+    last = min(SLOTS_PER_DAY, -(-(start.hour * 60 + start.minute + minutes) // SLOT_MINUTES))
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+
+def weekly_schedule(days, start, minutes):
+    """Day masks with the same slots set on each of days"""
+    mask = slot_mask(start, minutes)
+    return tuple(mask if day in days else 0 for day in range(len(DAY_NAMES)))
+
+
+def meeting_schedule(meeting_days, meeting_time):
+    """A group's day masks from its free-text days and start time"""
+    if not meeting_time:
+        return EMPTY_SCHEDULE
+    return weekly_schedule(set(parse_days(meeting_days)), meeting_time, DEFAULT_MEETING_MINUTES)
+
+
+def availability_schedule(days, start, end):
+    """Day masks for the same from/until window on each of days"""
+    minutes = (end.hour * 60 + end.minute) - (start.hour * 60 + start.minute)
+    return weekly_schedule(set(days), start, minutes) if minutes > 0 else EMPTY_SCHEDULE
+
+
+def schedule_window(masks):
+    """(days, start, end) covering masks, the inverse of availability_schedule for a uniform window"""
+    days = [day for day, mask in enumerate(masks) if mask]
+    if not days:
+        return [], None, None
+    combined = 0
+    for mask in masks:
+        combined |= mask
+    first = (combined & -combined).bit_length() - 1
+    last = combined.bit_length()
+
+    def to_time(slot):
+        minutes = slot * SLOT_MINUTES
+        return time(23, 59) if minutes >= 24 * 60 else time(minutes // 60, minutes % 60)
+    return days, to_time(first), to_time(last)
+
+
+def day_filter(day):
+    """Q for groups meeting on a weekday index"""
+    return ~Q(**{DAY_FIELDS[day]: 0})
+
+
+def overlap_filter(masks):
+    """Q for rows whose schedule shares at least one half hour with masks"""
+    condition = Q(pk__in=[])
+    for field, mask in zip(DAY_FIELDS, masks):
+        if mask:
+            condition |= Q(GreaterThan(F(field).bitand(mask), 0))
+    return condition
+
+
+def shared_slots(masks, other):
+    """Half hours two schedules have in common"""
+    return sum(bin(mask & other_mask).count('1') for mask, other_mask in zip(masks, other))
+
+
+def slot_count(masks):
+    """Half hours set in a schedule"""
+    return sum(bin(mask).count('1') for mask in masks)
+
+
+def schedule_matrix(rows):
+    """(n x 7) uint64 matrix from rows of 7 day masks"""
+    import numpy as np
+    return np.array(rows, dtype=np.uint64).reshape(-1, len(DAY_NAMES))
+
+
+def overlap_slots(matrix, masks):
+    """Half hours each row of matrix shares with masks"""
+    import numpy as np
+    shared = np.ascontiguousarray(matrix & np.array(masks, dtype=np.uint64))
+    return np.unpackbits(shared.view(np.uint8), axis=1).sum(axis=1, dtype=np.int64)
+
+
+def slot_counts(matrix):
+    """Half hours set in each row of matrix"""
+    import numpy as np
+    return np.unpackbits(np.ascontiguousarray(matrix).view(np.uint8), axis=1).sum(axis=1, dtype=np.int64)
+
+
+def rebuild_group_schedules(apps=global_apps, batch_size=1000):
+    """Re-derive every group's day masks from its meeting fields; returns groups changed"""
+    StudyGroup = apps.get_model('groups', 'StudyGroup')
+    changed = []
+    groups = StudyGroup.objects.only('meeting_days', 'meeting_time', *DAY_FIELDS)
+    for group in groups.iterator(chunk_size=batch_size):
+        masks = meeting_schedule(group.meeting_days, group.meeting_time)
+        if tuple(getattr(group, field) for field in DAY_FIELDS) != masks:
+            for field, mask in zip(DAY_FIELDS, masks):
+                setattr(group, field, mask)
+            changed.append(group)
+    StudyGroup.objects.bulk_update(changed, DAY_FIELDS, batch_size=batch_size)
+    return len(changed)
@@ -0,0 +1,207 @@
+"""
+Pluggable, relevance-ranked search backends for browse_groups.
+
+Every backend matches each query word as a prefix across name, course name,
+course code, study topics and description, and annotates search_rank
+(higher is better). Course codes are also split into letter and digit runs,
+so "202" finds "MATH202":
+
+- postgres: weighted to_tsvector document behind a GIN expression index,
+  plus pg_trgm similarity on course_code so "math202" finds "MATH 202"
+- sqlite_fts: an FTS5 table ranked with bm25, kept in sync on save/delete
+- tokens: the GroupSearchToken prefix index, for databases with neither
+
+GROUP_SEARCH_BACKEND picks one explicitly; 'auto' uses the best available.
+"""
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.models import BooleanField, Count, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .utils import tokenize, course_code_terms, filter_groups_by_search
+
+FTS_TABLE = 'groups_studygroup_fts'
+# Column order matters: bm25 weights below are positional
+FTS_COLUMNS = ('name', 'course_name', 'course_code', 'study_topics', 'description')
+FTS_WEIGHTS = (10.0, 4.0, 8.0, 2.0, 1.0)
+
+PG_SEARCH_INDEX = 'groups_studygroup_search_gin'
+PG_TRIGRAM_INDEX = 'groups_studygroup_code_trgm'
+
+
+def pg_document(table=''):
+    """Weighted tsvector expression; the query must match the index expression"""
+    column = (lambda name: f'"{table}"."{name}"') if table else (lambda name: f'"{name}"')
+    # "MATH202" -> "MATH202 MATH 202", so the course number is a word of its own
+    code = (
+        f"{column('course_code')} || ' ' || "
+        f"regexp_replace({column('course_code')}, '([[:alpha:]])([[:digit:]])', '\\1 \\2', 'g')"
+    )
+    return (
+        f"setweight(to_tsvector('simple', {column('name')} || ' ' || {code}), 'A') || "
+        f"setweight(to_tsvector('simple', {column('course_name')}), 'B') || "
+        f"setweight(to_tsvector('simple', {column('study_topics')}), 'C') || "
+        f"setweight(to_tsvector('simple', {column('description')}), 'D')"
+    )
+
+
+def fts_row(group):
+    """FTS5 column values; the course code also gets course_code_terms() ("MATH 202 math202")"""
+    extra = course_code_terms(group.course_code) - set(tokenize(group.course_code))
+    course_code = ' '.join([group.course_code, *sorted(extra)])
+    return (group.pk, group.name, group.course_name, course_code, group.study_topics, group.description)
+
+
+class TokenSearchBackend:
+    name = 'tokens'
+
+    def search(self, queryset, query):
+        # Rank by how many query words match a token exactly rather than only as a prefix
+        return filter_groups_by_search(queryset, query).annotate(
+            search_rank=Count('search_tokens', filter=Q(search_tokens__token__in=set(tokenize(query))), distinct=True)
+        ).order_by('-search_rank', '-created_at')
+
+
+class PostgresSearchBackend:
+    name = 'postgres'
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        document = pg_document(table)
+        # Every word as a prefix; words are alphanumeric so they need no escaping
+        tsquery = ' & '.join(f'{token}:*' for token in dict.fromkeys(tokens))
+        code = f'"{table}"."course_code"'
+        matches = RawSQL(
+            f"({document}) @@ to_tsquery('simple', %s) OR {code} %% %s",
+            [tsquery, query], output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank({document}, to_tsquery('simple', %s)) + similarity({code}, %s)",
+            [tsquery, query], output_field=FloatField(),
+        )
+        return queryset.filter(matches).annotate(search_rank=rank).order_by('-search_rank', '-created_at')
+
+
+class SQLiteFTSBackend:
+    name = 'sqlite_fts'
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        match = ' '.join(f'"{token}"*' for token in dict.fromkeys(tokens))
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        # bm25() is only available in a query over the FTS table itself, so rank each row in a subquery
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            [match], output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank).order_by('-search_rank', '-created_at')
+
+
+BACKENDS = {backend.name: backend for backend in (PostgresSearchBackend, SQLiteFTSBackend, TokenSearchBackend)}
+
+_fts_available = {}
+
+
+def fts_available():
+    """Whether this SQLite database has the FTS5 table (the migration skips it without FTS5)"""
+    if connection.vendor != 'sqlite':
+        return False
+    database = connection.settings_dict['NAME']
+    if database not in _fts_available:
+        _fts_available[database] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available[database]
+
+
+def get_search_backend():
+    """The configured backend, or the best one this database supports"""
+    name = getattr(settings, 'GROUP_SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        if connection.vendor == 'postgresql':
+            name = PostgresSearchBackend.name
+        elif fts_available():
+            name = SQLiteFTSBackend.name
+        else:
+            name = TokenSearchBackend.name
+    return BACKENDS[name]()
+
+
+def search_groups(queryset, query):
+    """Matching groups from queryset, best match first, with a search_rank annotation"""
+    return get_search_backend().search(queryset, query)
+
+
+def index_search_document(group):
+    """Refresh one group's FTS row; Postgres indexes the columns directly"""
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [group.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)',
+                fts_row(group),
+            )
+
+
+def remove_search_document(group_id):
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [group_id])
+
+
+def rebuild_search_index(apps=global_apps, using=None):
+    """Refill the FTS table from every group (after bulk inserts); returns groups indexed"""
+    from django.db import connections
+    db = connections[using] if using else connection
+    if db.vendor != 'sqlite' or FTS_TABLE not in db.introspection.table_names():
+        return 0
+    StudyGroup = apps.get_model('groups', 'StudyGroup')
+    rows = [fts_row(group) for group in StudyGroup.objects.using(db.alias).only(
+        'name', 'course_name', 'course_code', 'study_topics', 'description'
+    ).iterator(chunk_size=2000)]
+    with db.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)', rows
+        )
+    return len(rows)
+
+
+def install_search_index(apps, schema_editor):
+    """Create the vendor's search structures (used by the migration)"""
+    _fts_available.clear()
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {PG_SEARCH_INDEX} ON groups_studygroup USING GIN (({pg_document()}))'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {PG_TRIGRAM_INDEX} ON groups_studygroup USING GIN (course_code gin_trgm_ops)'
+        )
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({', '.join(FTS_COLUMNS)}, tokenize='unicode61')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5; the token backend is used instead
+            return
+        rebuild_search_index(apps, using=schema_editor.connection.alias)
+
+
+def uninstall_search_index(apps, schema_editor):
+    _fts_available.clear()
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {PG_SEARCH_INDEX}')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {PG_TRIGRAM_INDEX}')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
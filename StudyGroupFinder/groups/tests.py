@@ -1,3 +1,667 @@
-from django.test import TestCase
+import threading
+from datetime import time
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from notifications.models import Notification
+from recommendations.buffer import tracking_buffer
+from recommendations.cohorts import sum_cohort_counts
+from recommendations.models import CohortGroupCount, RecommendationScore
+from recommendations.tests import LOCAL_STORAGES
+from .facets import apply_facet_filters, compute_facets, get_facets
+from .inbox import inbox_requests, paginate_requests, pending_counts, resolve_requests, APPROVE, REJECT
+from .models import StudyGroup, GroupMember, GroupSearchToken, JoinRequest, WaitlistEntry
+from .membership import MembershipResolver
+from .pagination import paginate_groups, encode_cursor, NEWEST, MEMBERS, SEATS, RELEVANCE
+from .schedule import parse_days, meeting_schedule, availability_schedule, overlap_filter, schedule_window
+from .search import search_groups, get_search_backend, rebuild_search_index
+from .utils import (
+    search_tokens_for, filter_groups_by_search, match_search_queries, add_member, JOINED, ALREADY_MEMBER, GROUP_FULL,
+    join_or_wait, waitlist_position, promote_from_waitlist, remove_member, WAITLISTED,
+)
+
+
+def make_group(creator, name, course_name='Mathematics', course_code='MATH 202', **kwargs):
+    defaults = {
+        'description': 'Weekly problem sets',
+        'study_topics': 'Integrals',
+        'max_capacity': 5,
+        'meeting_days': 'Monday',
+        'meeting_time': time(18, 0),
+        'meeting_location': 'Library',
+    }
+    defaults.update(kwargs)
+    return StudyGroup.objects.create(
+        name=name, course_name=course_name, course_code=course_code, creator=creator, **defaults
+    )
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='bob', password='pass12345')
+        self.calculus = make_group(self.creator, 'Calculus Crew')
+        self.poetry = make_group(self.creator, 'Poetry Circle', course_name='Literature', course_code='LIT 101')
+
+    def search(self, query):
+        return set(filter_groups_by_search(StudyGroup.objects.all(), query))
+
+    def test_tokens_include_compact_course_code(self):
+        self.assertEqual(
+            search_tokens_for('Calculus Crew', 'Mathematics', 'MATH 202'),
+            {'calculus', 'crew', 'mathematics', 'math', '202', 'math202'},
+        )
+
+    def test_every_query_word_must_prefix_a_token(self):
+        self.assertEqual(self.search('calc'), {self.calculus})
+        self.assertEqual(self.search('MATH202'), {self.calculus})
+        self.assertEqual(self.search('math 20'), {self.calculus})
+        self.assertEqual(self.search('math lit'), set())
+        self.assertEqual(self.search('!!'), set())
+
+    def test_course_numbers_match_however_the_code_is_spaced(self):
+        compact = make_group(self.creator, 'Stats Squad', course_code='STAT202')
+
+        self.assertEqual(search_tokens_for('Stats Squad', 'Statistics', 'STAT202') & {'stat', '202'}, {'stat', '202'})
+        self.assertEqual(self.search('202'), {self.calculus, compact})
+        self.assertEqual(self.search('stat 202'), {compact})
+        # Matching is by word prefix, not substring
+        self.assertEqual(self.search('culus'), set())
+        self.assertEqual(self.search('02'), set())
+
+    def test_index_follows_saves_and_deletes(self):
+        self.poetry.name = 'Drama Club'
+        self.poetry.save()
+        self.assertEqual(self.search('drama'), {self.poetry})
+        self.assertEqual(self.search('poetry'), set())
+
+        self.poetry.delete()
+        self.assertFalse(GroupSearchToken.objects.filter(token='drama').exists())
+
+    def test_match_search_queries_keeps_first_matching_query(self):
+        matches = match_search_queries(['lit', 'math', 'crew'])
+
+        self.assertEqual(matches, {self.poetry.pk: 'lit', self.calculus.pk: 'math'})
+
+
+class SearchBackendTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='bob', password='pass12345')
+        self.calculus = make_group(self.creator, 'Calculus Crew')
+        self.topics = make_group(
+            self.creator, 'Tuesday Regulars', course_name='Physics', course_code='PHYS 101', study_topics='Calculus refresher'
+        )
+        self.poetry = make_group(
+            self.creator, 'Poetry Circle', course_name='Literature', course_code='LIT 101', description='Reading sonnets'
+        )
+
+    def search(self, query):
+        return list(search_groups(StudyGroup.objects.all(), query))
+
+    def test_ranks_name_matches_above_topic_matches(self):
+        self.assertEqual(self.search('calc'), [self.calculus, self.topics])
+        self.assertEqual(self.search('sonnet'), [self.poetry])
+        self.assertEqual(self.search('math202'), [self.calculus])
+        self.assertEqual(self.search('202'), [self.calculus])
+        chemistry = make_group(self.creator, 'Lab Partners', course_name='Chemistry', course_code='CHEM110')
+        self.assertEqual(self.search('110'), [chemistry])
+        self.assertEqual(self.search('!!'), [])
+
+    def test_fts_index_follows_saves_deletes_and_rebuilds(self):
+        if get_search_backend().name != 'sqlite_fts':
+            self.skipTest('FTS5 is not available')
+        self.poetry.description = 'Haiku workshop'
+        self.poetry.save()
+        self.assertEqual(self.search('haiku'), [self.poetry])
+        self.assertEqual(self.search('sonnet'), [])
+
+        self.poetry.delete()
+        self.assertEqual(rebuild_search_index(), 2)
+        self.assertEqual(self.search('haiku'), [])
+
+    def test_results_compose_with_counts_and_facets(self):
+        results = search_groups(StudyGroup.objects.filter(course_name='Physics'), 'calc')
+
+        self.assertEqual(results.count(), 1)
+        self.assertEqual(compute_facets(results)['total'], 1)
+        self.assertGreater(results.get().search_rank, 0)
+
+    @override_settings(GROUP_SEARCH_BACKEND='tokens')
+    def test_token_backend_ranks_exact_words_first(self):
+        crewmates = make_group(self.creator, 'Crewmates', course_code='MATH 300')
+
+        self.assertEqual(self.search('crew'), [self.calculus, crewmates])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+@override_settings(GROUP_SEARCH_BACKEND='postgres')
+class PostgresSearchBackendTests(TestCase):
+    def setUp(self):
+        creator = User.objects.create_user(username='bob', password='pass12345')
+        self.calculus = make_group(creator, 'Calculus Crew')
+        self.topics = make_group(
+            creator, 'Tuesday Regulars', course_name='Physics', course_code='PHYS 101',
+            study_topics='Calculus refresher',
+        )
+
+    def search(self, query):
+        return list(search_groups(StudyGroup.objects.all(), query))
+
+    def test_ranks_prefixes_and_course_codes(self):
+        self.assertEqual(get_search_backend().name, 'postgres')
+        self.assertEqual(self.search('calc'), [self.calculus, self.topics])
+        self.assertEqual(self.search('math202'), [self.calculus])
+        self.assertEqual(self.search('202'), [self.calculus])
+        self.assertEqual(compute_facets(search_groups(StudyGroup.objects.all(), 'calc'))['total'], 2)
+
+
+class BrowsePaginationTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='bob', password='pass12345')
+        self.groups = [make_group(self.creator, f'Group {n}', max_capacity=3 + n % 4) for n in range(7)]
+        for n, group in enumerate(self.groups[:4]):
+            for m in range(n % 3):
+                GroupMember.objects.create(user=User.objects.create_user(username=f'student{n}_{m}'), group=group)
+
+    def walk(self, sort, page_size=3):
+        pages, cursor = [], None
+        while True:
+            page, cursor = paginate_groups(StudyGroup.objects.all(), sort, cursor, page_size=page_size)
+            pages.append(page)
+            if not cursor:
+                return pages
+
+    def test_every_sort_visits_each_group_once_in_order(self):
+        for sort, key in [
+            (NEWEST, lambda group: (group.created_at, group.pk)),
+            (MEMBERS, lambda group: (group.member_count, group.pk)),
+            (SEATS, lambda group: (group.max_capacity - group.member_count, group.pk)),
+        ]:
+            pages = self.walk(sort)
+            seen = [group for page in pages for group in page]
+            self.assertEqual([len(page) for page in pages], [3, 3, 1])
+            self.assertEqual(seen, sorted(StudyGroup.objects.all(), key=key, reverse=True), sort)
+
+    def test_deep_page_is_one_bounded_query(self):
+        _, cursor = paginate_groups(StudyGroup.objects.all(), SEATS, page_size=2)
+        _, cursor = paginate_groups(StudyGroup.objects.all(), SEATS, cursor, page_size=2)
+
+        with self.assertNumQueries(1) as context:
+            page, _ = paginate_groups(StudyGroup.objects.all(), SEATS, cursor, page_size=2)
+        self.assertEqual(len(page), 2)
+        self.assertIn('LIMIT 3', context.captured_queries[0]['sql'])
+
+    def test_malformed_cursor_starts_over(self):
+        page, _ = paginate_groups(StudyGroup.objects.all(), NEWEST, 'not a cursor', page_size=3)
+
+        self.assertEqual(page, self.groups[::-1][:3])
+
+    def test_tampered_relevance_offset_starts_over(self):
+        first, _ = paginate_groups(StudyGroup.objects.order_by('id'), RELEVANCE, page_size=3)
+
+        for offset in (-2, 10 ** 6, True):
+            cursor = encode_cursor([offset])
+            page, _ = paginate_groups(StudyGroup.objects.order_by('id'), RELEVANCE, cursor, page_size=3)
+            self.assertEqual(page, first, offset)
+
+    def test_tampered_keyset_value_starts_over(self):
+        first, _ = paginate_groups(StudyGroup.objects.all(), MEMBERS, page_size=3)
+
+        for position in (['2', self.groups[3].pk], [None, self.groups[3].pk], [2, 'x']):
+            page, _ = paginate_groups(StudyGroup.objects.all(), MEMBERS, encode_cursor(position), page_size=3)
+            self.assertEqual(page, first, position)
+        bad_date = encode_cursor(['2024-13-40T00:00:00', 1])
+        page, _ = paginate_groups(StudyGroup.objects.all(), NEWEST, bad_date, page_size=3)
+        self.assertEqual(page, self.groups[::-1][:3])
+
+    @override_settings(STORAGES=LOCAL_STORAGES, GROUP_BROWSE_PAGE_SIZE=4)
+    def test_json_endpoint_continues_the_page(self):
+        self.client.force_login(self.creator)
+        response = self.client.get(reverse('groups:browse_groups'), {'sort': 'newest'})
+        self.assertEqual(list(response.context['groups']), self.groups[::-1][:4])
+
+        data = self.client.get(
+            reverse('groups:browse_groups_page'), {'sort': 'newest', 'cursor': response.context['next_cursor']}
+        ).json()
+
+        self.assertEqual([group['id'] for group in data['groups']], [group.pk for group in self.groups[::-1][4:]])
+        self.assertIsNone(data['next_cursor'])
+        self.assertIn('Group 0', data['html'])
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user(username='bob', password='pass12345')
+        self.algebra = make_group(self.creator, 'Algebra', max_capacity=3, meeting_days='Monday, Wednesday')
+        self.calculus = make_group(self.creator, 'Calculus Crew', group_type='private', meeting_days='Friday')
+        self.poetry = make_group(self.creator, 'Poetry Circle', course_name='Literature', course_code='LIT 101')
+        for n in range(3):
+            GroupMember.objects.create(user=User.objects.create_user(username=f'student{n}'), group=self.algebra)
+
+    def test_counts_follow_the_filters_in_two_queries(self):
+        groups = apply_facet_filters(StudyGroup.objects.all(), {'course_code': 'MATH 202', 'group_type': 'public'})
+
+        with self.assertNumQueries(2):
+            facets = compute_facets(groups)
+
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(facets['course_code'], [('MATH 202', 'MATH 202', 1)])
+        self.assertEqual(facets['availability'], [('open', 'Has open seats', 0), ('full', 'Full', 1)])
+        self.assertEqual(dict((day, count) for day, _, count in facets['day'])['wednesday'], 1)
+
+    def test_counts_over_search_results(self):
+        facets = compute_facets(search_groups(StudyGroup.objects.all(), 'math'))
+
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['group_type'], [('public', 'Public', 1), ('private', 'Private', 1)])
+
+    def test_cache_is_invalidated_by_committed_changes(self):
+        signature = ['', '', {}]
+        get_facets(StudyGroup.objects.all(), signature)
+        with self.assertNumQueries(0):
+            get_facets(StudyGroup.objects.all(), signature)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GroupMember.objects.filter(group=self.algebra).first().delete()
+
+        facets = get_facets(StudyGroup.objects.all(), signature)
+        self.assertEqual(facets['availability'], [('open', 'Has open seats', 3), ('full', 'Full', 0)])
+
+    @override_settings(STORAGES=LOCAL_STORAGES)
+    def test_browse_page_links_toggle_filters(self):
+        self.client.force_login(self.creator)
+
+        response = self.client.get(reverse('groups:browse_groups'), {'availability': 'open', 'cursor': 'x'})
+
+        self.assertEqual(list(response.context['groups']), [self.poetry, self.calculus])
+        availability = response.context['facet_sections'][2]['options']
+        self.assertEqual([(option['selected'], option['query']) for option in availability], [
+            (True, ''), (False, 'availability=full'),
+        ])
+
+
+class ScheduleTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='bob', password='pass12345')
+        self.morning = make_group(self.creator, 'Morning', meeting_days='Mon, Wednesday', meeting_time=time(8, 0))
+        self.evening = make_group(self.creator, 'Evening', meeting_days='weekends', meeting_time=time(23, 30))
+
+    def test_meeting_fields_become_half_hour_masks(self):
+        self.assertEqual(parse_days('Tuesday & thurs, sat'), [1, 3, 5])
+        self.assertEqual(parse_days('Mondays and Wednesdays'), [0, 2])
+        self.assertEqual(parse_days('Tues/Thurs'), [1, 3])
+        self.assertEqual(parse_days('Sundays, and the odd Friday'), [4, 6])
+        self.assertEqual(self.morning.schedule, (0b11 << 16, 0, 0b11 << 16, 0, 0, 0, 0))
+        # Clipped at midnight
+        self.assertEqual(StudyGroup.objects.get(pk=self.evening.pk).schedule, (0,) * 5 + (1 << 47,) * 2)
+
+        self.morning.meeting_days = 'Friday'
+        self.morning.save(update_fields=['meeting_days'])
+        self.assertEqual(StudyGroup.objects.get(pk=self.morning.pk).schedule, meeting_schedule('Friday', time(8, 0)))
+
+    def test_overlap_filters_in_sql(self):
+        availability = availability_schedule([2, 6], time(8, 30), time(12))
+
+        self.assertEqual(list(StudyGroup.objects.filter(overlap_filter(availability))), [self.morning])
+        self.assertEqual(list(StudyGroup.objects.filter(overlap_filter((0,) * 7))), [])
+        self.assertEqual(schedule_window(availability), ([2, 6], time(8, 30), time(12)))
+
+    @override_settings(STORAGES=LOCAL_STORAGES)
+    def test_browse_fits_schedule(self):
+        profile = self.creator.profile
+        profile.schedule = availability_schedule([5], time(20), time(23, 59))
+        profile.save()
+        self.client.force_login(self.creator)
+
+        response = self.client.get(reverse('groups:browse_groups'), {'fits': '1'})
+
+        self.assertEqual(list(response.context['groups']), [self.evening])
+        self.assertEqual(response.context['facets']['total'], 1)
+
+
+class MembershipTests(TestCase):
+    def setUp(self):
+        tracking_buffer.reset()
+        self.creator = User.objects.create_user(username='bob', password='pass12345')
+        self.group = make_group(self.creator, 'Calculus Crew', max_capacity=10)
+        GroupMember.objects.create(user=self.creator, group=self.group, role='creator')
+        for n in range(8):
+            GroupMember.objects.create(user=User.objects.create_user(username=f'student{n}'), group=self.group)
+
+    def test_resolver_loads_roles_once(self):
+        resolver = MembershipResolver(self.creator)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(resolver.is_member(self.group))
+            self.assertEqual(resolver.role(self.group.pk), 'creator')
+            self.assertFalse(resolver.is_member(self.group.pk + 1))
+
+    @override_settings(STORAGES=LOCAL_STORAGES)
+    def test_group_detail_query_budget(self):
+        self.client.force_login(self.creator)
+
+        # Session, user, group, roles, pending requests, members with profiles, creator, then
+        # the end-of-request tracking flush: user and group checks, the view, its stale score
+        with self.assertNumQueries(11):
+            response = self.client.get(reverse('groups:group_detail', args=[self.group.pk]))
+        self.assertTrue(response.context['is_member'])
+
+
+class MemberCountTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='bob', password='pass12345')
+        self.group = make_group(self.creator, 'Calculus Crew', max_capacity=3)
+        GroupMember.objects.create(user=self.creator, group=self.group, role='creator')
+
+    def member_count(self):
+        return StudyGroup.objects.get(pk=self.group.pk).member_count
+
+    def test_count_follows_joins_leaves_and_cascades(self):
+        alice = User.objects.create_user(username='alice', password='pass12345')
+        carol = User.objects.create_user(username='carol', password='pass12345')
+        GroupMember.objects.create(user=alice, group=self.group)
+        membership = GroupMember.objects.create(user=carol, group=self.group)
+        self.assertEqual(self.member_count(), 3)
+        self.assertTrue(StudyGroup.objects.get(pk=self.group.pk).is_full())
+
+        membership.delete()
+        alice.delete()
+
+        self.assertEqual(self.member_count(), 1)
+
+    def test_saving_a_stale_instance_keeps_the_count(self):
+        stale = StudyGroup.objects.get(pk=self.group.pk)
+        GroupMember.objects.create(user=User.objects.create_user(username='alice'), group=self.group)
+
+        stale.description = 'Edited'
+        stale.save()
+
+        self.assertEqual(self.member_count(), 2)
+
+    def test_can_join_checks_membership_without_loading_members(self):
+        group = StudyGroup.objects.get(pk=self.group.pk)
+        alice = User.objects.create_user(username='alice')
+
+        with self.assertNumQueries(1):
+            self.assertFalse(group.can_join(self.creator))
+        self.assertTrue(group.can_join(alice))
+
+    def test_reconcile_repairs_drift(self):
+        StudyGroup.objects.filter(pk=self.group.pk).update(member_count=7)
+
+        dry_run = StringIO()
+        call_command('reconcile_member_counts', dry_run=True, stdout=dry_run)
+        self.assertIn(f'Group {self.group.pk}: stored 7, actual 1', dry_run.getvalue())
+        self.assertEqual(self.member_count(), 7)
+
+        call_command('reconcile_member_counts', stdout=StringIO())
+        self.assertEqual(self.member_count(), 1)
+
+
+class JoinTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='bob', password='pass12345')
+        self.group = make_group(self.creator, 'Calculus Crew', max_capacity=2)
+        GroupMember.objects.create(user=self.creator, group=self.group, role='creator')
+        self.alice = User.objects.create_user(username='alice', password='pass12345')
+
+    def test_add_member_reports_each_outcome(self):
+        joined = []
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(add_member(self.group, self.alice, on_joined=lambda: joined.append(True)), JOINED)
+            self.assertEqual(joined, [])
+        self.assertEqual(joined, [True])
+
+        self.assertEqual(add_member(self.group, self.alice), ALREADY_MEMBER)
+        self.assertEqual(add_member(self.group, User.objects.create_user(username='carol')), GROUP_FULL)
+        self.assertEqual(StudyGroup.objects.get(pk=self.group.pk).member_count, 2)
+
+    def test_join_notifies_members_after_commit(self):
+        self.client.force_login(self.alice)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('groups:join_group', args=[self.group.pk]))
+
+        self.assertTrue(GroupMember.objects.filter(group=self.group, user=self.alice).exists())
+        self.assertTrue(Notification.objects.filter(recipient=self.creator, notification_type='new_member').exists())
+
+    def test_approve_request_respects_capacity(self):
+        join_request = JoinRequest.objects.create(user=self.alice, group=self.group)
+        late = JoinRequest.objects.create(user=User.objects.create_user(username='carol'), group=self.group)
+        self.client.force_login(self.creator)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('groups:approve_request', args=[join_request.pk]))
+            self.client.post(reverse('groups:approve_request', args=[late.pk]))
+
+        join_request.refresh_from_db()
+        late.refresh_from_db()
+        self.assertEqual((join_request.status, late.status), ('approved', 'pending'))
+        self.assertTrue(Notification.objects.filter(recipient=self.alice, notification_type='request_approved').exists())
+        self.assertEqual(StudyGroup.objects.get(pk=self.group.pk).member_count, 2)
+
+
+class WaitlistTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='bob', password='pass12345')
+        self.group = make_group(self.creator, 'Calculus Crew', max_capacity=3)
+        GroupMember.objects.create(user=self.creator, group=self.group, role='creator')
+        self.members = [User.objects.create_user(username=f'member{n}') for n in range(2)]
+        for member in self.members:
+            GroupMember.objects.create(user=member, group=self.group)
+        self.waiting = [User.objects.create_user(username=f'waiting{n}') for n in range(3)]
+        for user in self.waiting:
+            self.assertEqual(join_or_wait(self.group, user), WAITLISTED)
+
+    def test_queue_positions_follow_join_order(self):
+        self.assertEqual([waitlist_position(self.group, user) for user in self.waiting], [1, 2, 3])
+        self.assertIsNone(waitlist_position(self.group, self.creator))
+        # Joining again keeps the original place
+        self.assertEqual(join_or_wait(self.group, self.waiting[0]), WAITLISTED)
+        self.assertEqual(waitlist_position(self.group, self.waiting[0]), 1)
+
+    def test_leaving_promotes_the_head_and_notifies_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(remove_member(self.group, self.members[0]))
+
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, 3)
+        self.assertTrue(GroupMember.objects.filter(group=self.group, user=self.waiting[0]).exists())
+        self.assertEqual([waitlist_position(self.group, user) for user in self.waiting], [None, 1, 2])
+        self.assertTrue(Notification.objects.filter(
+            recipient=self.waiting[0], notification_type='waitlist_promoted'
+        ).exists())
+
+    def test_raising_capacity_promotes_in_order(self):
+        self.group.max_capacity = 5
+        self.group.save()
+
+        self.assertEqual(self.group.waitlist.get().user, self.waiting[2])
+        self.assertEqual(StudyGroup.objects.get(pk=self.group.pk).member_count, 5)
+
+    def test_promotion_skips_users_who_already_joined(self):
+        WaitlistEntry.objects.filter(user=self.waiting[0]).delete()
+        GroupMember.objects.filter(user=self.members[0]).delete()
+        GroupMember.objects.create(user=self.waiting[1], group=self.group)
+        GroupMember.objects.filter(user=self.members[1]).delete()
+
+        self.assertEqual(promote_from_waitlist(self.group), [self.waiting[2]])
+        self.assertFalse(self.group.waitlist.exists())
+
+    @override_settings(STORAGES=LOCAL_STORAGES)
+    def test_join_and_leave_waitlist_views(self):
+        tracking_buffer.reset()
+        student = User.objects.create_user(username='student', password='pass12345')
+        self.client.force_login(student)
+
+        self.client.get(reverse('groups:join_group', args=[self.group.pk]))
+        response = self.client.get(reverse('groups:group_detail', args=[self.group.pk]))
+        self.assertEqual(response.context['waitlist_position'], 4)
+        self.assertEqual(response.context['waitlist_size'], 4)
+
+        self.client.get(reverse('groups:leave_waitlist', args=[self.group.pk]))
+        self.assertIsNone(waitlist_position(self.group, student))
+
+
+class RequestInboxTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='bob', password='pass12345')
+        self.small = make_group(self.creator, 'Calculus Crew', max_capacity=3, group_type='private')
+        self.large = make_group(self.creator, 'Physics Pals', max_capacity=10, group_type='private')
+        for group in (self.small, self.large):
+            GroupMember.objects.create(user=self.creator, group=group, role='creator')
+        GroupMember.objects.create(user=User.objects.create_user(username='member'), group=self.small)
+        self.requests = [
+            JoinRequest.objects.create(user=User.objects.create_user(username=f'student{n}'), group=group)
+            for n, group in enumerate([self.small, self.large] * 3)
+        ]
+
+    def test_pages_across_groups_by_cursor(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = paginate_requests(inbox_requests(self.creator), cursor, page_size=4)
+            seen.extend(join_request.pk for join_request in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [join_request.pk for join_request in reversed(self.requests)])
+
+    def test_counts_pending_per_group_in_one_query(self):
+        JoinRequest.objects.filter(pk=self.requests[1].pk).update(status='rejected')
+
+        with self.assertNumQueries(1):
+            counts = pending_counts(self.creator)
+        self.assertEqual(
+            [(row['name'], row['pending'], row['open_seats']) for row in counts],
+            [('Calculus Crew', 3, 1), ('Physics Pals', 2, 9)],
+        )
+
+    def test_bulk_approve_respects_capacity(self):
+        ids = [join_request.pk for join_request in self.requests]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resolved, skipped = resolve_requests(self.creator, ids, APPROVE)
+
+        # The small group has one seat, which goes to its oldest request
+        self.assertEqual(len(resolved), 4)
+        self.assertEqual([join_request.pk for join_request in skipped], [self.requests[2].pk, self.requests[4].pk])
+        self.assertEqual(StudyGroup.objects.get(pk=self.small.pk).member_count, 3)
+        self.assertEqual(StudyGroup.objects.get(pk=self.large.pk).member_count, 4)
+        self.assertEqual(JoinRequest.objects.filter(status='pending').count(), 2)
+        self.assertEqual(Notification.objects.filter(notification_type='request_approved').count(), 4)
+
+    def test_bulk_approve_runs_membership_signals(self):
+        outsider = User.objects.create_user(username='outsider')
+        RecommendationScore.objects.create(user=outsider, group=self.large, score=10)
+        large_requests = [join_request for join_request in self.requests if join_request.group_id == self.large.pk]
+
+        resolve_requests(self.creator, [join_request.pk for join_request in large_requests], APPROVE)
+
+        large_counts = CohortGroupCount.objects.filter(group=self.large)
+        self.assertEqual(sum_cohort_counts(large_counts), {self.large.pk: 4})
+        self.assertTrue(RecommendationScore.objects.get(user=outsider, group=self.large).is_stale)
+
+        GroupMember.objects.filter(user__in=[join_request.user for join_request in large_requests[:2]]).delete()
+        self.assertEqual(sum_cohort_counts(large_counts), {self.large.pk: 2})
+
+    def test_bulk_reject_ignores_other_creators_requests(self):
+        other = User.objects.create_user(username='alice', password='pass12345')
+        ids = [join_request.pk for join_request in self.requests]
+
+        self.assertEqual(resolve_requests(other, ids, REJECT), ([], []))
+        resolved, _ = resolve_requests(self.creator, ids[:2], REJECT)
+        self.assertEqual(len(resolved), 2)
+        self.assertEqual(JoinRequest.objects.filter(status='rejected').count(), 2)
+
+    @override_settings(STORAGES=LOCAL_STORAGES, GROUP_INBOX_PAGE_SIZE=4)
+    def test_inbox_views(self):
+        self.client.force_login(self.creator)
+
+        response = self.client.get(reverse('groups:request_inbox'))
+        self.assertEqual(len(response.context['join_requests']), 4)
+        data = self.client.get(reverse('groups:request_inbox_page'), {'cursor': response.context['next_cursor']}).json()
+        self.assertEqual([row['id'] for row in data['requests']], [self.requests[1].pk, self.requests[0].pk])
+        self.assertIsNone(data['next_cursor'])
+
+        self.client.post(reverse('groups:resolve_request_batch'), {
+            'action': APPROVE, 'request_ids': [self.requests[0].pk, self.requests[1].pk],
+        })
+        self.assertEqual(JoinRequest.objects.filter(status='approved').count(), 2)
+
+
+class ConcurrentJoinTests(TransactionTestCase):
+    def test_concurrent_joins_never_exceed_capacity(self):
+        creator = User.objects.create_user(username='bob')
+        group = make_group(creator, 'Calculus Crew', max_capacity=5)
+        GroupMember.objects.create(user=creator, group=group, role='creator')
+        students = [User.objects.create_user(username=f'student{n}') for n in range(20)]
+        outcomes = []
+        start = threading.Barrier(len(students))
+
+        def join(student):
+            start.wait()
+            try:
+                while True:
+                    try:
+                        outcomes.append(add_member(group, student))
+                        return
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting; retry like a new request
+                        continue
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=join, args=(student,)) for student in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        group.refresh_from_db()
+        self.assertEqual(outcomes.count(JOINED), 4)
+        self.assertEqual(outcomes.count(GROUP_FULL), 16)
+        self.assertEqual(group.member_count, 5)
+        self.assertEqual(GroupMember.objects.filter(group=group).count(), 5)
+
+    def test_concurrent_leaves_promote_each_waiting_user_once(self):
+        creator = User.objects.create_user(username='bob')
+        group = make_group(creator, 'Calculus Crew', max_capacity=10)
+        GroupMember.objects.create(user=creator, group=group, role='creator')
+        members = [User.objects.create_user(username=f'member{n}') for n in range(9)]
+        for member in members:
+            GroupMember.objects.create(user=member, group=group)
+        waiting = [User.objects.create_user(username=f'waiting{n}') for n in range(12)]
+        for user in waiting:
+            join_or_wait(group, user)
+        start = threading.Barrier(len(members))
+
+        def leave(member):
+            start.wait()
+            try:
+                while True:
+                    try:
+                        remove_member(group, member)
+                        return
+                    except OperationalError:
+                        continue
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=leave, args=(member,)) for member in members]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        group.refresh_from_db()
+        self.assertEqual(group.member_count, 10)
+        self.assertEqual(
+            set(GroupMember.objects.filter(group=group).exclude(user=creator).values_list('user', flat=True)),
+            {user.pk for user in waiting[:9]},
+        )
+        self.assertEqual(list(group.waitlist.values_list('user', flat=True)), [user.pk for user in waiting[9:]])
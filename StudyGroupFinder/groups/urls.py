@@ -6,11 +6,16 @@ app_name = 'groups'
 urlpatterns = [
     path('create/', views.create_group, name='create_group'),
     path('browse/', views.browse_groups, name='browse_groups'),
+    path('browse/more/', views.browse_groups_page, name='browse_groups_page'),
     path('my-groups/', views.my_groups, name='my_groups'),
     path('<int:pk>/', views.group_detail, name='group_detail'),
     path('<int:pk>/join/', views.join_group, name='join_group'),
     path('<int:pk>/leave/', views.leave_group, name='leave_group'),
+    path('<int:pk>/waitlist/leave/', views.leave_waitlist, name='leave_waitlist'),
     path('<int:pk>/delete/', views.delete_group, name='delete_group'),
+    path('requests/', views.request_inbox, name='request_inbox'),
+    path('requests/more/', views.request_inbox_page, name='request_inbox_page'),
+    path('requests/resolve/', views.resolve_request_batch, name='resolve_request_batch'),
     path('request/<int:request_id>/approve/', views.approve_request, name='approve_request'),
     path('request/<int:request_id>/reject/', views.reject_request, name='reject_request'),
 ]
\ No newline at end of file
@@ -0,0 +1,238 @@
+import re
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+MAX_TOKEN_LENGTH = 100
+
+
+def tokenize(text):
+    """Split text into lower-case alphanumeric tokens"""
+    return [token[:MAX_TOKEN_LENGTH] for token in re.findall(r'[a-z0-9]+', text.lower())]
+
+
+def course_code_terms(course_code):
+    """
+    Search terms for a course code: its words, the compact code ("MATH 202"
+    -> "math202") and its letter and digit runs ("MATH202" -> "math", "202"),
+    so a course number finds the group however the code is spaced
+    """
+    code_tokens = tokenize(course_code)
+    terms = set(code_tokens)
+    if len(code_tokens) > 1:
+        terms.add(''.join(code_tokens)[:MAX_TOKEN_LENGTH])
+    for token in code_tokens:
+        terms.update(re.findall(r'[a-z]+|[0-9]+', token))
+    return terms
+
+
+def search_tokens_for(name, course_name, course_code):
+    """Tokens a group is indexed under: words from its name and course name, plus course_code_terms()"""
+    return set(tokenize(name)) | set(tokenize(course_name)) | course_code_terms(course_code)
+
+
+def index_group(group):
+    """Rebuild the search tokens of one group"""
+    from .models import GroupSearchToken
+    GroupSearchToken.objects.filter(group=group).delete()
+    GroupSearchToken.objects.bulk_create([
+        GroupSearchToken(group=group, token=token)
+        for token in search_tokens_for(group.name, group.course_name, group.course_code)
+    ])
+
+
+def filter_groups_by_search(queryset, query):
+    """
+    Narrow a StudyGroup queryset to groups matching a search query.
+    Every word of the query must prefix one of the group's indexed tokens;
+    text inside a word ("culus" in "calculus") deliberately does not match.
+    """
+    from .models import GroupSearchToken
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.none()
+    for token in set(tokens):
+        queryset = queryset.filter(
+            pk__in=GroupSearchToken.objects.filter(token__startswith=token).values('group')
+        )
+    return queryset
+
+
+def match_search_queries(queries):
+    """
+    Resolve several search queries against the index in one lookup.
+    Returns {group_id: first query (in the given order) the group matches}.
+    """
+    from django.db.models import Q
+    from .models import GroupSearchToken
+    query_tokens = [(query, set(tokenize(query))) for query in queries]
+    needles = set().union(*(tokens for _, tokens in query_tokens)) if query_tokens else set()
+    if not needles:
+        return {}
+
+    condition = Q()
+    for needle in needles:
+        condition |= Q(token__startswith=needle)
+
+    # needle -> groups having a token that starts with it
+    groups_by_needle = {needle: set() for needle in needles}
+    for token, group_id in GroupSearchToken.objects.filter(condition).values_list('token', 'group_id'):
+        for needle in needles:
+            if token.startswith(needle):
+                groups_by_needle[needle].add(group_id)
+
+    matches = {}
+    for query, tokens in query_tokens:
+        if not tokens:
+            continue
+        for group_id in set.intersection(*(groups_by_needle[token] for token in tokens)):
+            matches.setdefault(group_id, query)
+    return matches
+
+
+def member_count_subquery(apps=global_apps):
+    """Correlated subquery counting a group's GroupMember rows"""
+    GroupMember = apps.get_model('groups', 'GroupMember')
+    return Subquery(
+        GroupMember.objects.filter(group=OuterRef('pk')).order_by()
+        .values('group').annotate(total=Count('id')).values('total'),
+        output_field=IntegerField(),
+    )
+
+
+def find_member_count_drift(groups=None):
+    """(group id, stored member_count, actual members) for every group whose count drifted"""
+    from .models import StudyGroup
+    groups = StudyGroup.objects.all() if groups is None else groups
+    return list(
+        groups.annotate(actual=Coalesce(member_count_subquery(), 0))
+        .exclude(member_count=F('actual'))
+        .order_by('pk')
+        .values_list('pk', 'member_count', 'actual')
+    )
+
+
+def repair_member_counts(group_ids=None, apps=global_apps):
+    """Recount members in a single UPDATE, so concurrent joins are not lost"""
+    StudyGroup = apps.get_model('groups', 'StudyGroup')
+    groups = StudyGroup.objects.all() if group_ids is None else StudyGroup.objects.filter(pk__in=group_ids)
+    return groups.update(member_count=Coalesce(member_count_subquery(apps), 0))
+
+
+# Outcomes of add_member
+JOINED = 'joined'
+ALREADY_MEMBER = 'already_member'
+GROUP_FULL = 'full'
+WAITLISTED = 'waitlisted'
+
+
+def _lock_group(group):
+    """Take the group row lock until commit (a no-op UPDATE); False if the group is gone"""
+    from .models import StudyGroup
+    return bool(StudyGroup.objects.filter(pk=group.pk).update(member_count=F('member_count')))
+
+
+def add_member(group, user, role='member', on_joined=None):
+    """
+    Add user to group in one transaction without ever exceeding max_capacity.
+
+    A conditional UPDATE on the group row only matches while a seat is free
+    and holds the row lock until commit, so concurrent joins queue behind it
+    and re-check the count. on_joined runs after the transaction commits.
+    """
+    from .models import StudyGroup, GroupMember
+    with transaction.atomic():
+        has_seat = StudyGroup.objects.filter(
+            pk=group.pk, member_count__lt=F('max_capacity')
+        ).update(member_count=F('member_count'))
+        if not has_seat:
+            return ALREADY_MEMBER if GroupMember.objects.filter(group=group, user=user).exists() else GROUP_FULL
+        try:
+            with transaction.atomic():
+                GroupMember.objects.create(user=user, group=group, role=role)
+        except IntegrityError:
+            return ALREADY_MEMBER
+        if on_joined:
+            transaction.on_commit(on_joined)
+    return JOINED
+
+
+def approve_join_request(join_request):
+    """Admit the requester if a seat is free and mark the request approved; returns add_member's outcome"""
+    from notifications.utils import notify_request_approved
+    with transaction.atomic():
+        outcome = add_member(
+            join_request.group, join_request.user, on_joined=lambda: notify_request_approved(join_request)
+        )
+        if outcome != GROUP_FULL:
+            join_request.status = 'approved'
+            join_request.save(update_fields=['status'])
+    return outcome
+
+
+def join_or_wait(group, user, on_joined=None):
+    """
+    add_member, or queue user on the group's waitlist when it is full.
+
+    The group row is locked before the seat check, so a seat freed by a
+    concurrent leave is either taken here or promoted to the queue after
+    this user is on it; returns add_member's outcome or WAITLISTED.
+    """
+    from .models import WaitlistEntry
+    with transaction.atomic():
+        _lock_group(group)
+        outcome = add_member(group, user, on_joined=on_joined)
+        if outcome != GROUP_FULL:
+            return outcome
+        WaitlistEntry.objects.get_or_create(group=group, user=user)
+    return WAITLISTED
+
+
+def waitlist_position(group, user):
+    """user's 1-based place in group's queue, or None; one index range count"""
+    from django.db.models import Subquery
+    from .models import WaitlistEntry
+    mine = WaitlistEntry.objects.filter(group=group, user=user).values('id')
+    return WaitlistEntry.objects.filter(group=group, id__lte=Subquery(mine)).count() or None
+
+
+def promote_from_waitlist(group):
+    """
+    Move users from the head of group's waitlist into free seats; returns them.
+
+    Runs under the group row lock, so concurrent leaves promote one after
+    the other and each free seat goes to exactly one queued user. Promoted
+    users are notified after commit.
+    """
+    from notifications.utils import notify_waitlist_promoted
+    from .models import WaitlistEntry
+    promoted = []
+    with transaction.atomic():
+        if not _lock_group(group):
+            return promoted
+        while True:
+            head = WaitlistEntry.objects.filter(group=group).select_related('user').order_by('id').first()
+            if head is None:
+                break
+            outcome = add_member(
+                group, head.user, on_joined=lambda user=head.user: notify_waitlist_promoted(group, user)
+            )
+            if outcome == GROUP_FULL:
+                break
+            head.delete()
+            if outcome == JOINED:
+                promoted.append(head.user)
+    return promoted
+
+
+def remove_member(group, user):
+    """Delete user's membership and hand the seat to the waitlist in one transaction; False if not a member"""
+    from .models import GroupMember
+    with transaction.atomic():
+        _lock_group(group)
+        deleted, _ = GroupMember.objects.filter(group=group, user=user).delete()
+        if deleted:
+            promote_from_waitlist(group)
+    return bool(deleted)
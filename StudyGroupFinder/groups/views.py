@@ -1,9 +1,21 @@
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 from django.contrib import messages
-from django.db.models import Q, Count
-from .models import StudyGroup, GroupMember, JoinRequest
+from .models import StudyGroup, GroupMember, JoinRequest, WaitlistEntry
 from .forms import StudyGroupForm, JoinRequestForm
+from .facets import apply_facet_filters, get_facets, FACET_FIELDS
+from .inbox import inbox_requests, paginate_requests, pending_counts, resolve_requests, APPROVE, REJECT
+from .membership import get_membership
+from .pagination import paginate_groups, SORT_CHOICES, SORT_KEYS, NEWEST, RELEVANCE
+from .schedule import overlap_filter
+from .search import search_groups
+from .utils import (
+    join_or_wait, remove_member, waitlist_position, approve_join_request, JOINED, ALREADY_MEMBER, GROUP_FULL
+)
 
 @login_required
 def create_group(request):
@@ -25,10 +37,19 @@ def create_group(request):
 def group_detail(request, pk):
     """View group details"""
     group = get_object_or_404(StudyGroup, pk=pk)
-    is_member = request.user in group.members.all()
-    is_creator = group.creator == request.user
-    pending_request = JoinRequest.objects.filter(user=request.user, group=group, status='pending').first()
-    pending_requests = JoinRequest.objects.filter(group=group, status='pending') if is_creator else None
+    is_member = get_membership(request).is_member(group)
+    is_creator = group.creator_id == request.user.pk
+    pending_request = None
+    if not is_member:
+        pending_request = JoinRequest.objects.filter(user=request.user, group=group, status='pending').first()
+    pending_requests = None
+    if is_creator:
+        pending_requests = JoinRequest.objects.filter(group=group, status='pending').select_related('user')
+    # Leaving promotes from the queue, so only a full group can have one
+    position = waiting = None
+    if group.is_full():
+        position = None if is_member else waitlist_position(group, request.user)
+        waiting = group.waitlist.count()
     
     # Track group view for recommendations
     from recommendations.utils import track_group_view
@@ -36,31 +57,105 @@ def group_detail(request, pk):
     
     context = {
         'group': group,
+        'members': group.members.select_related('profile'),
         'is_member': is_member,
         'is_creator': is_creator,
         'pending_request': pending_request,
         'pending_requests': pending_requests,
+        'waitlist_position': position,
+        'waitlist_size': waiting,
     }
     return render(request, 'groups/group_detail.html', context)
 
-@login_required
-def browse_groups(request):
-    """Browse and search groups"""
-    groups = StudyGroup.objects.annotate(member_count=Count('members'))
+def _browse_page(request, with_facets=False):
+    """Filter, sort and paginate groups from the browse query string"""
+    groups = StudyGroup.objects.all()
     search = request.GET.get('search', '')
     location = request.GET.get('location', '')
+    filters = {field: request.GET.get(field, '') for field in FACET_FIELDS}
+    sort = request.GET.get('sort', '')
+    if sort not in SORT_KEYS and not (sort == RELEVANCE and search):
+        sort = RELEVANCE if search else NEWEST
     
-    # Track search query for recommendations
     if search:
-        from recommendations.utils import track_search
-        track_search(request.user, search)
-        groups = groups.filter(Q(name__icontains=search) | Q(course_name__icontains=search) | Q(course_code__icontains=search))
+        groups = search_groups(groups, search)
     if location:
         groups = groups.filter(meeting_location__icontains=location)
+    groups = apply_facet_filters(groups, filters)
+    # Only groups meeting while the student is free, by schedule bitmask overlap
+    availability = request.user.profile.schedule
+    fits_schedule = request.GET.get('fits') == '1' and any(availability)
+    if fits_schedule:
+        groups = groups.filter(overlap_filter(availability))
+    
+    page, next_cursor = paginate_groups(groups, sort, request.GET.get('cursor'))
+    signature = [search, location, filters, availability if fits_schedule else None]
+    return {
+        'groups': page,
+        'facets': get_facets(groups, signature) if with_facets else None,
+        'fits_schedule': fits_schedule,
+        'has_availability': any(availability),
+        'filters': filters,
+        'next_cursor': next_cursor,
+        'search': search,
+        'location': location,
+        'sort': sort,
+        'sort_choices': [choice for choice in SORT_CHOICES if choice[0] != RELEVANCE or search],
+    }
+
+def _facet_sections(request, facets):
+    """Facet options with the query string that toggles each one (and restarts paging)"""
+    titles = {'course_code': 'Course', 'group_type': 'Type', 'availability': 'Availability', 'day': 'Meeting day'}
+    sections = []
+    for field in FACET_FIELDS:
+        options = []
+        for value, label, count in facets[field]:
+            params = request.GET.copy()
+            params.pop('cursor', None)
+            selected = params.get(field) == value
+            if selected:
+                params.pop(field)
+            else:
+                params[field] = value
+            options.append({'label': label, 'count': count, 'selected': selected, 'query': params.urlencode()})
+        sections.append({'title': titles[field], 'options': options})
+    return sections
+
+@login_required
+def browse_groups(request):
+    """Browse and search groups"""
+    context = _browse_page(request, with_facets=True)
+    context['facet_sections'] = _facet_sections(request, context['facets'])
+    
+    # Track search query for recommendations (the first page only, not every scroll)
+    if context['search'] and not request.GET.get('cursor'):
+        from recommendations.utils import track_search
+        track_search(request.user, context['search'])
     
-    context = {'groups': groups, 'search': search, 'location': location}
     return render(request, 'groups/browse_groups.html', context)
 
+@login_required
+def browse_groups_page(request):
+    """Next page of browse results for infinite scroll"""
+    context = _browse_page(request)
+    return JsonResponse({
+        'groups': [
+            {
+                'id': group.pk,
+                'name': group.name,
+                'course_code': group.course_code,
+                'group_type': group.group_type,
+                'member_count': group.member_count,
+                'max_capacity': group.max_capacity,
+                'meeting_location': group.meeting_location,
+                'url': reverse('groups:group_detail', args=[group.pk]),
+            }
+            for group in context['groups']
+        ],
+        'html': render_to_string('groups/_group_cards.html', context, request=request),
+        'next_cursor': context['next_cursor'],
+    })
+
 @login_required
 def my_groups(request):
     """View user's groups"""
@@ -76,7 +171,20 @@ def join_group(request, pk):
     """Join a group"""
     group = get_object_or_404(StudyGroup, pk=pk)
     
-    if request.user in group.members.all():
+    if group.group_type == 'public':
+        # Notify existing members once the membership is committed
+        from notifications.utils import notify_new_member
+        outcome = join_or_wait(group, request.user, on_joined=lambda: notify_new_member(group, request.user))
+        if outcome == JOINED:
+            messages.success(request, 'You joined the group!')
+        elif outcome == ALREADY_MEMBER:
+            messages.warning(request, 'You are already a member!')
+        else:
+            position = waitlist_position(group, request.user)
+            messages.info(request, f'Group is full. You are #{position} on the waitlist.')
+        return redirect('groups:group_detail', pk=pk)
+    
+    if group.groupmember_set.filter(user=request.user).exists():
         messages.warning(request, 'You are already a member!')
         return redirect('groups:group_detail', pk=pk)
     
@@ -84,20 +192,12 @@ def join_group(request, pk):
         messages.error(request, 'Group is full!')
         return redirect('groups:group_detail', pk=pk)
     
-    if group.group_type == 'public':
-        GroupMember.objects.create(user=request.user, group=group)
-        messages.success(request, 'You joined the group!')
-        
-        # Notify new member
-        from notifications.utils import notify_new_member
-        notify_new_member(group, request.user)
-    else:
-        join_request, created = JoinRequest.objects.get_or_create(user=request.user, group=group)
-        if created:
-            # Notify group creator about join request
-            from notifications.utils import notify_join_request
-            notify_join_request(join_request)
-        messages.info(request, 'Join request sent!')
+    join_request, created = JoinRequest.objects.get_or_create(user=request.user, group=group)
+    if created:
+        # Notify group creator about join request
+        from notifications.utils import notify_join_request
+        notify_join_request(join_request)
+    messages.info(request, 'Join request sent!')
     
     return redirect('groups:group_detail', pk=pk)
 
@@ -109,10 +209,19 @@ def leave_group(request, pk):
         messages.error(request, 'Creator cannot leave. Delete the group instead.')
         return redirect('groups:group_detail', pk=pk)
     
-    GroupMember.objects.filter(user=request.user, group=group).delete()
+    # The freed seat goes to the head of the waitlist in the same transaction
+    remove_member(group, request.user)
     messages.success(request, 'You left the group.')
     return redirect('groups:my_groups')
 
+@login_required
+def leave_waitlist(request, pk):
+    """Give up a place on a group's waitlist"""
+    group = get_object_or_404(StudyGroup, pk=pk)
+    WaitlistEntry.objects.filter(group=group, user=request.user).delete()
+    messages.success(request, 'You left the waitlist.')
+    return redirect('groups:group_detail', pk=pk)
+
 @login_required
 def delete_group(request, pk):
     """Delete group (creator only)"""
@@ -124,11 +233,10 @@ def delete_group(request, pk):
 @login_required
 def approve_request(request, request_id):
     """Approve join request"""
-    join_req = get_object_or_404(JoinRequest, pk=request_id, group__creator=request.user)
-    if not join_req.group.is_full():
-        GroupMember.objects.create(user=join_req.user, group=join_req.group)
-        join_req.status = 'approved'
-        join_req.save()
+    join_req = get_object_or_404(
+        JoinRequest.objects.select_related('user', 'group'), pk=request_id, group__creator=request.user
+    )
+    if approve_join_request(join_req) != GROUP_FULL:
         messages.success(request, f'{join_req.user.username} approved!')
     else:
         messages.error(request, 'Group is full!')
@@ -141,4 +249,54 @@ def reject_request(request, request_id):
     join_req.status = 'rejected'
     join_req.save()
     messages.info(request, 'Request rejected.')
-    return redirect('groups:group_detail', pk=join_req.group.pk)
\ No newline at end of file
+    return redirect('groups:group_detail', pk=join_req.group.pk)
+
+def _inbox_page(request):
+    """One page of the creator's pending requests from the cursor query string"""
+    join_requests, next_cursor = paginate_requests(inbox_requests(request.user), request.GET.get('cursor'))
+    return {'join_requests': join_requests, 'next_cursor': next_cursor}
+
+@login_required
+def request_inbox(request):
+    """Pending join requests across all of the creator's groups"""
+    context = _inbox_page(request)
+    context['group_counts'] = pending_counts(request.user)
+    return render(request, 'groups/request_inbox.html', context)
+
+@login_required
+def request_inbox_page(request):
+    """Next page of the request inbox"""
+    context = _inbox_page(request)
+    return JsonResponse({
+        'requests': [
+            {
+                'id': join_request.pk,
+                'user': join_request.user.username,
+                'group': {'id': join_request.group_id, 'name': join_request.group.name},
+                'message': join_request.message,
+                'created_at': join_request.created_at.isoformat(),
+            }
+            for join_request in context['join_requests']
+        ],
+        'html': render_to_string('groups/_inbox_rows.html', context, request=request),
+        'next_cursor': context['next_cursor'],
+    })
+
+@login_required
+@require_POST
+def resolve_request_batch(request):
+    """Approve or reject the selected join requests in one go"""
+    action = request.POST.get('action')
+    request_ids = [value for value in request.POST.getlist('request_ids') if value.isdigit()]
+    if action not in (APPROVE, REJECT) or not request_ids:
+        messages.error(request, 'Select at least one request.')
+        return redirect('groups:request_inbox')
+    
+    resolved, skipped = resolve_requests(request.user, request_ids, action)
+    if action == APPROVE:
+        messages.success(request, f'{len(resolved)} request(s) approved.')
+        if skipped:
+            messages.warning(request, f'{len(skipped)} request(s) left pending: the group is full.')
+    else:
+        messages.info(request, f'{len(resolved)} request(s) rejected.')
+    return redirect('groups:request_inbox')
@@ -0,0 +1,34 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from jobs.queue import run_pending_jobs, purge_finished_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs, polling for new ones until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no jobs are due')
+        parser.add_argument('--batch-size', type=int, default=100, help='Jobs claimed per round')
+        parser.add_argument('--sleep', type=float, default=getattr(settings, 'JOB_POLL_INTERVAL', 2),
+                            help='Seconds to wait when no jobs are due')
+
+    def handle(self, *args, **options):
+        retention = timedelta(days=getattr(settings, 'JOB_RETENTION_DAYS', 7))
+        succeeded = failed = 0
+        try:
+            while True:
+                done, errors = run_pending_jobs(limit=options['batch_size'])
+                succeeded += done
+                failed += errors
+                if done or errors:
+                    continue
+                purge_finished_jobs(retention)
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Ran {succeeded} jobs ({failed} failed and will retry or gave up)'))
@@ -0,0 +1,183 @@
+"""
+Durable, database-backed job queue.
+
+Handlers are registered by name with @register (each app keeps its handlers
+in <app>/jobs.py). enqueue() inserts a Job row in the caller's transaction,
+so a job only becomes visible once the work that queued it has committed.
+The run_jobs worker claims due jobs with a conditional UPDATE, so two
+workers never run the same job, and runs each handler in one transaction
+with marking it done. Failures retry with exponential backoff until
+max_attempts; jobs whose worker died are reclaimed after JOB_LOCK_TIMEOUT.
+
+An idempotency key coalesces: while a job with that key is still pending,
+enqueueing it again merges the new payload into the waiting job (through
+the handler's coalesce function) instead of adding another row.
+
+Hosts without a worker process (Vercel) set JOBS_RUN_INLINE: each due job
+then runs right after the transaction that queued it commits, still through
+its Job row. Retries and jobs with a later run_at wait for the next
+`run_jobs --once`.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# name -> (handler, coalesce)
+_handlers = {}
+
+
+def register(name, coalesce=None):
+    """
+    Decorator registering handler(**payload) under name.
+    coalesce(pending payload, new payload) returns the merged payload for a
+    repeated idempotency key; without it the pending payload is kept.
+    """
+    def decorator(handler):
+        _handlers[name] = (handler, coalesce)
+        return handler
+    return decorator
+
+
+def _merge_pending(name, key, payload):
+    """Fold payload into the pending job with key; None if there is none"""
+    # The no-op UPDATE locks the row, so a worker cannot claim it mid-merge
+    if not Job.objects.filter(idempotency_key=key, status=Job.PENDING).update(attempts=F('attempts')):
+        return None
+    job = Job.objects.get(idempotency_key=key, status=Job.PENDING)
+    coalesce = _handlers[name][1] if name in _handlers else None
+    if coalesce:
+        job.payload = coalesce(job.payload, payload)
+        job.save(update_fields=['payload'])
+    return job
+
+
+def _run_inline(pk):
+    """Claim and run one job after the request that queued it committed"""
+    now = timezone.now()
+    if Job.objects.filter(pk=pk, status=Job.PENDING, run_at__lte=now).update(
+        status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1
+    ):
+        run_job(Job.objects.get(pk=pk))
+
+
+def _queue(name, key, payload, run_at):
+    if key is not None:
+        job = _merge_pending(name, key, payload)
+        if job is not None:
+            return job
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name, payload=payload, idempotency_key=key, run_at=run_at or timezone.now(),
+                max_attempts=getattr(settings, 'JOB_MAX_ATTEMPTS', 5),
+            )
+    except IntegrityError:
+        # A concurrent enqueue created the pending job first
+        job = _merge_pending(name, key, payload)
+        if job is None:
+            raise
+        return job
+
+
+def enqueue(name, payload=None, key=None, run_at=None):
+    """Queue a job; returns it, or the pending job with the same key that it merged into"""
+    if name not in _handlers:
+        raise KeyError(f'No job handler registered as {name!r}')
+    payload = payload or {}
+    with transaction.atomic():
+        job = _queue(name, key, payload, run_at)
+        if getattr(settings, 'JOBS_RUN_INLINE', False):
+            # Jobs merged into one pending row run once; later callbacks find it done
+            transaction.on_commit(lambda: _run_inline(job.pk))
+        return job
+
+
+def _retry_or_fail(job, error):
+    """Schedule the next attempt with exponential backoff, or give up after max_attempts"""
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, finished_at=now, locked_at=None, last_error=error)
+        return
+    delay = getattr(settings, 'JOB_RETRY_BACKOFF', 30) * 2 ** max(job.attempts - 1, 0)
+    while True:
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk).update(
+                    status=Job.PENDING, run_at=now + timedelta(seconds=delay), locked_at=None, last_error=error
+                )
+            return
+        except IntegrityError:
+            # A newer event already queued this key: hand the payload to that job instead
+            with transaction.atomic():
+                pending = _merge_pending(job.name, job.idempotency_key, job.payload)
+                if pending is not None:
+                    Job.objects.filter(pk=job.pk).update(
+                        status=Job.DONE, finished_at=now, locked_at=None,
+                        last_error=f'{error}\nMerged into job {pending.pk} for retry',
+                    )
+                    return
+
+
+def reclaim_stale_jobs(now=None):
+    """Retry jobs claimed by a worker that never finished them; returns how many"""
+    now = now or timezone.now()
+    timeout = timedelta(seconds=getattr(settings, 'JOB_LOCK_TIMEOUT', 600))
+    stale = list(Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - timeout))
+    for job in stale:
+        _retry_or_fail(job, 'Worker stopped before finishing the job')
+    return len(stale)
+
+
+def claim_jobs(limit=100, now=None):
+    """Claim up to limit due jobs for this worker, oldest first"""
+    now = now or timezone.now()
+    due = Job.objects.filter(status=Job.PENDING, run_at__lte=now).order_by('run_at', 'id')
+    claimed = [
+        pk for pk in due.values_list('pk', flat=True)[:limit]
+        # Only one worker's conditional UPDATE moves a job out of pending
+        if Job.objects.filter(pk=pk, status=Job.PENDING).update(
+            status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1
+        )
+    ]
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_at', 'id'))
+
+
+def run_job(job):
+    """Run a claimed job; returns True if it succeeded"""
+    try:
+        if job.name not in _handlers:
+            raise KeyError(f'No job handler registered as {job.name!r}')
+        handler = _handlers[job.name][0]
+        # The handler's writes and the done mark commit together, so a retry never repeats them
+        with transaction.atomic():
+            handler(**job.payload)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.DONE, finished_at=timezone.now(), locked_at=None, last_error=''
+            )
+        return True
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.name, job.attempts)
+        _retry_or_fail(job, traceback.format_exc())
+        return False
+
+
+def run_pending_jobs(limit=100):
+    """Reclaim stale jobs, then run one batch of due jobs; returns (succeeded, failed)"""
+    reclaim_stale_jobs()
+    results = [run_job(job) for job in claim_jobs(limit)]
+    return results.count(True), results.count(False)
+
+
+def purge_finished_jobs(older_than):
+    """Delete done jobs finished more than older_than ago (failed ones are kept for inspection)"""
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=timezone.now() - older_than).delete()
+    return deleted
@@ -0,0 +1,119 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from gamification.models import UserPoints
+from recommendations.tests import make_user
+from .models import Job
+from .queue import register, enqueue, claim_jobs, run_job, run_pending_jobs, reclaim_stale_jobs
+
+calls = []
+
+
+@register('tests.record', coalesce=lambda pending, new: {'values': pending['values'] + new['values']})
+def record(values):
+    if 0 in values:
+        raise ValueError('zero')
+    calls.append(values)
+
+
+@register('tests.flaky')
+def flaky(user_id):
+    # Writes before failing, to check the handler's transaction rolls back
+    UserPoints.objects.create(user_id=user_id, total_points=1)
+    raise RuntimeError('try again')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_pending_key_coalesces_until_claimed(self):
+        first = enqueue('tests.record', {'values': [1]}, key='user:1')
+        second = enqueue('tests.record', {'values': [2]}, key='user:1')
+        other = enqueue('tests.record', {'values': [3]}, key='user:2')
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertNotEqual(first.pk, other.pk)
+        self.assertEqual(Job.objects.get(pk=first.pk).payload, {'values': [1, 2]})
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Job.objects.create(name='tests.record', idempotency_key='user:1')
+
+        self.assertEqual(len(claim_jobs()), 2)
+        # Once the job is running, a new event queues a follow-up job
+        third = enqueue('tests.record', {'values': [4]}, key='user:1')
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_runs_due_jobs_in_order(self):
+        enqueue('tests.record', {'values': [1]})
+        enqueue('tests.record', {'values': [2]}, run_at=timezone.now() + timedelta(hours=1))
+        enqueue('tests.record', {'values': [3]})
+
+        self.assertEqual(run_pending_jobs(), (2, 0))
+        self.assertEqual(calls, [[1], [3]])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+        self.assertEqual(Job.objects.get(status=Job.PENDING).payload, {'values': [2]})
+
+    @override_settings(JOB_MAX_ATTEMPTS=2, JOB_RETRY_BACKOFF=60)
+    def test_failures_back_off_then_give_up(self):
+        user = make_user('alice')
+        job = enqueue('tests.flaky', {'user_id': user.pk})
+
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertFalse(run_job(claim_jobs()[0]))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('try again', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=50))
+        self.assertFalse(UserPoints.objects.filter(user=user).exists())
+
+        self.assertEqual(claim_jobs(), [])
+        [job] = claim_jobs(now=job.run_at)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_retry_merges_into_a_newer_pending_job(self):
+        job = enqueue('tests.record', {'values': [0]}, key='user:1')
+        [claimed] = claim_jobs()
+        newer = enqueue('tests.record', {'values': [2]}, key='user:1')
+
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertFalse(run_job(claimed))
+        self.assertEqual(Job.objects.get(pk=newer.pk).payload, {'values': [2, 0]})
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+
+    def test_stale_running_jobs_are_reclaimed(self):
+        job = enqueue('tests.record', {'values': [1]})
+        claim_jobs()
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(reclaim_stale_jobs(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.PENDING)
+
+    @override_settings(JOB_RETRY_BACKOFF=0)
+    def test_run_jobs_command(self):
+        enqueue('tests.record', {'values': [1]})
+
+        out = StringIO()
+        call_command('run_jobs', '--once', stdout=out)
+        self.assertEqual(calls, [[1]])
+        self.assertIn('Ran 1 jobs', out.getvalue())
+
+    @override_settings(JOBS_RUN_INLINE=True)
+    def test_inline_mode_runs_jobs_once_the_request_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = enqueue('tests.record', {'values': [1]}, key='user:1')
+            enqueue('tests.record', {'values': [2]}, key='user:1')
+            later = enqueue('tests.record', {'values': [3]}, run_at=timezone.now() + timedelta(hours=1))
+            self.assertEqual(calls, [])
+
+        # Coalesced events run once; a job due later waits for run_jobs
+        self.assertEqual(calls, [[1, 2]])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+        self.assertEqual(Job.objects.get(pk=later.pk).status, Job.PENDING)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('session_reminder', 'Session Reminder'), ('join_request', 'Join Request'), ('request_approved', 'Request Approved'), ('request_rejected', 'Request Rejected'), ('new_member', 'New Member'), ('session_created', 'Session Created'), ('session_cancelled', 'Session Cancelled'), ('group_update', 'Group Update'), ('member_left', 'Member Left'), ('waitlist_promoted', 'Waitlist Promoted')], max_length=20),
+        ),
+    ]
@@ -15,6 +15,7 @@ class Notification(models.Model):
         ('session_cancelled', 'Session Cancelled'),
         ('group_update', 'Group Update'),
         ('member_left', 'Member Left'),
+        ('waitlist_promoted', 'Waitlist Promoted'),
     ]
     
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
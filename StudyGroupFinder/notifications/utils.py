@@ -15,6 +15,7 @@ def create_notification(recipient, notification_type, title, message, **kwargs):
         'join_request': prefs.inapp_join_requests,
         'request_approved': prefs.inapp_request_responses,
         'request_rejected': prefs.inapp_request_responses,
+        'waitlist_promoted': prefs.inapp_request_responses,
         'new_member': prefs.inapp_new_members,
         'session_created': prefs.inapp_session_updates,
         'session_cancelled': prefs.inapp_session_updates,
@@ -103,6 +104,18 @@ def notify_request_rejected(join_request):
     )
 
 
+def notify_waitlist_promoted(group, user):
+    """Notify a waitlisted user that a seat opened up and they are now a member"""
+    create_notification(
+        recipient=user,
+        notification_type='waitlist_promoted',
+        title='🎟️ Off the Waitlist!',
+        message=f'A seat opened up in "{group.name}" and you are now a member!',
+        group=group,
+        action_url=reverse('groups:group_detail', kwargs={'pk': group.pk})
+    )
+
+
 def notify_new_member(group, new_member):
     """Notify all group members about new member"""
     for member in group.members.exclude(id=new_member.id):
@@ -133,6 +146,28 @@ def notify_session_created(session):
             )
 
 
+def notify_series_created(series, sessions):
+    """Notify group members about a new session series once, not once per occurrence"""
+    if not sessions:
+        return
+    from groups.schedule import DAY_NAMES
+    first = min(sessions, key=lambda session: session.date)
+    days = ', '.join(DAY_NAMES[day].title() for day in series.days())
+    for member in series.group.members.all():
+        if member != series.created_by:
+            create_notification(
+                recipient=member,
+                notification_type='session_created',
+                title='🔁 New Recurring Sessions',
+                message=f'"{series.title}" now meets every {days} in {series.group.name}: '
+                        f'{len(sessions)} sessions scheduled, starting {first.date.strftime("%B %d")}',
+                session=first,
+                group=series.group,
+                actor=series.created_by,
+                action_url=reverse('user_sessions:group_sessions', kwargs={'group_id': series.group.pk})
+            )
+
+
 def notify_session_cancelled(session):
     """Notify all group members about cancelled session"""
     for member in session.group.members.all():
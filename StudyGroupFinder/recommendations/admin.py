@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SearchHistory, GroupView, RecommendationScore
+from .models import SearchHistory, GroupView, RecommendationScore, RecommendationState, PeerCohort
 
 @admin.register(SearchHistory)
 class SearchHistoryAdmin(admin.ModelAdmin):
@@ -17,7 +17,19 @@ class GroupViewAdmin(admin.ModelAdmin):
 
 @admin.register(RecommendationScore)
 class RecommendationScoreAdmin(admin.ModelAdmin):
-    list_display = ['user', 'group', 'score', 'updated_at']
-    list_filter = ['updated_at']
+    list_display = ['user', 'group', 'score', 'is_stale', 'updated_at']
+    list_filter = ['is_stale', 'updated_at']
     search_fields = ['user__username', 'group__name']
-    readonly_fields = ['created_at', 'updated_at']
\ No newline at end of file
+    readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(RecommendationState)
+class RecommendationStateAdmin(admin.ModelAdmin):
+    list_display = ['user', 'is_dirty', 'refreshed_at']
+    list_filter = ['is_dirty', 'refreshed_at']
+    search_fields = ['user__username']
+
+@admin.register(PeerCohort)
+class PeerCohortAdmin(admin.ModelAdmin):
+    list_display = ['department', 'semester', 'year', 'university']
+    list_filter = ['semester', 'year']
+    search_fields = ['department', 'university']
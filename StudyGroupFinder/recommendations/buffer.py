@@ -0,0 +1,121 @@
+"""
+In-process write buffer for GroupView and SearchHistory.
+
+Repeated (user, group) views and identical (user, query) searches inside
+RECOMMENDATION_TRACKING_WINDOW seconds are coalesced into one row. Accepted
+rows are written with bulk_create at the end of every request, so nothing is
+left in memory for a recycled or crashed worker to lose; the coalescing
+window is per process and only suppresses duplicates. Scoring flushes first,
+so a request always scores against the activity it tracked.
+"""
+import atexit
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from groups.models import StudyGroup
+from .models import SearchHistory, GroupView, RecommendationState
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form used to coalesce searches"""
+    return ' '.join(query.lower().split())
+
+
+class TrackingBuffer:
+    """Coalesces and batches tracking rows; safe to share between threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}  # (user_id, group_id) -> None, in arrival order
+        self._searches = {}  # (user_id, normalized query) -> query as typed
+        self._recent = {}  # Coalescing key -> when it was last accepted
+        self._oldest = None  # When the oldest pending row arrived
+        self.counters = Counter()
+
+    def _accept(self, key, now):
+        """Record a key unless it was already accepted inside the window"""
+        window = getattr(settings, 'RECOMMENDATION_TRACKING_WINDOW', 300)
+        last = self._recent.get(key)
+        if last is not None and now - last < window:
+            self.counters['coalesced'] += 1
+            return False
+        self._recent[key] = now
+        self.counters['buffered'] += 1
+        if self._oldest is None:
+            self._oldest = now
+        return True
+
+    def add_view(self, user_id, group_id):
+        key = (user_id, group_id)
+        with self._lock:
+            if self._accept(('view',) + key, time.monotonic()):
+                self._views[key] = None
+
+    def add_search(self, user_id, query):
+        key = (user_id, normalize_query(query))
+        with self._lock:
+            if self._accept(('search',) + key, time.monotonic()):
+                self._searches[key] = query
+
+    def pending(self):
+        with self._lock:
+            return len(self._views) + len(self._searches)
+
+    def flush(self):
+        """Write every pending row and mark the affected recommendations; returns rows written"""
+        with self._lock:
+            if self._oldest is None:
+                return 0
+            views, self._views = list(self._views), {}
+            searches, self._searches = list(self._searches.items()), {}
+            self._oldest = None
+            # Forget keys whose window has passed
+            cutoff = time.monotonic() - getattr(settings, 'RECOMMENDATION_TRACKING_WINDOW', 300)
+            self._recent = {key: seen for key, seen in self._recent.items() if seen >= cutoff}
+
+        # Users or groups deleted since the row was buffered would fail the whole insert
+        user_ids = set(User.objects.filter(
+            pk__in={user_id for user_id, _ in views} | {user_id for (user_id, _), _ in searches}
+        ).values_list('pk', flat=True))
+        group_ids = set(StudyGroup.objects.filter(
+            pk__in={group_id for _, group_id in views}
+        ).values_list('pk', flat=True))
+        views = [(user_id, group_id) for user_id, group_id in views if user_id in user_ids and group_id in group_ids]
+        searches = [(user_id, query) for (user_id, _), query in searches if user_id in user_ids]
+
+        from .utils import mark_pairs_stale
+        GroupView.objects.bulk_create([GroupView(user_id=user_id, group_id=group_id) for user_id, group_id in views])
+        mark_pairs_stale(views)
+        SearchHistory.objects.bulk_create([SearchHistory(user_id=user_id, query=query) for user_id, query in searches])
+        # A new query can match any group
+        RecommendationState.objects.filter(
+            user_id__in={user_id for user_id, _ in searches}, is_dirty=False
+        ).update(is_dirty=True)
+
+        with self._lock:
+            self.counters['flushed'] += len(views) + len(searches)
+        return len(views) + len(searches)
+
+    def stats(self):
+        """Buffered, coalesced and flushed row counts since start, plus rows still pending"""
+        with self._lock:
+            return {
+                'buffered': self.counters['buffered'],
+                'coalesced': self.counters['coalesced'],
+                'flushed': self.counters['flushed'],
+                'pending': len(self._views) + len(self._searches),
+            }
+
+    def reset(self):
+        """Drop everything, including the coalescing window (used by tests)"""
+        with self._lock:
+            self._views, self._searches, self._recent = {}, {}, {}
+            self._oldest = None
+            self.counters.clear()
+
+
+tracking_buffer = TrackingBuffer()
+atexit.register(tracking_buffer.flush)
@@ -0,0 +1,137 @@
+"""
+Peer cohorts: per-group member counts for students who share a university,
+department, semester and year.
+
+Counts are maintained incrementally from profile and membership changes so
+the "same semester/year" and "similar profile" signals read a handful of
+precomputed rows instead of joining every member's profile.
+"""
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from groups.models import GroupMember
+from .models import PeerCohort, CohortMembership, CohortGroupCount
+
+COHORT_FIELDS = ('university', 'department', 'semester', 'year')
+
+
+def cohort_key(profile):
+    """The cohort lookup for a profile"""
+    return {field: getattr(profile, field) for field in COHORT_FIELDS}
+
+
+def _adjust_counts(cohort_id, group_ids, delta):
+    """Add delta to the cohort's count for each group"""
+    if not group_ids:
+        return
+    if delta > 0:
+        CohortGroupCount.objects.bulk_create(
+            [CohortGroupCount(cohort_id=cohort_id, group_id=group_id) for group_id in group_ids],
+            ignore_conflicts=True,
+        )
+    counts = CohortGroupCount.objects.filter(cohort_id=cohort_id, group_id__in=group_ids)
+    counts.update(member_count=F('member_count') + delta)
+    if delta < 0:
+        counts.filter(member_count__lte=0).delete()
+
+
+def sync_user_cohort(profile):
+    """Make sure the user is counted under their profile's cohort, returning its id"""
+    key = cohort_key(profile)
+    membership = CohortMembership.objects.filter(user_id=profile.user_id).select_related('cohort').first()
+    if membership and cohort_key(membership.cohort) == key:
+        return membership.cohort_id
+
+    with transaction.atomic():
+        cohort, _ = PeerCohort.objects.get_or_create(**key)
+        group_ids = list(GroupMember.objects.filter(user_id=profile.user_id).values_list('group_id', flat=True))
+        if membership:
+            _adjust_counts(membership.cohort_id, group_ids, -1)
+            membership.cohort = cohort
+            membership.save(update_fields=['cohort'])
+        else:
+            CohortMembership.objects.create(user_id=profile.user_id, cohort=cohort)
+        _adjust_counts(cohort.pk, group_ids, 1)
+    return cohort.pk
+
+
+def add_cohort_member(user_id, group_id):
+    """Count a new membership under the member's cohort"""
+    from accounts.models import UserProfile
+    cohort_id = CohortMembership.objects.filter(user_id=user_id).values_list('cohort_id', flat=True).first()
+    if cohort_id is None:
+        # First time this user is seen; syncing also counts the new membership
+        profile = UserProfile.objects.filter(user_id=user_id).first()
+        if profile is not None:
+            sync_user_cohort(profile)
+        return
+    with transaction.atomic():
+        _adjust_counts(cohort_id, [group_id], 1)
+
+
+def remove_cohort_member(user_id, group_id):
+    """Stop counting a membership that is about to be deleted"""
+    cohort_id = CohortMembership.objects.filter(user_id=user_id).values_list('cohort_id', flat=True).first()
+    if cohort_id is not None:
+        with transaction.atomic():
+            _adjust_counts(cohort_id, [group_id], -1)
+
+
+def sum_cohort_counts(counts):
+    """Collapse a CohortGroupCount queryset into a {group_id: member count} dict"""
+    return dict(
+        counts.order_by().values('group').annotate(total=Sum('member_count')).values_list('group', 'total')
+    )
+
+
+def same_level_filter(profile):
+    """Cohorts sharing the profile's semester OR year"""
+    return Q(cohort__semester=profile.semester) | Q(cohort__year=profile.year)
+
+
+def similar_profile_filter(profile):
+    """Cohorts sharing the profile's department AND semester"""
+    return Q(cohort__department=profile.department, cohort__semester=profile.semester)
+
+
+def rebuild_cohorts(apps=global_apps):
+    """
+    Recompute every cohort, membership and count from scratch.
+    Accepts a migration's app registry so the backfill can share it.
+    """
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    Member = apps.get_model('groups', 'GroupMember')
+    Cohort = apps.get_model('recommendations', 'PeerCohort')
+    Membership = apps.get_model('recommendations', 'CohortMembership')
+    GroupCount = apps.get_model('recommendations', 'CohortGroupCount')
+
+    with transaction.atomic():
+        GroupCount.objects.all().delete()
+        Membership.objects.all().delete()
+
+        profiles = list(UserProfile.objects.values_list('user_id', *COHORT_FIELDS))
+        Cohort.objects.bulk_create(
+            [Cohort(**dict(zip(COHORT_FIELDS, key))) for key in {row[1:] for row in profiles}],
+            ignore_conflicts=True,
+        )
+        cohort_ids = {row[1:]: row[0] for row in Cohort.objects.values_list('id', *COHORT_FIELDS)}
+        Membership.objects.bulk_create(
+            [Membership(user_id=row[0], cohort_id=cohort_ids[row[1:]]) for row in profiles], batch_size=1000
+        )
+
+        profile_fields = [f'user__profile__{field}' for field in COHORT_FIELDS]
+        rows = (
+            Member.objects.filter(user__profile__isnull=False).order_by()
+            .values('group', *profile_fields).annotate(total=Count('id'))
+            .values_list('group', *profile_fields, 'total')
+        )
+        GroupCount.objects.bulk_create(
+            [
+                GroupCount(cohort_id=cohort_ids[tuple(row[1:-1])], group_id=row[0], member_count=row[-1])
+                for row in rows
+            ],
+            batch_size=1000,
+        )
+        Cohort.objects.filter(memberships__isnull=True).delete()
+    return len(cohort_ids), len(profiles)
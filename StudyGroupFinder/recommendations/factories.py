@@ -0,0 +1,163 @@
+"""
+factory-boy factories and a synthetic campus generator for benchmarks.
+
+generate_campus() builds users with profiles, groups, memberships, sessions,
+views and searches at any scale. Rows are built with the factories and
+written with bulk_create, then the derived tables that signals normally
+maintain (search tokens, peer cohorts, neighbors) are rebuilt in bulk.
+"""
+import random
+
+import factory
+import factory.random
+from django.contrib.auth.models import User
+from django.db.models import Max
+
+from accounts.models import UserProfile
+from groups.models import StudyGroup, GroupMember, GroupSearchToken
+from groups.schedule import meeting_schedule
+from groups.search import rebuild_search_index
+from groups.utils import search_tokens_for, repair_member_counts
+from user_sessions.models import StudySession
+from .models import SearchHistory, GroupView
+
+DEPARTMENTS = [
+    'Mathematics', 'Physics', 'Computer Science', 'Chemistry', 'Biology', 'Economics',
+    'History', 'Literature', 'Psychology', 'Engineering',
+]
+UNIVERSITIES = ['North Campus University', 'City College', 'Institute of Technology']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+class UserFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f'campus_user_{n}')
+    first_name = factory.Faker('first_name')
+    last_name = factory.Faker('last_name')
+    email = factory.Faker('email')
+    password = '!'  # Unusable; hashing real passwords would dominate generation time
+
+
+class UserProfileFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = UserProfile
+
+    user = factory.SubFactory(UserFactory)
+    university = factory.Faker('random_element', elements=UNIVERSITIES)
+    department = factory.Faker('random_element', elements=DEPARTMENTS)
+    semester = factory.Faker('random_element', elements=[str(semester) for semester in range(1, 9)])
+    year = factory.Faker('random_element', elements=[str(year) for year in range(1, 5)])
+    bio = factory.Faker('sentence')
+
+
+class StudyGroupFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = StudyGroup
+
+    course_name = factory.Faker('random_element', elements=DEPARTMENTS)
+    course_code = factory.LazyAttributeSequence(lambda group, n: f'{group.course_name[:4].upper()} {100 + n % 400}')
+    name = factory.LazyAttribute(lambda group: f'{group.course_code} {group.description.split()[0]} Study Group')
+    description = factory.Faker('sentence')
+    study_topics = factory.Faker('sentence', nb_words=4)
+    max_capacity = factory.Faker('random_int', min=3, max=10)
+    meeting_days = factory.Faker('random_element', elements=DAYS)
+    meeting_time = factory.Faker('time_object')
+    meeting_location = factory.Faker('street_name')
+    group_type = factory.Faker('random_element', elements=['public', 'public', 'private'])
+    creator = factory.SubFactory(UserFactory)
+
+
+class StudySessionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = StudySession
+
+    group = factory.SubFactory(StudyGroupFactory)
+    title = factory.Faker('sentence', nb_words=3)
+    description = factory.Faker('sentence')
+    date = factory.Faker('date_between', start_date='-30d', end_date='+30d')
+    time = factory.Faker('time_object')
+    duration = factory.Faker('random_element', elements=[30, 60, 90, 120])
+    location = factory.Faker('street_name')
+    created_by = factory.SelfAttribute('group.creator')
+
+
+def _bulk_insert(model, rows):
+    """bulk_create rows and return the newly inserted instances, in id order"""
+    last_id = model.objects.aggregate(last=Max('id'))['last'] or 0
+    model.objects.bulk_create(rows, batch_size=1000)
+    return list(model.objects.filter(id__gt=last_id).order_by('id'))
+
+
+def generate_campus(users, groups=None, memberships_per_user=3, views_per_user=5, searches_per_user=2,
+                    session_rate=0.3, seed=42):
+    """Insert a synthetic campus and return row counts per table"""
+    from .cohorts import rebuild_cohorts
+    from .neighbors import rebuild_group_neighbors
+
+    factory.random.reseed_random(seed)
+    rng = random.Random(seed)
+    groups = groups or max(users // 5, 1)
+
+    students = _bulk_insert(User, UserFactory.build_batch(users))
+    # bulk_create skips the post_save signal that normally creates profiles
+    profiles = _bulk_insert(UserProfile, [UserProfileFactory.build(user=student) for student in students])
+    department_of = {profile.user_id: profile.department for profile in profiles}
+
+    built = [StudyGroupFactory.build(creator=rng.choice(students)) for _ in range(groups)]
+    for group in built:
+        # bulk_create skips StudyGroup.save, which derives the weekly schedule
+        group.schedule = meeting_schedule(group.meeting_days, group.meeting_time)
+    catalog = _bulk_insert(StudyGroup, built)
+    by_department = {}
+    for group in catalog:
+        by_department.setdefault(group.course_name, []).append(group)
+
+    # Creators first, then students mostly joining groups of their own department
+    seats = {group.pk: group.max_capacity - 1 for group in catalog}
+    memberships = [GroupMember(user_id=group.creator_id, group=group, role='creator') for group in catalog]
+    joined = {(group.creator_id, group.pk) for group in catalog}
+    for student in students:
+        own_department = by_department.get(department_of[student.pk]) or catalog
+        for _ in range(rng.randint(0, 2 * memberships_per_user)):
+            group = rng.choice(own_department if rng.random() < 0.7 else catalog)
+            if seats[group.pk] > 0 and (student.pk, group.pk) not in joined:
+                seats[group.pk] -= 1
+                joined.add((student.pk, group.pk))
+                memberships.append(GroupMember(user=student, group=group))
+    GroupMember.objects.bulk_create(memberships, batch_size=1000)
+    # bulk_create skips GroupMember.save, which maintains member_count
+    repair_member_counts()
+
+    student_by_id = {student.pk: student for student in students}
+    sessions = [
+        StudySessionFactory.build(group=group, created_by=student_by_id[group.creator_id])
+        for group in catalog if rng.random() < session_rate
+    ]
+    StudySession.objects.bulk_create(sessions, batch_size=1000)
+    GroupView.objects.bulk_create([
+        GroupView(user=student, group=rng.choice(catalog))
+        for student in students for _ in range(rng.randint(0, 2 * views_per_user))
+    ], batch_size=1000)
+    SearchHistory.objects.bulk_create([
+        SearchHistory(user=student, query=rng.choice(rng.choice(catalog).name.split()).lower())
+        for student in students for _ in range(rng.randint(0, 2 * searches_per_user))
+    ], batch_size=1000)
+
+    # Derived tables that signals maintain for single-row writes
+    GroupSearchToken.objects.bulk_create([
+        GroupSearchToken(group=group, token=token)
+        for group in catalog
+        for token in search_tokens_for(group.name, group.course_name, group.course_code)
+    ], batch_size=1000, ignore_conflicts=True)
+    rebuild_search_index()
+    rebuild_cohorts()
+    rebuild_group_neighbors()
+
+    return {
+        'users': len(students),
+        'groups': len(catalog),
+        'memberships': len(memberships),
+        'sessions': len(sessions),
+    }
@@ -0,0 +1,35 @@
+"""
+Background recommendation jobs.
+
+The dashboard serves cached recommendations and queues a recompute through
+the durable job queue, so a worker that is frozen or recycled mid-refresh
+never leaves a cache dirty with nothing scheduled to fix it: the job is
+retried. Refreshes for the same user coalesce into one pending job.
+"""
+from django.contrib.auth.models import User
+from jobs.queue import register, enqueue
+
+REFRESH_USER = 'recommendations.refresh_user'
+
+
+def _merge_refresh(pending, new):
+    # A full rebuild covers a stale-row rescore
+    return {**pending, 'rebuild': pending.get('rebuild', False) or new.get('rebuild', False)}
+
+
+@register(REFRESH_USER, coalesce=_merge_refresh)
+def refresh_user(user_id, rebuild=False):
+    """Rebuild a user's cached recommendations, or rescore only their stale rows"""
+    from .utils import update_recommendation_cache, refresh_stale_recommendations
+    user = User.objects.select_related('profile').filter(pk=user_id).first()
+    if user is None:
+        return
+    if rebuild:
+        update_recommendation_cache(user)
+    else:
+        refresh_stale_recommendations(user)
+
+
+def queue_refresh(user, rebuild=False):
+    """Queue a recompute of user's recommendations"""
+    return enqueue(REFRESH_USER, {'user_id': user.pk, 'rebuild': rebuild}, key=f'{REFRESH_USER}:{user.pk}')
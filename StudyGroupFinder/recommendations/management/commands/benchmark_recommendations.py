@@ -0,0 +1,63 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recommendations.factories import generate_campus
+from recommendations.utils import calculate_recommendations
+from recommendations.vectorized import GroupFeatureMatrix, np
+
+
+class Command(BaseCommand):
+    help = 'Compare the batch and vectorized recommendation engines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=0,
+                            help='Benchmark against a synthetic catalog of this many groups (rolled back afterwards)')
+        parser.add_argument('--users', type=int, default=5, help='Number of users to score')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('The vectorized engine needs NumPy: pip install -r requirements-vectorized.txt')
+        with transaction.atomic():
+            if options['groups']:
+                generate_campus(users=max(options['groups'] // 5, 50), groups=options['groups'], seed=options['seed'])
+            self.run(options['users'], options['limit'])
+            # Never keep synthetic data around
+            transaction.set_rollback(True)
+
+    def run(self, user_count, limit):
+        users = list(User.objects.filter(profile__isnull=False).order_by('-id')[:user_count])
+        if not users:
+            self.stdout.write(self.style.WARNING('No users to score'))
+            return
+
+        started = time.perf_counter()
+        matrix = GroupFeatureMatrix.build()
+        build_seconds = time.perf_counter() - started
+
+        batch_seconds = vectorized_seconds = 0.0
+        mismatches = 0
+        for user in users:
+            started = time.perf_counter()
+            batch = calculate_recommendations(user, limit=limit, engine='batch')
+            batch_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            vectorized = matrix.score(user, limit=limit)
+            vectorized_seconds += time.perf_counter() - started
+
+            if [(rec['group'].pk, rec['score'], rec['reasons']) for rec in batch] != \
+                    [(rec['group'].pk, rec['score'], rec['reasons']) for rec in vectorized]:
+                mismatches += 1
+
+        self.stdout.write(f'Catalog: {len(matrix)} groups, {len(users)} users scored')
+        self.stdout.write(f'Batch engine:      {batch_seconds / len(users) * 1000:.1f} ms/user')
+        self.stdout.write(f'Vectorized engine: {vectorized_seconds / len(users) * 1000:.1f} ms/user '
+                          f'(+{build_seconds * 1000:.1f} ms one-off matrix build)')
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{mismatches} users ranked differently'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Rankings identical'))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recommendations.rollups import compact_tracking
+
+
+class Command(BaseCommand):
+    help = 'Roll GroupView/SearchHistory rows into per-user rollups and delete raw rows past retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int,
+                            default=getattr(settings, 'RECOMMENDATION_TRACKING_RETENTION_DAYS', 90),
+                            help='Keep compacted raw rows this many days')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per transaction')
+        parser.add_argument('--max-batches', type=int, default=1000,
+                            help='Stop after this many batches per table (the rest waits for the next run)')
+
+    def handle(self, *args, **options):
+        result = compact_tracking(
+            retention=timedelta(days=options['retention_days']),
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {result['views_compacted']} views and {result['searches_compacted']} searches; "
+            f"deleted {result['views_deleted']} views and {result['searches_deleted']} searches past retention"
+        ))
@@ -0,0 +1,122 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from recommendations.utils import bulk_update_recommendation_cache
+
+
+def _init_worker():
+    """Make sure a spawned worker has Django loaded"""
+    import django
+    django.setup()
+
+
+def _precompute_chunk(user_ids):
+    """Worker entry point: recompute one chunk of users"""
+    users = User.objects.filter(pk__in=user_ids, profile__isnull=False).select_related('profile')
+    return bulk_update_recommendation_cache(users)
+
+
+class Command(BaseCommand):
+    help = 'Recompute cached recommendations for every active user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (1 runs in-process)')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Users per chunk')
+        parser.add_argument('--since',
+                            help='Only users who logged in since this date/datetime, or within this many days')
+        parser.add_argument('--checkpoint', help='JSON file recording progress, for resuming interrupted runs')
+        parser.add_argument('--resume', action='store_true', help='Skip users already covered by the checkpoint')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True, profile__isnull=False)
+        if options['since']:
+            users = users.filter(last_login__gte=self.parse_since(options['since']))
+
+        checkpoint = options['checkpoint']
+        if options['resume']:
+            if not checkpoint:
+                raise CommandError('--resume needs --checkpoint')
+            last_user_id = self.read_checkpoint(checkpoint)
+            users = users.filter(pk__gt=last_user_id)
+            self.stdout.write(f'Resuming after user {last_user_id}')
+
+        user_ids = list(users.order_by('pk').values_list('pk', flat=True))
+        chunk_size = options['chunk_size']
+        chunks = [user_ids[start:start + chunk_size] for start in range(0, len(user_ids), chunk_size)]
+        if not chunks:
+            self.stdout.write('No users to process')
+            return
+
+        started = time.perf_counter()
+        processed = 0
+        completed = set()
+        watermark = 0
+
+        for index, count in self.run_chunks(chunks, options['workers']):
+            processed += count
+            completed.add(index)
+            # Chunks finish out of order; only checkpoint a contiguous prefix
+            while watermark in completed:
+                watermark += 1
+            if checkpoint and watermark:
+                self.write_checkpoint(checkpoint, chunks[watermark - 1][-1])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{len(completed)}/{len(chunks)} chunks, {processed} users, {processed / elapsed:.1f} users/sec'
+            )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed recommendations for {processed} users in {elapsed:.1f}s '
+            f'({processed / elapsed:.1f} users/sec)'
+        ))
+
+    def run_chunks(self, chunks, workers):
+        """Yield (chunk index, users processed) as chunks finish"""
+        if workers <= 1:
+            for index, chunk in enumerate(chunks):
+                yield index, _precompute_chunk(chunk)
+            return
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(_precompute_chunk, chunk): index for index, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def parse_since(self, value):
+        if value.isdigit():
+            return timezone.now() - timedelta(days=int(value))
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'Invalid --since value: {value}')
+            moment = timezone.datetime(day.year, day.month, day.day)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as checkpoint_file:
+                return json.load(checkpoint_file)['last_user_id']
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, path, last_user_id):
+        # Write-then-rename so an interrupted run never leaves a torn file
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump({'last_user_id': last_user_id, 'updated_at': timezone.now().isoformat()}, checkpoint_file)
+        os.replace(temporary_path, path)
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from recommendations.cohorts import rebuild_cohorts
+
+
+class Command(BaseCommand):
+    help = 'Recompute peer cohort membership counts from profiles and group memberships'
+
+    def handle(self, *args, **options):
+        cohorts, users = rebuild_cohorts()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {cohorts} cohorts covering {users} users'))
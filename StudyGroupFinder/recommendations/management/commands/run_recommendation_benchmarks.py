@@ -0,0 +1,128 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from recommendations.factories import generate_campus
+from recommendations.neighbors import evaluate_hit_rate
+from recommendations.utils import calculate_recommendations, update_recommendation_cache
+from recommendations.views import recommendations_page
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the recommender against synthetic campuses and write a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1000,10000,100000',
+                            help='Comma-separated campus sizes, in users (each is generated then rolled back)')
+        parser.add_argument('--sample-users', type=int, default=20, help='Users timed per operation')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--report', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('-k', type=int, default=10, help='Cut-off for the offline hit-rate evaluation')
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options['scales'].split(',')]
+        except ValueError:
+            raise CommandError(f"Invalid --scales value: {options['scales']}")
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'engine': getattr(settings, 'RECOMMENDATION_ENGINE', 'batch'),
+            'database': connection.vendor,
+            'seed': options['seed'],
+            'runs': [],
+        }
+        for scale in scales:
+            with transaction.atomic():
+                report['runs'].append(self.run_scale(scale, options))
+                # Never keep synthetic data around
+                transaction.set_rollback(True)
+
+        output = json.dumps(report, indent=2)
+        if options['report']:
+            with open(options['report'], 'w') as report_file:
+                report_file.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['report']}"))
+        else:
+            self.stdout.write(output)
+
+    def run_scale(self, scale, options):
+        started = time.perf_counter()
+        campus = generate_campus(users=scale, seed=options['seed'])
+        generate_seconds = time.perf_counter() - started
+        self.stderr.write(f'{scale} users: campus generated in {generate_seconds:.1f}s')
+
+        user_ids = list(User.objects.filter(username__startswith='campus_user_').values_list('pk', flat=True))
+        sample = random.Random(options['seed']).sample(user_ids, min(options['sample_users'], len(user_ids)))
+        users = list(User.objects.filter(pk__in=sample).select_related('profile'))
+
+        operations = {
+            'calculate_recommendations': lambda user: calculate_recommendations(user),
+            'update_recommendation_cache': update_recommendation_cache,
+            'recommendations_page': self.render_page,
+        }
+        run = {
+            'scale': scale,
+            'campus': campus,
+            'generate_seconds': round(generate_seconds, 3),
+            'operations': {name: self.measure(operation, users) for name, operation in operations.items()},
+            'evaluation': evaluate_hit_rate(k=options['k']),
+        }
+        for name, result in run['operations'].items():
+            self.stderr.write(
+                f"  {name}: p50 {result['wall_ms']['p50']} ms, p95 {result['wall_ms']['p95']} ms, "
+                f"{result['queries']['max']} queries, peak {result['peak_memory_kb']} KB"
+            )
+        return run
+
+    def render_page(self, user):
+        """Call the view directly; the test client would need ALLOWED_HOSTS changes"""
+        request = RequestFactory().get('/recommendations/')
+        request.user = user or AnonymousUser()
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        return recommendations_page(request)
+
+    def measure(self, operation, users):
+        """Wall time and query count per call, then peak memory in a separate traced pass"""
+        timings, queries = [], []
+        for user in users:
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                operation(user)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+
+        # tracemalloc slows everything down, so it gets its own pass
+        peak = 0
+        for user in users:
+            tracemalloc.start()
+            operation(user)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'calls': len(users),
+            'wall_ms': {
+                'mean': round(statistics.mean(timings), 2) if timings else 0,
+                'p50': round(timings[len(timings) // 2], 2) if timings else 0,
+                'p95': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2) if timings else 0,
+            },
+            'queries': {
+                'mean': round(statistics.mean(queries), 1) if queries else 0,
+                'max': max(queries, default=0),
+            },
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
@@ -0,0 +1,13 @@
+from .buffer import tracking_buffer
+
+
+class TrackingBufferMiddleware:
+    """Write the request's buffered GroupView/SearchHistory rows before the response leaves"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        tracking_buffer.flush()
+        return response
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_peer_cohorts(apps, schema_editor):
+    from recommendations.cohorts import rebuild_cohorts
+    rebuild_cohorts(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('groups', '0002_groupsearchtoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recommendations', '0002_recommendationscore_is_stale_recommendationstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeerCohort',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('university', models.CharField(blank=True, max_length=200)),
+                ('department', models.CharField(blank=True, max_length=200)),
+                ('semester', models.CharField(blank=True, max_length=1)),
+                ('year', models.CharField(blank=True, max_length=1)),
+            ],
+            options={
+                'unique_together': {('university', 'department', 'semester', 'year')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CohortMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='recommendations.peercohort')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='peer_cohort', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CohortGroupCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('member_count', models.PositiveIntegerField(default=0)),
+                ('cohort', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_counts', to='recommendations.peercohort')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cohort_counts', to='groups.studygroup')),
+            ],
+            options={
+                'unique_together': {('cohort', 'group')},
+            },
+        ),
+        migrations.RunPython(build_peer_cohorts, migrations.RunPython.noop),
+    ]
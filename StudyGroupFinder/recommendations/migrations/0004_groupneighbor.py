@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0002_groupsearchtoken'),
+        ('recommendations', '0003_peer_cohorts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField()),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='groups.studygroup')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='groups.studygroup')),
+            ],
+            options={
+                'ordering': ['-similarity'],
+                'unique_together': {('group', 'neighbor')},
+            },
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
-from groups.models import StudyGroup
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from groups.models import StudyGroup, GroupMember
+from groups.schedule import DAY_FIELDS
+from user_sessions.models import StudySession
+from accounts.models import UserProfile
 
 
 class SearchHistory(models.Model):
@@ -36,6 +41,7 @@ class RecommendationScore(models.Model):
     group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE)
     score = models.FloatField(default=0.0)
     reasons = models.JSONField(default=list)  # List of reasons for recommendation
+    is_stale = models.BooleanField(default=False)  # Needs rescoring before it is served
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -45,3 +51,184 @@ class RecommendationScore(models.Model):
 
     def __str__(self):
         return f"{self.group.name} for {self.user.username}: {self.score}"
+
+
+class RecommendationState(models.Model):
+    """Per-user freshness of the cached RecommendationScore rows"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='recommendation_state')
+    is_dirty = models.BooleanField(default=True)  # Every cached row must be recomputed
+    profile_signature = models.CharField(max_length=500, blank=True)  # Profile fields the scores were built from
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Recommendations for {self.user.username} ({'dirty' if self.is_dirty else 'fresh'})"
+
+
+class PeerCohort(models.Model):
+    """Students sharing a university, department, semester and year"""
+    university = models.CharField(max_length=200, blank=True)
+    department = models.CharField(max_length=200, blank=True)
+    semester = models.CharField(max_length=1, blank=True)
+    year = models.CharField(max_length=1, blank=True)
+
+    class Meta:
+        unique_together = ['university', 'department', 'semester', 'year']
+
+    def __str__(self):
+        return f"{self.department or '-'} / semester {self.semester or '-'} / year {self.year or '-'}"
+
+
+class CohortMembership(models.Model):
+    """The cohort a user's group memberships are currently counted under"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='peer_cohort')
+    cohort = models.ForeignKey(PeerCohort, on_delete=models.CASCADE, related_name='memberships')
+
+    def __str__(self):
+        return f"{self.user.username} in {self.cohort}"
+
+
+class CohortGroupCount(models.Model):
+    """How many members of a cohort belong to a group"""
+    cohort = models.ForeignKey(PeerCohort, on_delete=models.CASCADE, related_name='group_counts')
+    group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='cohort_counts')
+    member_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['cohort', 'group']
+
+    def __str__(self):
+        return f"{self.cohort} in {self.group.name}: {self.member_count}"
+
+
+class GroupNeighbor(models.Model):
+    """Precomputed top-N co-membership neighbors of a group"""
+    group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='+')
+    similarity = models.FloatField()  # Cosine similarity of the two groups' member sets
+
+    class Meta:
+        unique_together = ['group', 'neighbor']
+        ordering = ['-similarity']
+
+    def __str__(self):
+        return f"{self.group.name} -> {self.neighbor.name}: {self.similarity:.2f}"
+
+
+class GroupViewRollup(models.Model):
+    """Compacted GroupView rows: one per (user, group)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='group_view_rollups')
+    group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='view_rollups')
+    view_count = models.PositiveIntegerField(default=0)
+    last_viewed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['user', 'group']
+
+    def __str__(self):
+        return f"{self.user.username} viewed {self.group.name} {self.view_count} times"
+
+
+class SearchQueryRollup(models.Model):
+    """Compacted SearchHistory rows: one per (user, normalized query)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_rollups')
+    normalized_query = models.CharField(max_length=200)
+    query = models.CharField(max_length=200)  # Most recent spelling, shown in reasons
+    search_count = models.PositiveIntegerField(default=0)
+    last_searched_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['user', 'normalized_query']
+        indexes = [models.Index(fields=['user', '-last_searched_at'])]
+
+    def __str__(self):
+        return f"{self.user.username} searched {self.query} {self.search_count} times"
+
+
+class RollupWatermark(models.Model):
+    """Highest raw row id already folded into a rollup table"""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
+
+# Signal to drop the vectorized engine's catalog matrix when the catalog changes
+@receiver([post_save, post_delete], sender=StudyGroup)
+@receiver([post_save, post_delete], sender=GroupMember)
+@receiver([post_save, post_delete], sender=StudySession)
+def invalidate_group_features(sender, **kwargs):
+    """Force the next vectorized scoring pass to reload group features"""
+    from .vectorized import invalidate_feature_matrix
+    invalidate_feature_matrix()
+
+
+# Profile fields that peer cohorts and recommendation scores are built from
+PROFILE_SIGNAL_FIELDS = frozenset(('university', 'department', 'semester', 'year', *DAY_FIELDS))
+
+
+def _profile_fields_saved(update_fields):
+    """Whether a profile save may have written a cohort or scored field"""
+    return update_fields is None or not PROFILE_SIGNAL_FIELDS.isdisjoint(update_fields)
+
+
+# Signals that mark cached recommendations as needing a recompute
+@receiver(post_save, sender=UserProfile)
+def invalidate_profile_recommendations(sender, instance, update_fields=None, **kwargs):
+    """Profile changes can move every score, but only when a scored field changed"""
+    if not _profile_fields_saved(update_fields):
+        return
+    from .utils import mark_user_dirty
+    mark_user_dirty(instance.user, profile=instance)
+
+
+@receiver([post_save, post_delete], sender=GroupMember)
+def invalidate_membership_recommendations(sender, instance, **kwargs):
+    """Membership changes rescore the group for everyone, and for the member themselves"""
+    from .utils import mark_group_stale, mark_scores_stale
+    mark_group_stale(instance.group_id)
+    # Cascades from a deleted group or user have nothing left to rescore
+    origin = kwargs.get('origin')
+    if origin is None or getattr(origin, 'model', type(origin)) is GroupMember:
+        mark_scores_stale(instance.user_id, [instance.group_id])
+
+
+@receiver(post_save, sender=StudyGroup)
+def invalidate_group_recommendations(sender, instance, created, **kwargs):
+    """Capacity or course details changed"""
+    if not created:
+        from .utils import mark_group_stale
+        mark_group_stale(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=StudySession)
+def invalidate_session_recommendations(sender, instance, **kwargs):
+    """Session activity feeds the 'active groups' signal"""
+    from .utils import mark_group_stale
+    mark_group_stale(instance.group_id)
+
+
+# Signals that keep peer cohort counts in step with profiles and memberships
+@receiver(post_save, sender=UserProfile)
+def sync_profile_cohort(sender, instance, update_fields=None, **kwargs):
+    """Move the user's memberships to their new cohort when the profile changes"""
+    if not _profile_fields_saved(update_fields):
+        return
+    from .cohorts import sync_user_cohort
+    sync_user_cohort(instance)
+
+
+@receiver(post_save, sender=GroupMember)
+def count_cohort_member(sender, instance, created, **kwargs):
+    """New member counts toward their cohort"""
+    if created:
+        from .cohorts import add_cohort_member
+        add_cohort_member(instance.user_id, instance.group_id)
+
+
+@receiver(pre_delete, sender=GroupMember)
+def uncount_cohort_member(sender, instance, **kwargs):
+    """Runs before deletion, while a cascading user delete still has the cohort row"""
+    from .cohorts import remove_cohort_member
+    remove_cohort_member(instance.user_id, instance.group_id)
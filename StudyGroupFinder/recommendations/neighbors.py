@@ -0,0 +1,156 @@
+"""
+Item-item collaborative filtering: "students who joined X also joined Y".
+
+Memberships are loaded into a sparse user x group matrix held as NumPy CSR
+arrays, cosine similarities between groups are computed offline and only
+the top neighbors of each group are stored in GroupNeighbor, so online
+scoring is a single indexed lookup. NumPy is only imported by the offline
+build, so serving recommendations does not need it installed.
+"""
+import time
+from collections import defaultdict
+
+from django.db import transaction
+
+from groups.models import GroupMember
+from .models import GroupNeighbor, RecommendationState
+
+# Neighbors kept per group
+NEIGHBORS_PER_GROUP = 20
+
+
+def _csr(rows, columns, row_count):
+    """Compress (row, column) pairs into CSR indptr/indices arrays"""
+    import numpy as np
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(row_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=row_count), out=indptr[1:])
+    return indptr, columns[order]
+
+
+def compute_group_neighbors(pairs, top_n=NEIGHBORS_PER_GROUP):
+    """
+    Top-N cosine neighbors for every group from (user_id, group_id) pairs.
+    Returns {group_id: [(neighbor_id, similarity), ...]}, strongest first.
+    """
+    import numpy as np
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    if not len(pairs):
+        return {}
+    _, user_index = np.unique(pairs[:, 0], return_inverse=True)
+    group_ids, group_index = np.unique(pairs[:, 1], return_inverse=True)
+    user_count = user_index.max() + 1
+
+    # The same matrix twice: user -> groups rows and group -> users rows
+    user_indptr, user_groups = _csr(user_index, group_index, user_count)
+    group_indptr, group_users = _csr(group_index, user_index, len(group_ids))
+    degree = np.diff(group_indptr)
+
+    neighbors = {}
+    for group in range(len(group_ids)):
+        members = group_users[group_indptr[group]:group_indptr[group + 1]]
+        # Gather every group joined by this group's members in one fancy-index
+        starts = user_indptr[members]
+        lengths = user_indptr[members + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        co_members = np.bincount(user_groups[offsets], minlength=len(group_ids))
+        co_members[group] = 0
+
+        candidates = np.flatnonzero(co_members)
+        if not len(candidates):
+            continue
+        similarity = co_members[candidates] / np.sqrt(degree[group] * degree[candidates])
+        if len(candidates) > top_n:
+            keep = np.argpartition(-similarity, top_n - 1)[:top_n]
+            candidates, similarity = candidates[keep], similarity[keep]
+        # Ties broken by group id so rebuilds are deterministic
+        order = np.lexsort((group_ids[candidates], -similarity))
+        neighbors[int(group_ids[group])] = [
+            (int(group_ids[candidates[position]]), float(similarity[position])) for position in order
+        ]
+    return neighbors
+
+
+def rebuild_group_neighbors(top_n=NEIGHBORS_PER_GROUP):
+    """Recompute the GroupNeighbor table from current memberships"""
+    pairs = list(GroupMember.objects.values_list('user_id', 'group_id'))
+    neighbors = compute_group_neighbors(pairs, top_n=top_n)
+    rows = [
+        GroupNeighbor(group_id=group_id, neighbor_id=neighbor_id, similarity=similarity)
+        for group_id, group_neighbors in neighbors.items()
+        for neighbor_id, similarity in group_neighbors
+    ]
+    with transaction.atomic():
+        GroupNeighbor.objects.all().delete()
+        GroupNeighbor.objects.bulk_create(rows, batch_size=1000)
+        # Every cached score may now carry a different co-membership reason
+        RecommendationState.objects.update(is_dirty=True)
+    return len(rows)
+
+
+def co_membership_matches(user):
+    """{group_id: name of the user's group it is most similar to} for the user's neighbors"""
+    rows = (
+        GroupNeighbor.objects.filter(group__groupmember__user=user)
+        .order_by('-similarity', 'group_id')
+        .values_list('neighbor_id', 'group__name')
+    )
+    matches = {}
+    for neighbor_id, source_name in rows:
+        matches.setdefault(neighbor_id, source_name)
+    return matches
+
+
+def _rank(scores, exclude, k):
+    """Top k group ids by score, ties broken by group id"""
+    ranked = sorted((group_id for group_id in scores if group_id not in exclude), key=lambda g: (-scores[g], g))
+    return ranked[:k]
+
+
+def evaluate_hit_rate(k=10, top_n=NEIGHBORS_PER_GROUP):
+    """
+    Hold out each user's most recent join, rebuild neighbors from the rest and
+    measure how often the held-out group lands in the user's top k.
+    Returns hit rates for the neighbor model and a popularity baseline.
+    """
+    joins = defaultdict(list)
+    for user_id, group_id in GroupMember.objects.order_by('user_id', 'joined_at', 'id').values_list(
+        'user_id', 'group_id'
+    ):
+        joins[user_id].append(group_id)
+    if not joins:
+        return {'users': 0, 'hit_rate': 0.0, 'popularity_hit_rate': 0.0, 'build_seconds': 0.0}
+    held_out = {user_id: groups[-1] for user_id, groups in joins.items() if len(groups) >= 2}
+    training = [
+        (user_id, group_id)
+        for user_id, groups in joins.items()
+        for group_id in (groups[:-1] if user_id in held_out else groups)
+    ]
+
+    started = time.perf_counter()
+    neighbors = compute_group_neighbors(training, top_n=top_n)
+    build_seconds = time.perf_counter() - started
+
+    popularity = defaultdict(int)
+    for _, group_id in training:
+        popularity[group_id] += 1
+    # Skipping a user's own groups never reaches past k + their group count
+    most_popular = _rank(popularity, (), k + max(len(groups) for groups in joins.values()))
+
+    hits = popular_hits = 0
+    for user_id, target in held_out.items():
+        joined = set(joins[user_id][:-1])
+        scores = defaultdict(float)
+        for group_id in joined:
+            for neighbor_id, similarity in neighbors.get(group_id, ()):
+                scores[neighbor_id] += similarity
+        hits += target in _rank(scores, joined, k)
+        popular_hits += target in [group_id for group_id in most_popular if group_id not in joined][:k]
+
+    users = len(held_out)
+    return {
+        'users': users,
+        'hit_rate': hits / users if users else 0.0,
+        'popularity_hit_rate': popular_hits / users if users else 0.0,
+        'build_seconds': build_seconds,
+    }
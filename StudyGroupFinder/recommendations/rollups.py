@@ -0,0 +1,163 @@
+"""
+Rollups of the raw GroupView / SearchHistory tracking tables.
+
+compact_tracking folds raw rows into GroupViewRollup and SearchQueryRollup
+in bounded batches, advancing a per-table id watermark, then deletes raw
+rows that are both compacted and older than the retention window. Readers
+combine the rollups with the raw tail above the watermark, so nothing is
+missed between compaction runs.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .buffer import normalize_query
+from .models import SearchHistory, GroupView, GroupViewRollup, SearchQueryRollup, RollupWatermark
+
+GROUP_VIEWS = 'group_views'
+SEARCH_HISTORY = 'search_history'
+
+# Raw rows younger than this are left for the next run, so transactions that
+# committed out of id order are not skipped by the watermark
+COMPACTION_GRACE = timedelta(minutes=1)
+
+
+def get_watermarks():
+    """{table name: last compacted raw id} for both tracking tables"""
+    watermarks = dict(RollupWatermark.objects.values_list('name', 'last_id'))
+    return {name: watermarks.get(name, 0) for name in (GROUP_VIEWS, SEARCH_HISTORY)}
+
+
+def viewed_group_ids(user, watermarks=None):
+    """Ids of every group the user has viewed, compacted or not"""
+    watermarks = watermarks or get_watermarks()
+    return set(GroupViewRollup.objects.filter(user=user).values_list('group_id', flat=True)) | set(
+        GroupView.objects.filter(user=user, id__gt=watermarks[GROUP_VIEWS]).values_list('group_id', flat=True)
+    )
+
+
+def recent_search_queries(user, limit=10, watermarks=None):
+    """The user's most recent distinct queries, newest first"""
+    watermarks = watermarks or get_watermarks()
+    tail = SearchHistory.objects.filter(user=user, id__gt=watermarks[SEARCH_HISTORY]).order_by('-created_at', '-id')
+    rolled = SearchQueryRollup.objects.filter(user=user).order_by('-last_searched_at', '-id')
+    queries = {}
+    for query in [*tail.values_list('query', flat=True)[:limit], *rolled.values_list('query', flat=True)[:limit]]:
+        queries.setdefault(normalize_query(query), query)
+    return list(queries.values())[:limit]
+
+
+def _advance(name, last_id):
+    RollupWatermark.objects.update_or_create(name=name, defaults={'last_id': last_id})
+
+
+def _compact_views(rows):
+    """Fold (id, user_id, group_id, viewed_at) rows into GroupViewRollup"""
+    totals = {}
+    for _, user_id, group_id, viewed_at in rows:
+        count, last = totals.get((user_id, group_id), (0, viewed_at))
+        totals[(user_id, group_id)] = (count + 1, max(last, viewed_at))
+
+    existing = {
+        (rollup.user_id, rollup.group_id): rollup
+        for rollup in GroupViewRollup.objects.filter(
+            user_id__in={user_id for user_id, _ in totals}, group_id__in={group_id for _, group_id in totals}
+        )
+        if (rollup.user_id, rollup.group_id) in totals
+    }
+    created = []
+    for (user_id, group_id), (count, last) in totals.items():
+        rollup = existing.get((user_id, group_id))
+        if rollup is None:
+            created.append(GroupViewRollup(user_id=user_id, group_id=group_id, view_count=count, last_viewed_at=last))
+        else:
+            rollup.view_count += count
+            rollup.last_viewed_at = max(rollup.last_viewed_at, last)
+    GroupViewRollup.objects.bulk_update(existing.values(), ['view_count', 'last_viewed_at'])
+    GroupViewRollup.objects.bulk_create(created)
+
+
+def _compact_searches(rows):
+    """Fold (id, user_id, query, created_at) rows into SearchQueryRollup"""
+    totals = {}
+    for _, user_id, query, created_at in rows:
+        key = (user_id, normalize_query(query)[:200])
+        count, latest_query, last = totals.get(key, (0, query, created_at))
+        if created_at >= last:
+            latest_query, last = query, created_at
+        totals[key] = (count + 1, latest_query, last)
+
+    existing = {
+        (rollup.user_id, rollup.normalized_query): rollup
+        for rollup in SearchQueryRollup.objects.filter(
+            user_id__in={user_id for user_id, _ in totals},
+            normalized_query__in={normalized for _, normalized in totals},
+        )
+        if (rollup.user_id, rollup.normalized_query) in totals
+    }
+    created = []
+    for (user_id, normalized), (count, query, last) in totals.items():
+        rollup = existing.get((user_id, normalized))
+        if rollup is None:
+            created.append(SearchQueryRollup(
+                user_id=user_id, normalized_query=normalized, query=query, search_count=count, last_searched_at=last,
+            ))
+        else:
+            rollup.search_count += count
+            if last >= rollup.last_searched_at:
+                rollup.query, rollup.last_searched_at = query, last
+    SearchQueryRollup.objects.bulk_update(existing.values(), ['query', 'search_count', 'last_searched_at'])
+    SearchQueryRollup.objects.bulk_create(created)
+
+
+def _compact(name, model, fields, time_field, fold, batch_size, max_batches, grace):
+    """Compact one raw table in batches of batch_size; returns rows compacted"""
+    cutoff = timezone.now() - grace
+    compacted = 0
+    for _ in range(max_batches):
+        with transaction.atomic():
+            last_id = get_watermarks()[name]
+            rows = list(
+                model.objects.filter(id__gt=last_id).order_by('id').values_list('id', *fields, time_field)[:batch_size]
+            )
+            # Stop at the first row inside the grace period; the watermark must not pass it
+            fresh = next((index for index, row in enumerate(rows) if row[-1] >= cutoff), None)
+            if fresh is not None:
+                rows = rows[:fresh]
+            if not rows:
+                break
+            fold(rows)
+            _advance(name, rows[-1][0])
+        compacted += len(rows)
+    return compacted
+
+
+def _purge(name, model, time_field, retention, batch_size, max_batches):
+    """Delete compacted raw rows older than the retention window, batch_size at a time"""
+    cutoff = timezone.now() - retention
+    deleted = 0
+    for _ in range(max_batches):
+        ids = list(
+            model.objects.filter(id__lte=get_watermarks()[name], **{f'{time_field}__lt': cutoff})
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        deleted += model.objects.filter(id__in=ids).delete()[0]
+    return deleted
+
+
+def compact_tracking(retention, batch_size=1000, max_batches=1000, grace=COMPACTION_GRACE):
+    """Compact both tracking tables and apply retention; returns per-table counts"""
+    return {
+        'views_compacted': _compact(
+            GROUP_VIEWS, GroupView, ('user_id', 'group_id'), 'viewed_at', _compact_views, batch_size, max_batches, grace,
+        ),
+        'searches_compacted': _compact(
+            SEARCH_HISTORY, SearchHistory, ('user_id', 'query'), 'created_at', _compact_searches,
+            batch_size, max_batches, grace,
+        ),
+        'views_deleted': _purge(GROUP_VIEWS, GroupView, 'viewed_at', retention, batch_size, max_batches),
+        'searches_deleted': _purge(SEARCH_HISTORY, SearchHistory, 'created_at', retention, batch_size, max_batches),
+    }
@@ -1,3 +1,529 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import date, time, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from groups.models import StudyGroup, GroupMember
+from groups.schedule import availability_schedule
+from user_sessions.models import StudySession
+from .models import (
+    SearchHistory, GroupView, RecommendationScore, RecommendationState, CohortGroupCount,
+    GroupViewRollup, SearchQueryRollup,
+)
+from .utils import (
+    calculate_recommendations, refresh_stale_recommendations, track_search, track_group_view,
+    start_recommendation_refresh, save_recommendations, mark_user_dirty, mark_group_stale,
+)
+from .buffer import tracking_buffer
+from .rollups import compact_tracking
+from .neighbors import compute_group_neighbors, rebuild_group_neighbors, evaluate_hit_rate
+from . import vectorized
+from .vectorized import invalidate_feature_matrix
+
+# Keep view tests off Cloudinary
+LOCAL_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def make_user(username, department='', semester='', year=''):
+    user = User.objects.create_user(username=username, password='pass12345')
+    profile = user.profile
+    profile.department = department
+    profile.semester = semester
+    profile.year = year
+    profile.save()
+    return user
+
+
+def make_group(creator, name='Calculus Crew', course_name='Mathematics', course_code='MATH 202', **kwargs):
+    defaults = {
+        'description': 'Weekly problem sets',
+        'study_topics': 'Integrals',
+        'max_capacity': 5,
+        'meeting_days': 'Monday',
+        'meeting_time': time(18, 0),
+        'meeting_location': 'Library',
+    }
+    defaults.update(kwargs)
+    group = StudyGroup.objects.create(
+        name=name, course_name=course_name, course_code=course_code, creator=creator, **defaults
+    )
+    GroupMember.objects.create(user=creator, group=group, role='creator')
+    return group
+
+
+class CalculateRecommendationsTests(TestCase):
+    def setUp(self):
+        self.user = make_user('alice', department='Mathematics', semester='3', year='2')
+
+    def test_scores_every_signal(self):
+        creator = make_user('bob', department='Mathematics', semester='3', year='2')
+        peer = make_user('carol', department='Mathematics', semester='3')
+        group = make_group(creator)
+        GroupMember.objects.create(user=peer, group=group)
+        StudySession.objects.create(
+            group=group, title='Review', description='Chapter 4', date=date(2030, 1, 1),
+            time=time(18, 0), duration=60, location='Library', created_by=creator,
+        )
+        SearchHistory.objects.create(user=self.user, query='math')
+        GroupView.objects.create(user=self.user, group=group)
+
+        recommendations = calculate_recommendations(self.user)
+
+        self.assertEqual(len(recommendations), 1)
+        self.assertEqual(recommendations[0]['group'], group)
+        self.assertEqual(recommendations[0]['score'], 30 + 20 + 25 + 15 + 10 + 5 + 8 + 5)
+        self.assertEqual(recommendations[0]['reasons'], [
+            'Matches your department: Mathematics',
+            '2 students from your semester/year',
+            "Matches your search: 'math'",
+            '2 students with similar profile joined',
+            'You viewed this group recently',
+            'Public group - join instantly',
+            '1 active study sessions',
+            'Active with 2 members',
+        ])
+
+    def test_scores_schedule_overlap(self):
+        creator = make_user('bob')
+        evening = make_group(creator, name='Evening', course_name='Literature', meeting_time=time(18, 0))
+        late = make_group(creator, name='Late', course_name='Literature', meeting_time=time(19, 30))
+        make_group(creator, name='Weekend', course_name='Literature', meeting_days='Sunday')
+        self.user.profile.schedule = availability_schedule([0], time(17), time(20))
+        self.user.profile.save()
+
+        recommendations = {rec['group']: rec for rec in calculate_recommendations(self.user)}
+
+        self.assertEqual(recommendations[evening]['score'], 5 + 10)
+        self.assertIn("Meets when you're free", recommendations[evening]['reasons'])
+        self.assertIn('Partly overlaps your free time', recommendations[late]['reasons'])
+        self.assertEqual(len(recommendations), 3)
+
+    def test_excludes_joined_and_full_groups(self):
+        creator = make_user('bob')
+        joined = make_group(creator, name='Joined')
+        GroupMember.objects.create(user=self.user, group=joined)
+        full = make_group(creator, name='Full', max_capacity=3)
+        for username in ('dan', 'erin'):
+            GroupMember.objects.create(user=make_user(username), group=full)
+        open_group = make_group(creator, name='Open')
+
+        groups = [rec['group'] for rec in calculate_recommendations(self.user)]
+
+        self.assertEqual(groups, [open_group])
+
+    def test_query_count_is_independent_of_catalog_size(self):
+        creator = make_user('bob', department='Mathematics', semester='3')
+        SearchHistory.objects.create(user=self.user, query='math')
+
+        def count_queries():
+            # Drop the cached profile so every run pays for the same lookups
+            self.user = User.objects.get(pk=self.user.pk)
+            with CaptureQueriesContext(connection) as context:
+                calculate_recommendations(self.user)
+            return len(context.captured_queries)
+
+        make_group(creator, name='Group 0')
+        baseline = count_queries()
+
+        for index in range(1, 25):
+            group = make_group(creator, name=f'Group {index}')
+            GroupView.objects.create(user=self.user, group=group)
+
+        self.assertEqual(count_queries(), baseline)
+
+
+class VectorizedRecommendationsTests(TestCase):
+    def setUp(self):
+        # Start from a fresh matrix, as after a committed catalog change
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_feature_matrix()
+        self.user = make_user('alice', department='Physics', semester='2', year='1')
+
+    def summarize(self, recommendations):
+        return [(rec['group'].pk, rec['score'], rec['reasons']) for rec in recommendations]
+
+    def test_matches_batch_engine(self):
+        creator = make_user('bob', department='Physics', semester='2')
+        classmate = make_user('carol', year='1')
+        for index in range(12):
+            group = make_group(
+                creator, name=f'Group {index}',
+                course_name='Physics' if index % 2 else 'Chemistry',
+                course_code=f'PHYS {100 + index}',
+                group_type='public' if index % 3 else 'private',
+                max_capacity=3 + index % 4,
+                meeting_days=['Monday', 'Tuesday, Thursday', 'Saturday'][index % 3],
+                meeting_time=time(9 + index, 30),
+            )
+            if index % 4 == 0:
+                GroupMember.objects.create(user=classmate, group=group)
+            if index == 5:
+                GroupMember.objects.create(user=self.user, group=group)
+        SearchHistory.objects.create(user=self.user, query='phys 10')
+        GroupView.objects.create(user=self.user, group=StudyGroup.objects.get(name='Group 7'))
+        self.user.profile.schedule = availability_schedule([0, 1], time(9), time(16))
+        self.user.profile.save()
+
+        for limit in (3, 5, 20):
+            self.assertEqual(
+                self.summarize(calculate_recommendations(self.user, limit=limit, engine='vectorized')),
+                self.summarize(calculate_recommendations(self.user, limit=limit, engine='batch')),
+            )
+
+    def test_falls_back_to_batch_engine_without_numpy(self):
+        make_group(make_user('bob'), name='Physics', course_name='Physics')
+        self.addCleanup(setattr, vectorized, 'np', vectorized.np)
+        vectorized.np = None
+
+        self.assertEqual(
+            self.summarize(calculate_recommendations(self.user, engine='vectorized')),
+            self.summarize(calculate_recommendations(self.user, engine='batch')),
+        )
+
+    def test_matrix_is_rebuilt_after_catalog_changes(self):
+        creator = make_user('bob')
+        make_group(creator, name='First')
+        self.assertEqual(len(calculate_recommendations(self.user, engine='vectorized')), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_group(creator, name='Second')
+
+        self.assertEqual(len(calculate_recommendations(self.user, engine='vectorized')), 2)
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class IncrementalInvalidationTests(TestCase):
+    def setUp(self):
+        tracking_buffer.reset()
+        self.user = make_user('alice', department='Mathematics', semester='3', year='2')
+        self.creator = make_user('bob', semester='1', year='1')
+        self.group = make_group(self.creator, name='Algebra', course_name='Mathematics')
+        self.other = make_group(self.creator, name='Poetry', course_name='Literature', course_code='LIT 101')
+        refresh_stale_recommendations(self.user)
+
+    def cached_scores(self):
+        return dict(RecommendationScore.objects.filter(user=self.user).values_list('group__name', 'score'))
+
+    def test_page_serves_cache_with_freshness(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('recommendations:recommendations_page'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [rec['group'] for rec in response.context['recommendations']], [self.group, self.other]
+        )
+        self.assertEqual(response.context['refreshed_at'], RecommendationState.objects.get(user=self.user).refreshed_at)
+
+    def test_session_change_rescores_only_that_group(self):
+        untouched = RecommendationScore.objects.get(user=self.user, group=self.other)
+        StudySession.objects.create(
+            group=self.group, title='Review', description='Chapter 4', date=date(2030, 1, 1),
+            time=time(18, 0), duration=60, location='Library', created_by=self.creator,
+        )
+        self.assertTrue(RecommendationScore.objects.get(user=self.user, group=self.group).is_stale)
+
+        refresh_stale_recommendations(self.user)
+
+        self.assertEqual(self.cached_scores(), {'Algebra': 30 + 5 + 8, 'Poetry': 5})
+        self.assertEqual(RecommendationScore.objects.get(pk=untouched.pk).updated_at, untouched.updated_at)
+
+    def test_group_view_adds_uncached_group(self):
+        RecommendationScore.objects.filter(user=self.user, group=self.other).delete()
+
+        track_group_view(self.user, self.other)
+        refresh_stale_recommendations(self.user)
+
+        self.assertEqual(self.cached_scores(), {'Algebra': 35, 'Poetry': 15})
+
+    def test_joining_removes_group_from_cache(self):
+        GroupMember.objects.create(user=self.user, group=self.group)
+
+        refresh_stale_recommendations(self.user)
+
+        self.assertEqual(self.cached_scores(), {'Poetry': 5})
+
+    def test_search_and_profile_changes_mark_user_dirty(self):
+        track_search(self.user, 'poetry')
+        tracking_buffer.flush()
+        self.assertTrue(RecommendationState.objects.get(user=self.user).is_dirty)
+
+        refresh_stale_recommendations(self.user)
+        self.assertEqual(self.cached_scores(), {'Algebra': 35, 'Poetry': 30})
+
+        # Saving an unchanged profile (as every login does) keeps the cache
+        self.user.profile.save()
+        self.assertFalse(RecommendationState.objects.get(user=self.user).is_dirty)
+
+        self.user.profile.department = 'Literature'
+        self.user.profile.save()
+        self.assertTrue(RecommendationState.objects.get(user=self.user).is_dirty)
+
+    def test_saves_without_profile_fields_skip_the_profile_signals(self):
+        # Login only writes last_login; a bio edit touches no scored or cohort field
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(1):
+            self.user.profile.save(update_fields=['bio'])
+
+        self.user.profile.department = 'Literature'
+        self.user.profile.save(update_fields=['department'])
+        self.assertTrue(RecommendationState.objects.get(user=self.user).is_dirty)
+
+    def test_marks_made_while_scoring_survive_the_save(self):
+        started = start_recommendation_refresh([self.user])
+        recommendations = {self.user.pk: calculate_recommendations(self.user, limit=20)}
+        mark_user_dirty(self.user)
+        mark_group_stale(self.group.pk)
+
+        save_recommendations([self.user], recommendations, started)
+
+        self.assertTrue(RecommendationState.objects.get(user=self.user).is_dirty)
+        self.assertTrue(RecommendationScore.objects.get(user=self.user, group=self.group).is_stale)
+        self.assertFalse(RecommendationScore.objects.get(user=self.user, group=self.other).is_stale)
+
+
+class PrecomputeRecommendationsCommandTests(TestCase):
+    def setUp(self):
+        creator = make_user('bob')
+        self.group = make_group(creator, name='Algebra')
+        self.users = [make_user(f'student{index}', department='Mathematics') for index in range(5)]
+
+    def test_upserts_scores_and_checkpoints(self):
+        stale_group = make_group(make_user('carol'), name='Old', max_capacity=3)
+        RecommendationScore.objects.create(user=self.users[0], group=stale_group, score=99)
+        for username in ('dan', 'erin'):
+            GroupMember.objects.create(user=make_user(username), group=stale_group)
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'checkpoint.json')
+            call_command(
+                'precompute_recommendations', workers=1, chunk_size=2, checkpoint=checkpoint, stdout=StringIO()
+            )
+            with open(checkpoint) as checkpoint_file:
+                last_user_id = json.load(checkpoint_file)['last_user_id']
+
+            output = StringIO()
+            call_command('precompute_recommendations', workers=1, checkpoint=checkpoint, resume=True, stdout=output)
+
+        self.assertEqual(last_user_id, User.objects.order_by('pk').last().pk)
+        self.assertIn('No users to process', output.getvalue())
+        # The now-full group is dropped, the rest upserted
+        self.assertEqual(
+            list(RecommendationScore.objects.filter(user=self.users[0]).values_list('group__name', 'score')),
+            [('Algebra', 35.0)],
+        )
+        self.assertEqual(RecommendationState.objects.filter(is_dirty=False).count(), User.objects.count())
+
+
+class PeerCohortTests(TestCase):
+    def setUp(self):
+        self.user = make_user('alice', department='Mathematics', semester='3', year='2')
+        self.group = make_group(make_user('bob', department='Mathematics', semester='3', year='2'))
+
+    def counts(self):
+        return sorted(CohortGroupCount.objects.values_list(
+            'cohort__department', 'cohort__semester', 'group__name', 'member_count'
+        ))
+
+    def test_counts_follow_memberships_and_profile_changes(self):
+        membership = GroupMember.objects.create(user=self.user, group=self.group)
+        self.assertEqual(self.counts(), [('Mathematics', '3', 'Calculus Crew', 2)])
+
+        self.user.profile.semester = '4'
+        self.user.profile.save()
+        self.assertEqual(self.counts(), [
+            ('Mathematics', '3', 'Calculus Crew', 1), ('Mathematics', '4', 'Calculus Crew', 1),
+        ])
+
+        membership.delete()
+        self.assertEqual(self.counts(), [('Mathematics', '3', 'Calculus Crew', 1)])
+
+    def test_similar_profile_signal_is_uncapped(self):
+        for index in range(59):
+            peer = User.objects.create(username=f'peer{index}')
+            peer.profile.department = 'Mathematics'
+            peer.profile.semester = '3'
+            peer.profile.save()
+            GroupMember.objects.create(user=peer, group=self.group)
+        self.group.max_capacity = 100
+        self.group.save()
+
+        reasons = calculate_recommendations(self.user)[0]['reasons']
+
+        self.assertIn('60 students with similar profile joined', reasons)
+
+    def test_rebuild_matches_incremental_counts(self):
+        GroupMember.objects.create(user=self.user, group=self.group)
+        leaver = make_user('carol', department='Mathematics', semester='3', year='2')
+        GroupMember.objects.create(user=leaver, group=self.group)
+        leaver.delete()
+        incremental = self.counts()
+        self.assertEqual(incremental, [('Mathematics', '3', 'Calculus Crew', 2)])
+
+        call_command('rebuild_peer_cohorts', stdout=StringIO())
+
+        self.assertEqual(self.counts(), incremental)
+
+
+class GroupNeighborTests(TestCase):
+    def test_computes_top_cosine_neighbors(self):
+        pairs = [(1, 10), (1, 20), (2, 10), (2, 20), (3, 10), (3, 30)]
+
+        neighbors = compute_group_neighbors(pairs, top_n=1)
+
+        self.assertEqual([group for group, _ in neighbors[10]], [20])
+        self.assertAlmostEqual(neighbors[10][0][1], 2 / 6 ** 0.5)
+        self.assertEqual([group for group, _ in neighbors[30]], [10])
+
+    def test_co_membership_feeds_both_engines(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_feature_matrix()
+        user = make_user('alice', semester='1', year='1')
+        peer = make_user('bob', semester='2', year='2')
+        algebra = make_group(peer, name='Algebra', course_name='Mathematics')
+        topology = make_group(make_user('carol', semester='3', year='3'), name='Topology')
+        GroupMember.objects.create(user=user, group=algebra)
+        GroupMember.objects.create(user=peer, group=topology)
+        rebuild_group_neighbors()
+
+        batch = calculate_recommendations(user, engine='batch')
+
+        self.assertEqual(batch[0]['group'], topology)
+        self.assertIn('Students in Algebra also joined this group', batch[0]['reasons'])
+        self.assertEqual(
+            [(rec['group'], rec['score'], rec['reasons']) for rec in batch],
+            [(rec['group'], rec['score'], rec['reasons'])
+             for rec in calculate_recommendations(user, engine='vectorized')],
+        )
+
+    def test_hit_rate_on_held_out_joins(self):
+        first, second = make_user('alice'), make_user('bob')
+        a, b, c = (make_group(make_user(f'creator{index}'), name=name) for index, name in enumerate('ABC'))
+        for user, groups in ((first, [a, b, c]), (second, [a, c, b])):
+            for group in groups:
+                GroupMember.objects.create(user=user, group=group)
+
+        result = evaluate_hit_rate(k=1)
+
+        # Creators have a single join each, so only the two students are held out
+        self.assertEqual(result['users'], 2)
+        self.assertEqual(result['hit_rate'], 1.0)
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class TrackingBufferTests(TestCase):
+    def setUp(self):
+        tracking_buffer.reset()
+        self.user = make_user('alice', department='Mathematics', semester='3', year='2')
+        self.group = make_group(make_user('bob', semester='1', year='1'), name='Algebra', course_name='Literature')
+        self.client.force_login(self.user)
+
+    def test_coalesces_repeats_and_flushes_every_request(self):
+        self.client.get(reverse('groups:group_detail', args=[self.group.pk]))
+
+        # Written before the response left, so a recycled worker has nothing to lose
+        self.assertEqual(GroupView.objects.get().user, self.user)
+        self.assertEqual(tracking_buffer.stats()['pending'], 0)
+
+        for _ in range(2):
+            self.client.get(reverse('groups:group_detail', args=[self.group.pk]))
+        for query in ('Algebra', 'algebra ', 'ALGEBRA'):
+            self.client.get(reverse('groups:browse_groups'), {'search': query})
+
+        self.assertEqual(tracking_buffer.stats(), {'buffered': 2, 'coalesced': 4, 'flushed': 2, 'pending': 0})
+        self.assertEqual(GroupView.objects.count(), 1)
+        self.assertEqual(SearchHistory.objects.get().query, 'Algebra')
+
+    def test_scoring_sees_buffered_rows(self):
+        track_group_view(self.user, self.group)
+        track_search(self.user, 'algebra')
+
+        reasons = calculate_recommendations(self.user)[0]['reasons']
+
+        self.assertIn('You viewed this group recently', reasons)
+        self.assertIn("Matches your search: 'algebra'", reasons)
+        self.assertEqual(tracking_buffer.stats()['pending'], 0)
+
+
+class TrackingRollupTests(TestCase):
+    def setUp(self):
+        # Start from a fresh matrix, as after a committed catalog change
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_feature_matrix()
+        self.user = make_user('alice', department='Physics', semester='3', year='2')
+        self.creator = make_user('bob', semester='1', year='1')
+        self.algebra = make_group(self.creator, name='Algebra')
+        self.calculus = make_group(self.creator, name='Calculus', course_code='MATH 301')
+        for _ in range(3):
+            GroupView.objects.create(user=self.user, group=self.algebra)
+        for query in ('Calculus', 'calculus', 'poetry'):
+            SearchHistory.objects.create(user=self.user, query=query)
+        long_ago = timezone.now() - timedelta(days=100)
+        GroupView.objects.update(viewed_at=long_ago)
+        SearchHistory.objects.update(created_at=long_ago)
+
+    def summarize(self, engine):
+        return [(rec['group'].pk, rec['score'], rec['reasons']) for rec in calculate_recommendations(
+            self.user, engine=engine
+        )]
+
+    def test_signals_survive_compaction_and_retention(self):
+        before = self.summarize('batch')
+
+        result = compact_tracking(retention=timedelta(days=30), batch_size=2, grace=timedelta(0))
+
+        self.assertEqual(result, {
+            'views_compacted': 3, 'searches_compacted': 3, 'views_deleted': 3, 'searches_deleted': 3,
+        })
+        self.assertEqual(GroupViewRollup.objects.get().view_count, 3)
+        self.assertEqual(
+            sorted(SearchQueryRollup.objects.values_list('normalized_query', 'search_count')),
+            [('calculus', 2), ('poetry', 1)],
+        )
+        self.assertEqual(self.summarize('batch'), before)
+        self.assertEqual(self.summarize('vectorized'), before)
+
+    def test_reads_raw_rows_above_the_watermark(self):
+        compact_tracking(retention=timedelta(days=30), grace=timedelta(0))
+        GroupView.objects.create(user=self.user, group=self.calculus)
+
+        reasons = dict((group, reasons) for group, _, reasons in self.summarize('batch'))
+
+        self.assertIn('You viewed this group recently', reasons[self.calculus.pk])
+        self.assertIn('You viewed this group recently', reasons[self.algebra.pk])
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class RecommendationBenchmarkTests(TestCase):
+    def test_reports_each_operation_and_rolls_back(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            call_command(
+                'run_recommendation_benchmarks', scales='40', sample_users=3, report=path,
+                stdout=StringIO(), stderr=StringIO(),
+            )
+            with open(path) as report_file:
+                report = json.load(report_file)
+
+        run = report['runs'][0]
+        self.assertEqual(run['campus']['users'], 40)
+        self.assertEqual(
+            set(run['operations']), {'calculate_recommendations', 'update_recommendation_cache', 'recommendations_page'}
+        )
+        self.assertEqual(run['operations']['calculate_recommendations']['calls'], 3)
+        self.assertGreater(run['operations']['recommendations_page']['queries']['max'], 0)
+        self.assertIn('hit_rate', run['evaluation'])
+        self.assertFalse(User.objects.filter(username__startswith='campus_user_').exists())
@@ -1,26 +1,94 @@
-from django.db.models import Count, Q, F
+from datetime import timedelta
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Q, F, Exists, OuterRef
+from django.utils import timezone
 from groups.models import StudyGroup
-from .models import SearchHistory, GroupView, RecommendationScore
+from groups.schedule import shared_slots, slot_count
+from groups.utils import match_search_queries
+from .models import (
+    SearchHistory, GroupView, GroupViewRollup, RecommendationScore, RecommendationState, CohortGroupCount,
+)
+from .cohorts import sum_cohort_counts, same_level_filter, similar_profile_filter
+from .neighbors import co_membership_matches
+from .buffer import tracking_buffer
+from .rollups import GROUP_VIEWS, get_watermarks, recent_search_queries
 
+# Number of recommendations cached per user
+RECOMMENDATION_CACHE_SIZE = 20
 
-def calculate_recommendations(user, limit=10):
+
+def calculate_recommendations(user, limit=10, engine=None, group_ids=None):
     """
     Calculate personalized group recommendations for a user
     Returns list of (group, score, reasons) tuples
+
+    Every signal is loaded for the whole candidate set in a fixed number of
+    aggregate queries, so the cost does not grow with the group catalog.
+    engine='vectorized' (or settings.RECOMMENDATION_ENGINE) scores against a
+    cached NumPy feature matrix instead, with identical rankings.
+    group_ids restricts scoring to those groups (always uses the batch engine).
     """
+    # Buffered views and searches must be visible to the signals below
+    tracking_buffer.flush()
+    engine = engine or getattr(settings, 'RECOMMENDATION_ENGINE', 'batch')
+    if engine == 'vectorized' and group_ids is None:
+        from . import vectorized
+        # Without NumPy installed the batch engine below is used instead
+        if vectorized.np is not None:
+            return vectorized.calculate_recommendations_vectorized(user, limit=limit)
+    
     recommendations = []
     
     # Get user profile
     profile = user.profile
     
-    # ✅ FIX: Use annotation instead of non-existent 'current_member_count' field
+    # Candidate groups with per-group signals annotated in a single query
+    watermarks = get_watermarks()
     available_groups = (
-        StudyGroup.objects.annotate(num_members=Count('members'))
+        StudyGroup.objects.annotate(
+            active_sessions=Count('sessions', filter=Q(sessions__is_cancelled=False), distinct=True),
+            # Viewed: a compacted rollup row, or a raw row above the compaction watermark
+            viewed_rollup=Exists(GroupViewRollup.objects.filter(user=user, group=OuterRef('pk'))),
+            viewed_recent=Exists(GroupView.objects.filter(
+                user=user, group=OuterRef('pk'), id__gt=watermarks[GROUP_VIEWS]
+            )),
+        )
         .exclude(members=user)
-        .filter(num_members__lt=F('max_capacity'))
+        .filter(member_count__lt=F('max_capacity'))
+        .order_by('-created_at', '-id')
     )
     
+    # Peer cohort counts for groups the user could join (used by the per-member signals)
+    candidate_counts = CohortGroupCount.objects.exclude(group__groupmember__user=user)
+    if group_ids is not None:
+        available_groups = available_groups.filter(pk__in=group_ids)
+        candidate_counts = candidate_counts.filter(group__in=group_ids)
+    
+    # Members from the same semester/year, per group
+    same_level_counts = {}
+    if profile.semester or profile.year:
+        same_level_counts = sum_cohort_counts(candidate_counts.filter(same_level_filter(profile)))
+    
+    # Members with a similar profile (same department and semester), per group
+    similar_counts = sum_cohort_counts(candidate_counts.filter(similar_profile_filter(profile)))
+    
+    # Groups matching recent searches, from the search token index
+    search_matches = match_search_queries(recent_search_queries(user, watermarks=watermarks))
+    
+    # Groups that share members with the user's groups, from the neighbor table
+    co_members = co_membership_matches(user)
+    
+    # Half hours each group meets while the user is free, by bitmask overlap
+    available_groups = list(available_groups)
+    free_slots = {}
+    if profile.has_schedule():
+        free_slots = {
+            group.pk: (shared_slots(group.schedule, profile.schedule), slot_count(group.schedule))
+            for group in available_groups
+        }
+    
     for group in available_groups:
         score = 0.0
         reasons = []
@@ -31,39 +99,24 @@ def calculate_recommendations(user, limit=10):
             reasons.append(f"Matches your department: {profile.department}")
         
         # 2. Same Semester/Year (Medium Weight: +20)
-        if profile.semester or profile.year:
-            same_level_members = group.members.filter(
-                Q(profile__semester=profile.semester) | 
-                Q(profile__year=profile.year)
-            ).count()
-            if same_level_members > 0:
-                score += 20
-                reasons.append(f"{same_level_members} students from your semester/year")
+        same_level_members = same_level_counts.get(group.pk, 0)
+        if same_level_members > 0:
+            score += 20
+            reasons.append(f"{same_level_members} students from your semester/year")
         
         # 3. Search History Match (Medium Weight: +25)
-        recent_searches = SearchHistory.objects.filter(user=user)[:10]
-        for search in recent_searches:
-            if (search.query.lower() in group.name.lower() or 
-                search.query.lower() in group.course_name.lower() or
-                search.query.lower() in group.course_code.lower()):
-                score += 25
-                reasons.append(f"Matches your search: '{search.query}'")
-                break
+        if group.pk in search_matches:
+            score += 25
+            reasons.append(f"Matches your search: '{search_matches[group.pk]}'")
         
         # 4. Popular in Similar Profile (Medium Weight: +15)
-        similar_users = User.objects.filter(
-            profile__department=profile.department,
-            profile__semester=profile.semester
-        ).exclude(id=user.id)[:50]
-        
-        similar_user_members = group.members.filter(id__in=similar_users).count()
+        similar_user_members = similar_counts.get(group.pk, 0)
         if similar_user_members > 0:
             score += 15
             reasons.append(f"{similar_user_members} students with similar profile joined")
         
         # 5. Recently Viewed Groups (Low Weight: +10)
-        recently_viewed = GroupView.objects.filter(user=user, group=group).exists()
-        if recently_viewed:
+        if group.viewed_rollup or group.viewed_recent:
             score += 10
             reasons.append("You viewed this group recently")
         
@@ -73,16 +126,29 @@ def calculate_recommendations(user, limit=10):
             reasons.append("Public group - join instantly")
         
         # 7. Active Groups (Small Weight: +8)
-        recent_sessions = group.sessions.filter(is_cancelled=False).count()
-        if recent_sessions > 0:
+        if group.active_sessions > 0:
             score += 8
-            reasons.append(f"{recent_sessions} active study sessions")
+            reasons.append(f"{group.active_sessions} active study sessions")
         
         # 8. Well-Populated Groups (Small Weight: +5)
-        member_ratio = group.members.count() / group.max_capacity
+        member_ratio = group.member_count / group.max_capacity
         if 0.3 <= member_ratio <= 0.8:
             score += 5
-            reasons.append(f"Active with {group.members.count()} members")
+            reasons.append(f"Active with {group.member_count} members")
+        
+        # 9. Joined Together (Medium Weight: +12)
+        if group.pk in co_members:
+            score += 12
+            reasons.append(f"Students in {co_members[group.pk]} also joined this group")
+        
+        # 10. Fits Your Schedule (Small Weight: +10 when it fully fits, +5 when it overlaps)
+        overlap, meeting_slots = free_slots.get(group.pk, (0, 0))
+        if overlap and overlap == meeting_slots:
+            score += 10
+            reasons.append("Meets when you're free")
+        elif overlap:
+            score += 5
+            reasons.append("Partly overlaps your free time")
         
         # Only add groups with positive scores
         if score > 0:
@@ -98,29 +164,240 @@ def calculate_recommendations(user, limit=10):
     return recommendations[:limit]
 
 
+def _profile_signature(profile):
+    """The profile fields recommendation scores depend on"""
+    return '|'.join([profile.department, profile.semester, profile.year, *map(str, profile.schedule)])
+
+
+def start_recommendation_refresh(users):
+    """
+    Clear the dirty flags of users about to be rescored and return the time
+    scoring starts. Anything that marks them dirty while scoring runs sets
+    the flag again, so the change is picked up by the next refresh.
+    """
+    started = timezone.now()
+    RecommendationState.objects.bulk_create(
+        [
+            RecommendationState(
+                user=user,
+                is_dirty=False,
+                profile_signature=_profile_signature(user.profile),
+                refreshed_at=started,
+            )
+            for user in users
+        ],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['is_dirty', 'profile_signature', 'refreshed_at'],
+    )
+    return started
+
+
+def save_recommendations(users, recommendations_by_user, started):
+    """
+    Write recommendations computed since started for many users at once.
+    Rows are upserted on (user, group). Rows marked stale after started keep
+    their mark, and rows neither upserted nor touched since are leftovers
+    from an older computation and are removed.
+    """
+    user_ids = [user.pk for user in users]
+    with transaction.atomic():
+        # Lock the rows so marks arriving during the write wait and land after it
+        marked = list(
+            RecommendationScore.objects.select_for_update()
+            .filter(user_id__in=user_ids, is_stale=True, updated_at__gte=started)
+            .values_list('user_id', 'group_id')
+        )
+        RecommendationScore.objects.bulk_create(
+            [
+                RecommendationScore(
+                    user_id=user_id,
+                    group=rec['group'],
+                    score=rec['score'],
+                    reasons=rec['reasons'],
+                    is_stale=False,
+                )
+                for user_id in user_ids
+                for rec in recommendations_by_user.get(user_id, [])
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['user', 'group'],
+            update_fields=['score', 'reasons', 'is_stale', 'updated_at'],
+        )
+        if marked:
+            mark_pairs_stale(marked)
+        RecommendationScore.objects.filter(user_id__in=user_ids, updated_at__lt=started).delete()
+
+
+def bulk_update_recommendation_cache(users):
+    """Recompute and store cached recommendations for a batch of users"""
+    users = list(users)
+    started = start_recommendation_refresh(users)
+    try:
+        recommendations_by_user = {
+            user.pk: calculate_recommendations(user, limit=RECOMMENDATION_CACHE_SIZE)
+            for user in users
+        }
+    except Exception:
+        RecommendationState.objects.filter(user__in=users).update(is_dirty=True)
+        raise
+    save_recommendations(users, recommendations_by_user, started)
+    return len(users)
+
+
 def update_recommendation_cache(user):
     """Update cached recommendations for a user"""
-    recommendations = calculate_recommendations(user, limit=20)
-    
-    # Clear old recommendations
-    RecommendationScore.objects.filter(user=user).delete()
-    
-    # Save new recommendations
-    for rec in recommendations:
-        RecommendationScore.objects.create(
-            user=user,
-            group=rec['group'],
-            score=rec['score'],
-            reasons=rec['reasons']
+    bulk_update_recommendation_cache([user])
+    return RecommendationState.objects.get(user=user)
+
+
+def _rescore_stale_rows(user):
+    """Recompute only the (user, group) rows marked stale"""
+    stale_group_ids = list(
+        RecommendationScore.objects.filter(user=user, is_stale=True).values_list('group_id', flat=True)
+    )
+    if not stale_group_ids:
+        return
+    
+    rescored = {
+        rec['group'].pk: rec
+        for rec in calculate_recommendations(
+            user, limit=len(stale_group_ids), engine='batch', group_ids=stale_group_ids
         )
+    }
+    now = timezone.now()
+    for group_id in stale_group_ids:
+        rec = rescored.get(group_id)
+        rows = RecommendationScore.objects.filter(user=user, group_id=group_id, is_stale=True)
+        if rec:
+            rows.update(score=rec['score'], reasons=rec['reasons'], is_stale=False, updated_at=now)
+        else:
+            # Joined, full, or no longer scores at all
+            rows.delete()
+    
+    # Keep only the best rows
+    overflow = RecommendationScore.objects.filter(user=user).values_list('pk', flat=True)[RECOMMENDATION_CACHE_SIZE:]
+    RecommendationScore.objects.filter(pk__in=list(overflow)).delete()
+
+
+def refresh_stale_recommendations(user):
+    """
+    Bring a user's cached recommendations up to date and return their state.
+    Dirty or expired caches are rebuilt; otherwise only stale rows are rescored.
+    """
+    tracking_buffer.flush()
+    state = RecommendationState.objects.filter(user=user).first()
+    ttl = timedelta(seconds=getattr(settings, 'RECOMMENDATION_CACHE_TTL', 86400))
+    if state is None or state.is_dirty or not state.refreshed_at or state.refreshed_at < timezone.now() - ttl:
+        return update_recommendation_cache(user)
+    
+    _rescore_stale_rows(user)
+    return state
+
+
+def schedule_recommendation_refresh(user, rebuild=False):
+    """
+    Recompute a user's cache: queued for the run_jobs worker, or inline once
+    the current transaction commits when RECOMMENDATION_BACKGROUND_REFRESH is off.
+    """
+    if getattr(settings, 'RECOMMENDATION_BACKGROUND_REFRESH', True):
+        from .jobs import queue_refresh
+        queue_refresh(user, rebuild=rebuild)
+    elif rebuild:
+        transaction.on_commit(lambda: update_recommendation_cache(user))
+    else:
+        transaction.on_commit(lambda: refresh_stale_recommendations(user))
+
+
+def popular_groups(user, limit=10):
+    """Cheap fallback for users without cached recommendations: the biggest open groups"""
+    groups = (
+        StudyGroup.objects.exclude(members=user)
+        .filter(member_count__lt=F('max_capacity'))
+        .order_by('-member_count', '-created_at', '-id')[:limit]
+    )
+    return [
+        {'group': group, 'score': 0.0, 'reasons': [f"Popular with {group.member_count} members"]}
+        for group in groups
+    ]
+
+
+def get_cached_recommendations(user, limit=10):
+    """
+    Serve cached recommendations immediately (stale-while-revalidate).
+    Expired, dirty or partly stale caches are recomputed in the background;
+    users with no cache yet get popular groups in the meantime.
+    """
+    tracking_buffer.flush()
+    state = RecommendationState.objects.filter(user=user).first()
+    rows = list(
+        RecommendationScore.objects.filter(user=user).select_related('group')[:RECOMMENDATION_CACHE_SIZE]
+    )
+    
+    ttl = timedelta(seconds=getattr(settings, 'RECOMMENDATION_REVALIDATE_AFTER', 3600))
+    expired = state is None or state.is_dirty or not state.refreshed_at or state.refreshed_at < timezone.now() - ttl
+    if expired:
+        schedule_recommendation_refresh(user, rebuild=True)
+    elif any(row.is_stale for row in rows):
+        schedule_recommendation_refresh(user)
+    
+    if state is None or not state.refreshed_at:
+        return popular_groups(user, limit=limit)
+    return [
+        {'group': row.group, 'score': row.score, 'reasons': row.reasons}
+        for row in rows if not row.is_stale
+    ][:limit]
+
+
+def mark_user_dirty(user, profile=None):
+    """
+    Flag every cached recommendation of a user for recompute.
+    When a profile is given, only flag it if a scored profile field changed.
+    """
+    states = RecommendationState.objects.filter(user=user, is_dirty=False)
+    if profile is not None:
+        states = states.exclude(profile_signature=_profile_signature(profile))
+    states.update(is_dirty=True)
+
+
+def mark_group_stale(group_id):
+    """Flag every user's cached score for a group"""
+    RecommendationScore.objects.filter(group_id=group_id, is_stale=False).update(
+        is_stale=True, updated_at=timezone.now(),
+    )
+
+
+def mark_pairs_stale(pairs):
+    """Flag (user_id, group_id) rows for rescoring, creating placeholders for uncached groups"""
+    RecommendationScore.objects.bulk_create(
+        [RecommendationScore(user_id=user_id, group_id=group_id, is_stale=True) for user_id, group_id in pairs],
+        update_conflicts=True,
+        unique_fields=['user', 'group'],
+        update_fields=['is_stale', 'updated_at'],
+    )
+
+
+def mark_scores_stale(user_id, group_ids):
+    """Flag one user's rows for rescoring"""
+    mark_pairs_stale([(user_id, group_id) for group_id in group_ids])
 
 
 def track_group_view(user, group):
     """Track when a user views a group (for recommendation algorithm)"""
+    if getattr(settings, 'RECOMMENDATION_TRACKING_BUFFER', True):
+        tracking_buffer.add_view(user.pk, group.pk)
+        return
     GroupView.objects.create(user=user, group=group)
+    mark_scores_stale(user.pk, [group.pk])
 
 
 def track_search(user, query):
     """Track user search queries (for recommendation algorithm)"""
     if query.strip():
+        if getattr(settings, 'RECOMMENDATION_TRACKING_BUFFER', True):
+            tracking_buffer.add_search(user.pk, query.strip())
+            return
         SearchHistory.objects.create(user=user, query=query.strip())
+        # A new query can match any group
+        mark_user_dirty(user)
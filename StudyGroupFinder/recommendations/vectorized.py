@@ -0,0 +1,298 @@
+"""
+Vectorized recommendation scoring.
+
+The group catalog is materialized once into NumPy feature columns and every
+user is scored against the whole catalog in a single pass. Rankings match
+calculate_recommendations' batch engine exactly.
+
+NumPy is optional: without it np is None and calculate_recommendations uses
+the batch engine. Each process caches its own matrix, tagged with a version
+kept in the shared cache; catalog changes bump the version once they commit,
+so every process rebuilds on its next scoring pass.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from groups.models import StudyGroup, GroupMember
+from groups.schedule import DAY_FIELDS, schedule_matrix, overlap_slots, slot_counts
+from groups.utils import match_search_queries
+from .cohorts import sum_cohort_counts, similar_profile_filter
+from .models import CohortGroupCount
+from .neighbors import co_membership_matches
+from .rollups import get_watermarks, recent_search_queries, viewed_group_ids
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MATRIX_VERSION_KEY = 'recommendations:feature_matrix_version'
+
+# Signal weights, in the same order as calculate_recommendations
+DEPARTMENT_WEIGHT = 30
+SAME_LEVEL_WEIGHT = 20
+SEARCH_WEIGHT = 25
+SIMILAR_PROFILE_WEIGHT = 15
+VIEWED_WEIGHT = 10
+PUBLIC_WEIGHT = 5
+ACTIVE_WEIGHT = 8
+POPULATED_WEIGHT = 5
+CO_MEMBERSHIP_WEIGHT = 12
+SCHEDULE_FIT_WEIGHT = 10
+SCHEDULE_OVERLAP_WEIGHT = 5
+
+
+class TextColumn:
+    """
+    Lower-cased strings factorized into distinct values for substring search.
+
+    Course names repeat across many groups, so a search only tests
+    each distinct value once and broadcasts the result back to every row.
+    """
+
+    def __init__(self, values):
+        positions = {}
+        self.inverse = np.array(
+            [positions.setdefault(value.lower(), len(positions)) for value in values], dtype=np.int64
+        )
+        self.values = list(positions)
+
+    def contains(self, needle):
+        """Boolean mask of rows containing needle"""
+        needle = needle.lower()
+        hits = np.fromiter((needle in value for value in self.values), dtype=bool, count=len(self.values))
+        return hits[self.inverse]
+
+
+class GroupFeatureMatrix:
+    """Per-group feature columns for the whole catalog, in catalog order"""
+
+    def __init__(self, groups, level_rows, version=None):
+        self.built_at = time.monotonic()
+        self.version = version
+        (ids, course_names, group_types,
+         max_capacity, num_members, active_sessions, *day_masks) = zip(*groups) if groups else ([],) * 13
+
+        self.group_ids = np.array(ids, dtype=np.int64)
+        self.index = {group_id: position for position, group_id in enumerate(ids)}
+        self.course_names = TextColumn(course_names)
+        self.num_members = np.array(num_members, dtype=np.int64)
+        self.max_capacity = np.array(max_capacity, dtype=np.int64)
+        self.active_sessions = np.array(active_sessions, dtype=np.int64)
+        self.is_public = np.array([group_type == 'public' for group_type in group_types], dtype=bool)
+        self.has_room = self.num_members < self.max_capacity
+        # (groups x 7) weekly schedule bitmasks
+        self.schedule = schedule_matrix(list(zip(*day_masks)))
+        self.meeting_slots = slot_counts(self.schedule)
+
+        fill_ratio = self.num_members / np.maximum(self.max_capacity, 1)
+        self.well_populated = (fill_ratio >= 0.3) & (fill_ratio <= 0.8)
+
+        # Static part of the score: public, active and well-populated groups
+        self.static_score = (
+            PUBLIC_WEIGHT * self.is_public
+            + ACTIVE_WEIGHT * (self.active_sessions > 0)
+            + POPULATED_WEIGHT * self.well_populated
+        ).astype(np.float64)
+
+        # Joint semester x year member histogram, one matrix per group
+        self.semesters = {}
+        self.years = {}
+        for _, semester, year, _ in level_rows:
+            self.semesters.setdefault(semester, len(self.semesters))
+            self.years.setdefault(year, len(self.years))
+        self.level_histogram = np.zeros(
+            (len(ids), max(len(self.semesters), 1), max(len(self.years), 1)), dtype=np.int64
+        )
+        for group_id, semester, year, total in level_rows:
+            position = self.index.get(group_id)
+            if position is not None:
+                self.level_histogram[position, self.semesters[semester], self.years[year]] = total
+
+    @classmethod
+    def build(cls, version=None):
+        """Load the catalog and its peer cohort histogram in two aggregate queries"""
+        groups = list(
+            StudyGroup.objects.annotate(
+                active_sessions=Count('sessions', filter=Q(sessions__is_cancelled=False), distinct=True),
+            )
+            .order_by('-created_at', '-id')
+            .values_list(
+                'id', 'course_name', 'group_type', 'max_capacity', 'member_count', 'active_sessions', *DAY_FIELDS,
+            )
+        )
+        level_rows = list(
+            CohortGroupCount.objects.order_by()
+            .values('group', 'cohort__semester', 'cohort__year')
+            .annotate(total=Sum('member_count'))
+            .values_list('group', 'cohort__semester', 'cohort__year', 'total')
+        )
+        return cls(groups, level_rows, version)
+
+    def __len__(self):
+        return len(self.group_ids)
+
+    def _scatter(self, counts):
+        """Turn a {group_id: value} dict into a catalog-aligned column"""
+        column = np.zeros(len(self), dtype=np.int64)
+        for group_id, value in counts.items():
+            position = self.index.get(group_id)
+            if position is not None:
+                column[position] = value
+        return column
+
+    def _same_level_counts(self, semester, year):
+        """Members sharing the semester OR the year, from the joint histogram"""
+        counts = np.zeros(len(self), dtype=np.int64)
+        semester_bin = self.semesters.get(semester)
+        year_bin = self.years.get(year)
+        if semester_bin is not None:
+            counts += self.level_histogram[:, semester_bin, :].sum(axis=1)
+        if year_bin is not None:
+            counts += self.level_histogram[:, :, year_bin].sum(axis=1)
+        if semester_bin is not None and year_bin is not None:
+            counts -= self.level_histogram[:, semester_bin, year_bin]
+        return counts
+
+    def score(self, user, limit=10):
+        """Score every group for a user and return the top recommendations"""
+        if not len(self):
+            return []
+
+        profile = user.profile
+        score = self.static_score.copy()
+
+        # Groups the user already belongs to, and full groups, are never recommended
+        candidates = self.has_room.copy()
+        for group_id in GroupMember.objects.filter(user=user).values_list('group_id', flat=True):
+            position = self.index.get(group_id)
+            if position is not None:
+                candidates[position] = False
+
+        # 1. Same Department
+        department_match = np.zeros(len(self), dtype=bool)
+        if profile.department:
+            department_match = self.course_names.contains(profile.department)
+            score += DEPARTMENT_WEIGHT * department_match
+
+        # 2. Same Semester/Year
+        same_level = np.zeros(len(self), dtype=np.int64)
+        if profile.semester or profile.year:
+            same_level = self._same_level_counts(profile.semester, profile.year)
+            score += SAME_LEVEL_WEIGHT * (same_level > 0)
+
+        # 3. Search History Match
+        watermarks = get_watermarks()
+        search_matches = match_search_queries(recent_search_queries(user, watermarks=watermarks))
+        searched = self._scatter({group_id: 1 for group_id in search_matches}).astype(bool)
+        score += SEARCH_WEIGHT * searched
+
+        # 4. Popular in Similar Profile
+        similar = self._scatter(
+            sum_cohort_counts(CohortGroupCount.objects.filter(similar_profile_filter(profile)))
+        )
+        score += SIMILAR_PROFILE_WEIGHT * (similar > 0)
+
+        # 5. Recently Viewed Groups
+        viewed = self._scatter({
+            group_id: 1 for group_id in viewed_group_ids(user, watermarks=watermarks)
+        }).astype(bool)
+        score += VIEWED_WEIGHT * viewed
+
+        # 9. Joined Together
+        co_members = co_membership_matches(user)
+        joined_together = self._scatter({group_id: 1 for group_id in co_members}).astype(bool)
+        score += CO_MEMBERSHIP_WEIGHT * joined_together
+
+        # 10. Fits Your Schedule
+        free_slots = np.zeros(len(self), dtype=np.int64)
+        if profile.has_schedule():
+            free_slots = overlap_slots(self.schedule, profile.schedule)
+        fits_schedule = (free_slots > 0) & (free_slots == self.meeting_slots)
+        overlaps_schedule = (free_slots > 0) & ~fits_schedule
+        score += SCHEDULE_FIT_WEIGHT * fits_schedule + SCHEDULE_OVERLAP_WEIGHT * overlaps_schedule
+
+        # Top-k by score, ties broken by catalog order like the batch engine's stable sort
+        eligible = np.flatnonzero(candidates & (score > 0))
+        if len(eligible) > limit:
+            top = np.argpartition(-score[eligible], limit - 1)[:limit]
+            threshold = score[eligible[top]].min()
+            eligible = eligible[score[eligible] >= threshold]
+        ranked = eligible[np.lexsort((eligible, -score[eligible]))][:limit]
+
+        groups = StudyGroup.objects.in_bulk(self.group_ids[ranked].tolist())
+        recommendations = []
+        for position in ranked:
+            group = groups.get(int(self.group_ids[position]))
+            if group is None:
+                continue
+            reasons = []
+            if department_match[position]:
+                reasons.append(f"Matches your department: {profile.department}")
+            if same_level[position] > 0:
+                reasons.append(f"{same_level[position]} students from your semester/year")
+            if searched[position]:
+                reasons.append(f"Matches your search: '{search_matches[group.pk]}'")
+            if similar[position] > 0:
+                reasons.append(f"{similar[position]} students with similar profile joined")
+            if viewed[position]:
+                reasons.append("You viewed this group recently")
+            if self.is_public[position]:
+                reasons.append("Public group - join instantly")
+            if self.active_sessions[position] > 0:
+                reasons.append(f"{self.active_sessions[position]} active study sessions")
+            if self.well_populated[position]:
+                reasons.append(f"Active with {self.num_members[position]} members")
+            if joined_together[position]:
+                reasons.append(f"Students in {co_members[group.pk]} also joined this group")
+            if fits_schedule[position]:
+                reasons.append("Meets when you're free")
+            elif overlaps_schedule[position]:
+                reasons.append("Partly overlaps your free time")
+            recommendations.append({
+                'group': group,
+                'score': float(score[position]),
+                'reasons': reasons
+            })
+        return recommendations
+
+
+_matrix = None
+_matrix_lock = threading.Lock()
+
+
+def matrix_version():
+    # A fresh key starts from the clock, so versions never repeat after an eviction
+    cache.add(MATRIX_VERSION_KEY, time.time_ns(), timeout=None)
+    return cache.get(MATRIX_VERSION_KEY)
+
+
+def get_feature_matrix():
+    """Return this process' catalog matrix, rebuilding it when stale or invalidated"""
+    global _matrix
+    ttl = getattr(settings, 'RECOMMENDATION_MATRIX_TTL', 300)
+    version = matrix_version()
+    with _matrix_lock:
+        if _matrix is None or _matrix.version != version or time.monotonic() - _matrix.built_at > ttl:
+            _matrix = GroupFeatureMatrix.build(version)
+        return _matrix
+
+
+def invalidate_feature_matrix():
+    """Make every process rebuild its matrix once the current transaction commits"""
+    def bump():
+        try:
+            cache.incr(MATRIX_VERSION_KEY)
+        except ValueError:
+            cache.add(MATRIX_VERSION_KEY, time.time_ns(), timeout=None)
+    transaction.on_commit(bump)
+
+
+def calculate_recommendations_vectorized(user, limit=10):
+    """Vectorized counterpart of calculate_recommendations"""
+    return get_feature_matrix().score(user, limit=limit)
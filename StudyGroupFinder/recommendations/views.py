@@ -1,32 +1,34 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from .utils import calculate_recommendations, update_recommendation_cache
+from .utils import update_recommendation_cache, refresh_stale_recommendations, RECOMMENDATION_CACHE_SIZE
 from .models import RecommendationScore
 
 @login_required
 def recommendations_page(request):
     """Display personalized recommendations page"""
     
-    # Try to get cached recommendations
+    # Bring the cache up to date (only dirty rows are recomputed), then serve from it
+    if request.GET.get('refresh'):
+        state = update_recommendation_cache(request.user)
+    else:
+        state = refresh_stale_recommendations(request.user)
+    
     cached_recommendations = RecommendationScore.objects.filter(
         user=request.user
-    ).select_related('group')[:20]
+    ).select_related('group')[:RECOMMENDATION_CACHE_SIZE]
     
-    # If no cached recommendations or user wants fresh ones
-    if not cached_recommendations or request.GET.get('refresh'):
-        recommendations = calculate_recommendations(request.user, limit=20)
-    else:
-        # Convert cached to expected format
-        recommendations = []
-        for rec in cached_recommendations:
-            recommendations.append({
-                'group': rec.group,
-                'score': rec.score,
-                'reasons': rec.reasons
-            })
+    # Convert cached to expected format
+    recommendations = []
+    for rec in cached_recommendations:
+        recommendations.append({
+            'group': rec.group,
+            'score': rec.score,
+            'reasons': rec.reasons
+        })
     
     context = {
         'recommendations': recommendations,
+        'refreshed_at': state.refreshed_at,
         'title': 'Recommended Groups'
     }
     return render(request, 'recommendations/recommendations.html', context)
@@ -1,9 +1,9 @@
 from django.contrib import admin
-from .models import StudySession, SessionRSVP
+from .models import StudySession, SessionRSVP, SessionSeries, SeriesException, SeriesRSVP
 
 @admin.register(StudySession)
 class StudySessionAdmin(admin.ModelAdmin):
-    list_display = ['title', 'group', 'date', 'time', 'location', 'created_by', 'is_cancelled']
+    list_display = ['title', 'group', 'date', 'time', 'location', 'created_by', 'attending_total', 'is_cancelled']
     list_filter = ['is_cancelled', 'date', 'group']
     search_fields = ['title', 'group__name', 'created_by__username']
     date_hierarchy = 'date'
@@ -12,4 +12,18 @@ class StudySessionAdmin(admin.ModelAdmin):
 class SessionRSVPAdmin(admin.ModelAdmin):
     list_display = ['user', 'session', 'status', 'created_at']
     list_filter = ['status', 'created_at']
-    search_fields = ['user__username', 'session__title']
\ No newline at end of file
+    search_fields = ['user__username', 'session__title']
+
+@admin.register(SessionSeries)
+class SessionSeriesAdmin(admin.ModelAdmin):
+    list_display = ['title', 'group', 'time', 'interval_weeks', 'start_date', 'end_date', 'generated_until']
+    search_fields = ['title', 'group__name']
+
+@admin.register(SeriesException)
+class SeriesExceptionAdmin(admin.ModelAdmin):
+    list_display = ['series', 'date']
+
+@admin.register(SeriesRSVP)
+class SeriesRSVPAdmin(admin.ModelAdmin):
+    list_display = ['user', 'series', 'status', 'updated_at']
+    list_filter = ['status']
@@ -0,0 +1,148 @@
+"""
+iCalendar (.ics) feeds of study sessions.
+
+A feed is either one user's sessions across all their groups or one group's
+schedule as seen by one of its members. Its URL carries a token signed with
+the user's calendar_key instead of requiring a login, so calendar apps can
+subscribe. Rotating the key revokes all of a user's links. A group link
+also stops working once its user leaves the group. Checking the token takes
+one query. Clients poll every few minutes, so the feed then runs one
+aggregate (latest updated_at and row count) to build the ETag and
+Last-Modified headers. An unchanged feed is answered with a 304 after that
+query. Otherwise the events stream from a single query.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from accounts.models import UserProfile, new_calendar_key
+from .models import StudySession
+
+USER_FEED = 'user'
+GROUP_FEED = 'group'
+
+
+def _signer(calendar_key):
+    return signing.Signer(salt=f'user_sessions.calendar:{calendar_key}')
+
+
+def feed_token(user, group_id=None):
+    """Token for user's own feed, or for the feed of one of their groups"""
+    value = str(user.pk) if group_id is None else f'{user.pk}-{group_id}'
+    return _signer(user.profile.calendar_key).sign(value)
+
+
+def resolve_feed_token(token):
+    """
+    (kind, pk) of the feed a token opens, or None when it is forged, its
+    user has rotated their key, or the user has left the token's group
+    """
+    parts = token.rpartition(':')[0].split('-')
+    if len(parts) > 2 or not all(part.isdigit() for part in parts):
+        return None
+    user_id, group_id = int(parts[0]), int(parts[1]) if len(parts) == 2 else None
+    profiles = UserProfile.objects.filter(user_id=user_id)
+    if group_id is not None:
+        profiles = profiles.filter(user__groupmember__group_id=group_id)
+    calendar_key = profiles.values_list('calendar_key', flat=True).first()
+    if calendar_key is None:
+        return None
+    try:
+        _signer(calendar_key).unsign(token)
+    except signing.BadSignature:
+        return None
+    return (USER_FEED, user_id) if group_id is None else (GROUP_FEED, group_id)
+
+
+def rotate_calendar_key(user):
+    """Revoke every feed link user has shared"""
+    UserProfile.objects.filter(user=user).update(calendar_key=new_calendar_key())
+
+
+def feed_sessions(kind, pk, today=None):
+    """Sessions in a feed: recent past and everything upcoming, cancelled ones included"""
+    today = today or timezone.localdate()
+    since = today - timedelta(days=getattr(settings, 'CALENDAR_FEED_PAST_DAYS', 30))
+    sessions = StudySession.objects.filter(date__gte=since)
+    if kind == USER_FEED:
+        return sessions.filter(group__groupmember__user_id=pk)
+    return sessions.filter(group_id=pk)
+
+
+def feed_validators(kind, pk, sessions):
+    """(ETag, Last-Modified timestamp or None) for a feed, in one query"""
+    stats = sessions.order_by().aggregate(last_modified=Max('updated_at'), count=Count('id'))
+    last_modified = stats['last_modified']
+    # The count catches deletions and sessions leaving the window, which move no updated_at
+    version = f"{kind}-{pk}-{stats['count']}-{last_modified.isoformat() if last_modified else ''}"
+    etag = f'"{hashlib.sha1(version.encode()).hexdigest()}"'
+    return etag, int(last_modified.timestamp()) if last_modified else None
+
+
+def _escape(text):
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces as RFC 5545 requires"""
+    data = line.encode()
+    pieces = []
+    while len(data) > 75:
+        cut = 75 if not pieces else 74
+        # Never cut inside a multi-byte character
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(data[:cut].decode())
+        data = data[cut:]
+    pieces.append(data.decode())
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def stream_feed(sessions, name, session_url):
+    """
+    Yield the .ics text for sessions, one event at a time.
+
+    name is the calendar name, or None to use the first session's group
+    name; session_url(pk) gives each event's link.
+    """
+    rows = sessions.order_by('date', 'time', 'id').values(
+        'pk', 'title', 'description', 'date', 'time', 'duration', 'location', 'is_cancelled',
+        'updated_at', 'group__name',
+    ).iterator(chunk_size=500)
+    row = next(rows, None)
+
+    header = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//StudyHub//Study Sessions//EN', 'CALSCALE:GREGORIAN']
+    name = name or (row['group__name'] if row else 'Study Sessions')
+    header.append(f'X-WR-CALNAME:{_escape(name)}')
+    yield ''.join(_fold(line) for line in header)
+
+    while row is not None:
+        start = timezone.make_aware(datetime.combine(row['date'], row['time']))
+        lines = [
+            'BEGIN:VEVENT',
+            f"UID:session-{row['pk']}@studyhub",
+            f"DTSTAMP:{_utc(row['updated_at'])}",
+            f'DTSTART:{_utc(start)}',
+            f"DTEND:{_utc(start + timedelta(minutes=row['duration']))}",
+            f"SUMMARY:{_escape(row['title'])} ({_escape(row['group__name'])})",
+            f"DESCRIPTION:{_escape(row['description'])}",
+            f"LOCATION:{_escape(row['location'])}",
+            f"URL:{session_url(row['pk'])}",
+            f"STATUS:{'CANCELLED' if row['is_cancelled'] else 'CONFIRMED'}",
+            'END:VEVENT',
+        ]
+        yield ''.join(_fold(line) for line in lines)
+        row = next(rows, None)
+
+    yield 'END:VCALENDAR\r\n'
@@ -1,5 +1,8 @@
+import datetime
+
 from django import forms
-from .models import StudySession, SessionRSVP
+from groups.schedule import DAY_NAMES, parse_days
+from .models import StudySession, SessionRSVP, SessionSeries, SeriesException
 
 class StudySessionForm(forms.ModelForm):
     """Form for creating and editing study sessions"""
@@ -46,4 +49,97 @@ class RSVPForm(forms.ModelForm):
             'status': forms.RadioSelect(attrs={
                 'class': 'form-check-input'
             })
-        }
\ No newline at end of file
+        }
+
+
+class SessionSeriesForm(forms.ModelForm):
+    """Form for creating a recurring session series, prefilled from the group's meeting schedule"""
+    days = forms.MultipleChoiceField(
+        choices=[(str(index), name.title()) for index, name in enumerate(DAY_NAMES)],
+        widget=forms.CheckboxSelectMultiple(attrs={
+            'class': 'form-check-input'
+        })
+    )
+    skip_dates = forms.CharField(
+        required=False,
+        help_text="Dates without a session, e.g. 2030-03-15, 2030-03-22",
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'YYYY-MM-DD, YYYY-MM-DD'
+        })
+    )
+    
+    class Meta:
+        model = SessionSeries
+        fields = ['title', 'description', 'time', 'duration', 'location', 'interval_weeks', 'start_date', 'end_date']
+        widgets = {
+            'title': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'e.g., Weekly Problem Set Review'
+            }),
+            'description': forms.Textarea(attrs={
+                'class': 'form-control',
+                'rows': 4,
+                'placeholder': 'What will these sessions cover?'
+            }),
+            'time': forms.TimeInput(attrs={
+                'class': 'form-control',
+                'type': 'time'
+            }),
+            'duration': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': 15,
+                'step': 15
+            }),
+            'location': forms.TextInput(attrs={
+                'class': 'form-control'
+            }),
+            'interval_weeks': forms.Select(
+                choices=[(1, 'Every week'), (2, 'Every 2 weeks'), (3, 'Every 3 weeks'), (4, 'Every 4 weeks')],
+                attrs={'class': 'form-select'}
+            ),
+            'start_date': forms.DateInput(attrs={
+                'class': 'form-control',
+                'type': 'date'
+            }),
+            'end_date': forms.DateInput(attrs={
+                'class': 'form-control',
+                'type': 'date'
+            }),
+        }
+    
+    def __init__(self, *args, group=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if group is not None:
+            self.initial.setdefault('days', [str(day) for day in parse_days(group.meeting_days)])
+            self.initial.setdefault('time', group.meeting_time)
+            self.initial.setdefault('location', group.meeting_location)
+        self.initial.setdefault('duration', 60)
+        self.initial.setdefault('start_date', datetime.date.today())
+    
+    def clean_skip_dates(self):
+        dates = []
+        for value in self.cleaned_data['skip_dates'].replace(',', ' ').split():
+            try:
+                dates.append(datetime.date.fromisoformat(value))
+            except ValueError:
+                raise forms.ValidationError(f'"{value}" is not a date (use YYYY-MM-DD).')
+        return dates
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start_date'), cleaned_data.get('end_date')
+        if start and end and end < start:
+            raise forms.ValidationError("The series must end after it starts.")
+        return cleaned_data
+    
+    def save(self, commit=True):
+        from .series import weekday_mask
+        self.instance.weekdays = weekday_mask(int(day) for day in self.cleaned_data['days'])
+        series = super().save(commit)
+        if commit:
+            SeriesException.objects.bulk_create(
+                [SeriesException(series=series, date=date) for date in self.cleaned_data['skip_dates']],
+                ignore_conflicts=True,
+            )
+        return series
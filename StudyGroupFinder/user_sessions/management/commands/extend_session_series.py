@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from user_sessions.series import extend_all_series
+
+
+class Command(BaseCommand):
+    help = "Generate upcoming sessions for every recurring series up to SESSION_SERIES_WINDOW_DAYS ahead (run daily)"
+
+    def handle(self, *args, **options):
+        created = extend_all_series()
+        self.stdout.write(self.style.SUCCESS(f'Created {created} sessions'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from user_sessions.utils import find_rsvp_tally_drift, repair_rsvp_tallies
+
+
+class Command(BaseCommand):
+    help = "Detect StudySession RSVP tallies that drifted from the real RSVPs and repair them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing it')
+
+    def handle(self, *args, **options):
+        drift = find_rsvp_tally_drift()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All RSVP tallies are exact'))
+            return
+
+        for session_id, counts in drift:
+            details = ', '.join(f'{status} stored {stored}, actual {actual}' for status, (stored, actual) in counts.items())
+            self.stdout.write(f'Session {session_id}: {details}')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} sessions drifted (dry run, nothing changed)'))
+            return
+
+        repaired = repair_rsvp_tallies([session_id for session_id, _ in drift])
+        self.stdout.write(self.style.SUCCESS(f'Repaired {repaired} sessions'))
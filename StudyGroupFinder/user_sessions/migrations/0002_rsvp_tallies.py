@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:39
+
+from django.db import migrations, models
+
+
+def count_rsvps(apps, schema_editor):
+    from user_sessions.utils import repair_rsvp_tallies
+    repair_rsvp_tallies(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='attending_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studysession',
+            name='cannot_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='studysession',
+            name='maybe_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_rsvps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:50
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('groups', '0008_joinrequest_joinrequest_inbox_idx'),
+        ('user_sessions', '0002_rsvp_tallies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeriesException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SeriesRSVP',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('attending', 'Attending'), ('maybe', 'Maybe'), ('cannot', 'Cannot Attend')], default='attending', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SessionSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(help_text='Agenda or session description')),
+                ('weekdays', models.PositiveSmallIntegerField(help_text='Bitmask of meeting weekdays, Monday = bit 0')),
+                ('interval_weeks', models.PositiveSmallIntegerField(default=1, help_text='Repeat every n weeks', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(4)])),
+                ('time', models.TimeField()),
+                ('duration', models.IntegerField(help_text='Duration in minutes')),
+                ('location', models.CharField(max_length=200)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('generated_until', models.DateField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['start_date', 'time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='sessionseries',
+            name='created_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='created_series', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='sessionseries',
+            name='group',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_series', to='groups.studygroup'),
+        ),
+        migrations.AddField(
+            model_name='seriesrsvp',
+            name='series',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rsvps', to='user_sessions.sessionseries'),
+        ),
+        migrations.AddField(
+            model_name='seriesrsvp',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_rsvps', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='seriesexception',
+            name='series',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='user_sessions.sessionseries'),
+        ),
+        migrations.AddField(
+            model_name='studysession',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='user_sessions.sessionseries'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='seriesrsvp',
+            unique_together={('series', 'user')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='seriesexception',
+            unique_together={('series', 'date')},
+        ),
+        migrations.AddConstraint(
+            model_name='studysession',
+            constraint=models.UniqueConstraint(condition=models.Q(('series__isnull', False)), fields=('series', 'date'), name='session_series_date_unique'),
+        ),
+    ]
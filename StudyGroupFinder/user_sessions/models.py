@@ -1,8 +1,21 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from groups.models import StudyGroup
 from django.utils import timezone
 
+# RSVP status -> StudySession tally field
+TALLY_FIELDS = {
+    'attending': 'attending_total',
+    'maybe': 'maybe_total',
+    'cannot': 'cannot_total',
+}
+
+
 class StudySession(models.Model):
     """Study session for a group"""
     group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='sessions')
@@ -14,28 +27,92 @@ class StudySession(models.Model):
     location = models.CharField(max_length=200)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_sessions')
     is_cancelled = models.BooleanField(default=False)
+    series = models.ForeignKey(
+        'SessionSeries', on_delete=models.SET_NULL, null=True, blank=True, related_name='occurrences'
+    )
+    # RSVP tallies per status, kept exact by SessionRSVP writes
+    attending_total = models.PositiveIntegerField(default=0, editable=False)
+    maybe_total = models.PositiveIntegerField(default=0, editable=False)
+    cannot_total = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['date', 'time']
+        constraints = [
+            # One occurrence per series and date, so generating a window twice is harmless
+            models.UniqueConstraint(
+                fields=['series', 'date'], condition=Q(series__isnull=False), name='session_series_date_unique'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.date}"
     
+    def save(self, *args, **kwargs):
+        # The tallies only change through F() updates; never write back a stale in-memory copy
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in TALLY_FIELDS.values()
+            ]
+        super().save(*args, **kwargs)
+    
     def is_upcoming(self):
         from datetime import datetime
         session_datetime = datetime.combine(self.date, self.time)
         return session_datetime > datetime.now() and not self.is_cancelled
     
     def attending_count(self):
-        return self.rsvps.filter(status='attending').count()
+        return self.attending_total
     
     def maybe_count(self):
-        return self.rsvps.filter(status='maybe').count()
+        return self.maybe_total
     
     def cannot_count(self):
-        return self.rsvps.filter(status='cannot').count()
+        return self.cannot_total
+
+
+class SessionSeries(models.Model):
+    """A repeating session; upcoming occurrences are generated as StudySessions in a rolling window"""
+    group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='session_series')
+    title = models.CharField(max_length=200)
+    description = models.TextField(help_text="Agenda or session description")
+    weekdays = models.PositiveSmallIntegerField(help_text="Bitmask of meeting weekdays, Monday = bit 0")
+    interval_weeks = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1), MaxValueValidator(4)], help_text="Repeat every n weeks"
+    )
+    time = models.TimeField()
+    duration = models.IntegerField(help_text="Duration in minutes")
+    location = models.CharField(max_length=200)
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_series')
+    # Occurrences have been generated up to this date
+    generated_until = models.DateField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['start_date', 'time']
+    
+    def __str__(self):
+        return f"{self.title} (series)"
+    
+    def days(self):
+        """Weekday indexes the series meets on, Monday = 0"""
+        return [day for day in range(7) if self.weekdays & (1 << day)]
+
+
+class SeriesException(models.Model):
+    """A date on which a series does not meet"""
+    series = models.ForeignKey(SessionSeries, on_delete=models.CASCADE, related_name='exceptions')
+    date = models.DateField()
+    
+    class Meta:
+        unique_together = ['series', 'date']
+    
+    def __str__(self):
+        return f"{self.series.title} skips {self.date}"
 
 
 class SessionRSVP(models.Model):
@@ -56,5 +133,58 @@ class SessionRSVP(models.Model):
         unique_together = ['session', 'user']
         ordering = ['-created_at']
     
+    # Status as last read from or written to the database
+    _stored_status = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_status = instance.__dict__.get('status')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Move the session's tallies in the same transaction as the RSVP write
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' not in update_fields:
+            return super().save(*args, **kwargs)
+        # No savepoint: update_or_create already runs this inside one
+        with transaction.atomic(savepoint=False):
+            previous = None
+            if not self._state.adding:
+                previous = self._stored_status or (
+                    SessionRSVP.objects.filter(pk=self.pk).values_list('status', flat=True).first()
+                )
+            super().save(*args, **kwargs)
+            if previous != self.status:
+                changes = {TALLY_FIELDS[self.status]: F(TALLY_FIELDS[self.status]) + 1}
+                if previous:
+                    # Clamped, so a tally that drifted to 0 never fails the unsigned column check
+                    changes[TALLY_FIELDS[previous]] = Greatest(F(TALLY_FIELDS[previous]) - 1, 0)
+                StudySession.objects.filter(pk=self.session_id).update(**changes)
+        self._stored_status = self.status
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.session.title} ({self.status})"
+
+
+class SeriesRSVP(models.Model):
+    """A standing RSVP, applied to every upcoming occurrence of a series"""
+    series = models.ForeignKey(SessionSeries, on_delete=models.CASCADE, related_name='rsvps')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='series_rsvps')
+    status = models.CharField(max_length=10, choices=SessionRSVP.STATUS_CHOICES, default='attending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['series', 'user']
+    
     def __str__(self):
-        return f"{self.user.username} - {self.session.title} ({self.status})"
\ No newline at end of file
+        return f"{self.user.username} - {self.series.title} ({self.status})"
+
+
+# Signal to keep the session tallies exact when RSVPs are deleted (also on cascades)
+@receiver(post_delete, sender=SessionRSVP)
+def untally_session_rsvp(sender, instance, **kwargs):
+    """Runs inside the deletion's transaction"""
+    field = TALLY_FIELDS[instance._stored_status or instance.status]
+    StudySession.objects.filter(pk=instance.session_id).update(**{field: Greatest(F(field) - 1, 0)})
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Recurring session series.
+
+A SessionSeries is a weekly rule (weekdays, every n weeks, optional end date)
+with SeriesException dates it skips. extend_series() materializes the
+occurrences inside a rolling window of SESSION_SERIES_WINDOW_DAYS with one
+bulk_create, and only ever moves the series' generated_until horizon
+forward, so running it again (or concurrently) never duplicates a session.
+The extend_session_series command moves every window daily; group pages and
+calendar feeds also extend the series they show, once a day each, so windows
+keep moving on hosts where the command is not scheduled.
+A SeriesRSVP is a standing answer for every upcoming occurrence, fanned out
+with bulk writes; the session tallies are recounted in one UPDATE afterwards.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import StudySession, SessionSeries, SessionRSVP, SeriesRSVP
+from .utils import repair_rsvp_tallies
+
+
+def weekday_mask(days):
+    """Bitmask for weekday indexes, Monday = 0"""
+    mask = 0
+    for day in days:
+        mask |= 1 << day
+    return mask
+
+
+def occurrence_dates(series, start, end):
+    """Dates from start to end (inclusive) on which the series' rule falls, ignoring exceptions"""
+    first_week = series.start_date - timedelta(days=series.start_date.weekday())
+    days = set(series.days())
+    dates = []
+    day = max(start, series.start_date)
+    while day <= end:
+        if day.weekday() in days and ((day - first_week).days // 7) % series.interval_weeks == 0:
+            dates.append(day)
+        day += timedelta(days=1)
+    return dates
+
+
+def series_horizon(series, today=None):
+    """Last date the rolling window reaches for series"""
+    today = today or timezone.localdate()
+    horizon = today + timedelta(days=getattr(settings, 'SESSION_SERIES_WINDOW_DAYS', 28))
+    return min(horizon, series.end_date) if series.end_date else horizon
+
+
+def _fan_out(series, session_ids, user_ids=None):
+    """Apply series RSVPs (all, or only user_ids') to the given occurrences in bulk"""
+    rsvps = SeriesRSVP.objects.filter(series=series)
+    if user_ids is not None:
+        rsvps = rsvps.filter(user_id__in=user_ids)
+    statuses = dict(rsvps.values_list('user_id', 'status'))
+    if not statuses or not session_ids:
+        return
+    now = timezone.now()
+    for status in set(statuses.values()):
+        users = [user_id for user_id, user_status in statuses.items() if user_status == status]
+        SessionRSVP.objects.filter(session_id__in=session_ids, user_id__in=users).exclude(status=status).update(
+            status=status, updated_at=now
+        )
+    SessionRSVP.objects.bulk_create([
+        SessionRSVP(session_id=session_id, user_id=user_id, status=status)
+        for session_id in session_ids for user_id, status in statuses.items()
+    ], ignore_conflicts=True)
+    # Bulk writes skip SessionRSVP.save, so recount the tallies of the touched sessions
+    repair_rsvp_tallies(session_ids)
+
+
+def extend_series(series, today=None):
+    """Generate series' occurrences up to its rolling horizon; returns the new sessions"""
+    today = today or timezone.localdate()
+    horizon = series_horizon(series, today)
+    start = max(series.start_date, today)
+    if series.generated_until:
+        start = max(start, series.generated_until + timedelta(days=1))
+    if start > horizon:
+        return []
+
+    with transaction.atomic():
+        # Claim the window; a concurrent run that got there first leaves nothing to do
+        claimed = SessionSeries.objects.filter(pk=series.pk).filter(
+            Q(generated_until__isnull=True) | Q(generated_until__lt=horizon)
+        ).update(generated_until=horizon)
+        if not claimed:
+            return []
+        skipped = set(series.exceptions.filter(date__range=(start, horizon)).values_list('date', flat=True))
+        dates = [date for date in occurrence_dates(series, start, horizon) if date not in skipped]
+        StudySession.objects.bulk_create([
+            StudySession(
+                group_id=series.group_id, series=series, title=series.title, description=series.description,
+                date=date, time=series.time, duration=series.duration, location=series.location,
+                created_by_id=series.created_by_id,
+            )
+            for date in dates
+        ], ignore_conflicts=True)
+        # ignore_conflicts leaves the new rows without primary keys, so read them back
+        sessions = list(StudySession.objects.filter(series=series, date__in=dates))
+        _fan_out(series, [session.pk for session in sessions])
+        if sessions:
+            # bulk_create skips StudySession's post_save receivers, so invalidate once for the batch
+            from recommendations.utils import mark_group_stale
+            from recommendations.vectorized import invalidate_feature_matrix
+            mark_group_stale(series.group_id)
+            invalidate_feature_matrix()
+    series.generated_until = horizon
+    return sessions
+
+
+def extend_all_series(today=None, **filters):
+    """
+    Move every active series' window forward (run daily), or only those
+    matching filters; returns the number of sessions created
+    """
+    today = today or timezone.localdate()
+    active = SessionSeries.objects.filter(Q(end_date__isnull=True) | Q(end_date__gte=today)).filter(
+        Q(generated_until__isnull=True)
+        | Q(generated_until__lt=today + timedelta(days=getattr(settings, 'SESSION_SERIES_WINDOW_DAYS', 28)))
+    )
+    return sum(len(extend_series(series, today)) for series in active.filter(**filters).iterator())
+
+
+def extend_shown_series(scope, today=None, **filters):
+    """Extend the series matching filters on the first call of the day for scope (a page or feed)"""
+    today = today or timezone.localdate()
+    if cache.add(f'user_sessions.series_extended:{scope}:{today.isoformat()}', True, 60 * 60 * 24):
+        extend_all_series(today, **filters)
+
+
+def set_series_rsvp(series, user, status, today=None):
+    """Record a standing RSVP and apply it to every upcoming occurrence at once"""
+    with transaction.atomic():
+        SeriesRSVP.objects.update_or_create(series=series, user=user, defaults={'status': status})
+        upcoming = series.occurrences.filter(date__gte=today or timezone.localdate(), is_cancelled=False)
+        _fan_out(series, list(upcoming.values_list('pk', flat=True)), user_ids=[user.pk])
+
@@ -1,3 +1,341 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from groups.models import GroupMember
+from recommendations.tests import LOCAL_STORAGES, make_user, make_group
+from notifications.models import Notification
+from recommendations import vectorized
+from recommendations.models import RecommendationScore
+from .calendar import feed_token
+from .models import StudySession, SessionRSVP, SessionSeries, SeriesException
+from .series import extend_series, set_series_rsvp, weekday_mask
+from .utils import find_rsvp_tally_drift
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class SessionQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.creator = make_user('bob')
+        self.group = make_group(self.creator)
+        self.session = StudySession.objects.create(
+            group=self.group, title='Review', description='Chapter 4', date=date(2030, 1, 1),
+            time=time(18, 0), duration=60, location='Library', created_by=self.creator,
+        )
+        for n in range(8):
+            member = make_user(f'student{n}')
+            GroupMember.objects.create(user=member, group=self.group)
+            SessionRSVP.objects.create(session=self.session, user=member, status=['attending', 'maybe', 'cannot'][n % 3])
+        self.client.force_login(self.creator)
+
+    def test_create_session_query_budget(self):
+        with self.assertNumQueries(5):
+            self.client.get(reverse('user_sessions:create_session', args=[self.group.pk]))
+
+    def test_session_detail_query_budget(self):
+        # Session, user, session with group and creator, roles, RSVPs with users and profiles, navbar profile
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('user_sessions:session_detail', args=[self.session.pk]))
+
+        self.assertEqual(len(response.context['attending']), 3)
+        self.assertEqual(len(response.context['maybe']), 3)
+        self.assertIsNone(response.context['user_rsvp'])
+
+    def test_session_rsvps_json(self):
+        SessionRSVP.objects.create(session=self.session, user=self.creator, status='cannot')
+
+        with self.assertNumQueries(4):
+            data = self.client.get(reverse('user_sessions:session_rsvps', args=[self.session.pk])).json()
+
+        self.assertEqual(data['counts'], {'attending': 3, 'maybe': 3, 'cannot': 3})
+        self.assertEqual(data['user_status'], 'cannot')
+        self.assertEqual([row['username'] for row in data['rsvps']['attending']], ['student0', 'student3', 'student6'])
+        self.assertIn('Cannot Attend (3)', data['html'])
+
+    def test_rsvp_query_budget(self):
+        # update_or_create accounts for five of these (savepoints, lookup, insert, tally update)
+        with self.assertNumQueries(11):
+            self.client.get(reverse('user_sessions:rsvp_session', args=[self.session.pk, 'maybe']))
+
+        self.assertEqual(SessionRSVP.objects.get(session=self.session, user=self.creator).status, 'maybe')
+
+    def test_rsvp_attending_query_budget(self):
+        # The RSVP write (11 queries) plus queueing the gamification job: merge attempt, insert, savepoints
+        with self.assertNumQueries(17):
+            self.client.get(reverse('user_sessions:rsvp_session', args=[self.session.pk, 'attending']))
+
+    def test_group_sessions_query_budget(self):
+        cache.clear()
+        # The series RSVP lookup is skipped when the group has no series; the lagging series check runs once a day
+        with self.assertNumQueries(9):
+            response = self.client.get(reverse('user_sessions:group_sessions', args=[self.group.pk]))
+
+        self.assertEqual(response.context['upcoming_sessions'][0].attending_total, 3)
+
+    def test_non_members_cannot_rsvp(self):
+        self.client.force_login(make_user('mallory'))
+
+        self.client.get(reverse('user_sessions:rsvp_session', args=[self.session.pk, 'attending']))
+
+        self.assertFalse(SessionRSVP.objects.filter(session=self.session, user__username='mallory').exists())
+
+
+    def test_unknown_rsvp_status_is_rejected(self):
+        member = User.objects.get(username='student0')
+        self.client.force_login(member)
+
+        response = self.client.post(reverse('user_sessions:rsvp_session', args=[self.session.pk, 'bogus']))
+
+        self.assertRedirects(response, reverse('user_sessions:session_detail', args=[self.session.pk]))
+        self.assertEqual(SessionRSVP.objects.get(session=self.session, user=member).status, 'attending')
+
+
+class RSVPTallyTests(TestCase):
+    def setUp(self):
+        self.creator = make_user('bob')
+        self.group = make_group(self.creator)
+        self.session = StudySession.objects.create(
+            group=self.group, title='Review', description='Chapter 4', date=date(2030, 1, 1),
+            time=time(18, 0), duration=60, location='Library', created_by=self.creator,
+        )
+        self.students = [make_user(f'student{n}') for n in range(3)]
+
+    def tallies(self):
+        session = StudySession.objects.get(pk=self.session.pk)
+        return session.attending_count(), session.maybe_count(), session.cannot_count()
+
+    def test_tallies_follow_status_changes_and_deletes(self):
+        for student in self.students:
+            SessionRSVP.objects.update_or_create(session=self.session, user=student, defaults={'status': 'attending'})
+        self.assertEqual(self.tallies(), (3, 0, 0))
+
+        SessionRSVP.objects.update_or_create(session=self.session, user=self.students[0], defaults={'status': 'maybe'})
+        SessionRSVP.objects.update_or_create(session=self.session, user=self.students[1], defaults={'status': 'cannot'})
+        SessionRSVP.objects.update_or_create(session=self.session, user=self.students[1], defaults={'status': 'cannot'})
+        self.assertEqual(self.tallies(), (1, 1, 1))
+
+        # A stale copy of the session must not write old tallies back
+        self.session.title = 'Final review'
+        self.session.save()
+        self.assertEqual(self.tallies(), (1, 1, 1))
+
+        self.students[2].delete()
+        SessionRSVP.objects.filter(user=self.students[0]).delete()
+        self.assertEqual(self.tallies(), (0, 0, 1))
+        self.assertEqual(find_rsvp_tally_drift(), [])
+
+    def test_decrements_stop_at_zero(self):
+        rsvp = SessionRSVP.objects.create(session=self.session, user=self.students[0], status='attending')
+        StudySession.objects.filter(pk=self.session.pk).update(attending_total=0)
+
+        rsvp.status = 'maybe'
+        rsvp.save()
+        self.assertEqual(self.tallies(), (0, 1, 0))
+
+        StudySession.objects.filter(pk=self.session.pk).update(maybe_total=0)
+        rsvp.delete()
+        self.assertEqual(self.tallies(), (0, 0, 0))
+
+    def test_listing_sessions_reads_stored_tallies(self):
+        StudySession.objects.bulk_create([
+            StudySession(
+                group=self.group, title=f'Session {n}', description='', date=date(2030, 1, 2),
+                time=time(18, 0), duration=60, location='Library', created_by=self.creator,
+            )
+            for n in range(200)
+        ])
+
+        with self.assertNumQueries(1):
+            counts = [session.attending_count() + session.maybe_count() for session in self.group.sessions.all()]
+        self.assertEqual(len(counts), 201)
+
+    def test_reconcile_command_repairs_drift(self):
+        SessionRSVP.objects.create(session=self.session, user=self.students[0], status='maybe')
+        StudySession.objects.filter(pk=self.session.pk).update(maybe_total=5, cannot_total=2)
+
+        out = StringIO()
+        call_command('reconcile_rsvp_tallies', '--dry-run', stdout=out)
+        self.assertIn(f'Session {self.session.pk}: maybe stored 5, actual 1, cannot stored 2, actual 0', out.getvalue())
+        self.assertEqual(self.tallies(), (0, 5, 2))
+
+        call_command('reconcile_rsvp_tallies', stdout=StringIO())
+        self.assertEqual(self.tallies(), (0, 1, 0))
+
+
+@override_settings(STORAGES=LOCAL_STORAGES, SESSION_SERIES_WINDOW_DAYS=28)
+class SessionSeriesTests(TestCase):
+    # A Monday
+    today = date(2030, 1, 7)
+
+    def setUp(self):
+        self.creator = make_user('bob')
+        self.group = make_group(self.creator)
+        self.students = [make_user(f'student{n}') for n in range(3)]
+        for student in self.students:
+            GroupMember.objects.create(user=student, group=self.group)
+        self.series = SessionSeries.objects.create(
+            group=self.group, title='Weekly review', weekdays=weekday_mask([0, 2]), time=time(18, 0),
+            duration=60, location='Library', start_date=self.today, created_by=self.creator,
+        )
+
+    def dates(self):
+        return list(self.series.occurrences.order_by('date').values_list('date', flat=True))
+
+    def test_extend_is_idempotent_and_only_moves_the_horizon(self):
+        SeriesException.objects.create(series=self.series, date=self.today + timedelta(days=2))
+
+        created = extend_series(self.series, self.today)
+        self.assertEqual(len(created), 8)
+        self.assertNotIn(self.today + timedelta(days=2), self.dates())
+        self.assertEqual(extend_series(self.series, self.today), [])
+
+        # A day later only the newly uncovered Wednesday is generated
+        created = extend_series(SessionSeries.objects.get(pk=self.series.pk), self.today + timedelta(days=2))
+        self.assertEqual([session.date for session in created], [self.today + timedelta(days=30)])
+        self.assertEqual(len(self.dates()), 9)
+
+    def test_generated_sessions_invalidate_recommendations(self):
+        outsider = make_user('outsider')
+        RecommendationScore.objects.update_or_create(user=outsider, group=self.group, defaults={'score': 10})
+        version = vectorized.matrix_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            extend_series(self.series, self.today)
+
+        self.assertTrue(RecommendationScore.objects.get(user=outsider, group=self.group).is_stale)
+        self.assertNotEqual(vectorized.matrix_version(), version)
+
+    def test_interval_and_end_date(self):
+        SessionSeries.objects.filter(pk=self.series.pk).update(
+            weekdays=weekday_mask([0]), interval_weeks=2, end_date=self.today + timedelta(days=21),
+        )
+
+        extend_series(SessionSeries.objects.get(pk=self.series.pk), self.today)
+
+        self.assertEqual(self.dates(), [self.today, self.today + timedelta(days=14)])
+
+    def test_series_rsvp_fans_out_and_follows_new_occurrences(self):
+        extend_series(self.series, self.today)
+        set_series_rsvp(self.series, self.students[0], 'attending', self.today)
+        set_series_rsvp(self.series, self.students[1], 'maybe', self.today)
+        set_series_rsvp(self.series, self.students[0], 'cannot', self.today)
+
+        self.assertEqual(SessionRSVP.objects.filter(session__series=self.series).count(), 18)
+        session = self.series.occurrences.order_by('date').first()
+        self.assertEqual((session.attending_total, session.maybe_total, session.cannot_total), (0, 1, 1))
+
+        created = extend_series(SessionSeries.objects.get(pk=self.series.pk), self.today + timedelta(days=7))
+        self.assertEqual(sorted(created[0].rsvps.values_list('status', flat=True)), ['cannot', 'maybe'])
+        self.assertEqual(find_rsvp_tally_drift(), [])
+
+    def test_create_series_sends_one_digest_per_member(self):
+        self.client.force_login(self.creator)
+        start = timezone.localdate()
+
+        response = self.client.post(reverse('user_sessions:create_series', args=[self.group.pk]), {
+            'title': 'Problem sets', 'description': 'Weekly sets', 'days': [str(day) for day in range(7)],
+            'interval_weeks': 1, 'time': '17:00', 'duration': 90, 'location': 'Room 4',
+            'start_date': start.isoformat(), 'end_date': '', 'skip_dates': (start + timedelta(days=1)).isoformat(),
+        })
+
+        self.assertRedirects(response, reverse('user_sessions:group_sessions', args=[self.group.pk]))
+        series = SessionSeries.objects.get(title='Problem sets')
+        self.assertEqual(series.occurrences.count(), 28)
+        self.assertFalse(series.occurrences.filter(date=start + timedelta(days=1)).exists())
+        self.assertEqual(Notification.objects.filter(recipient=self.students[0]).count(), 1)
+
+    def test_pages_and_feeds_extend_lagging_windows_once_a_day(self):
+        cache.clear()
+        today = timezone.localdate()
+        # A window last moved a week ago, with extend_session_series never scheduled
+        SessionSeries.objects.filter(pk=self.series.pk).update(
+            weekdays=weekday_mask(range(7)), start_date=today - timedelta(days=7), generated_until=today,
+        )
+        self.client.force_login(self.students[0])
+
+        self.client.get(reverse('user_sessions:group_sessions', args=[self.group.pk]))
+        self.assertEqual(self.series.occurrences.count(), 28)
+
+        # The page checks once a day; the user's feed is a scope of its own
+        SessionSeries.objects.filter(pk=self.series.pk).update(generated_until=today)
+        self.client.get(reverse('user_sessions:group_sessions', args=[self.group.pk]))
+        self.assertEqual(SessionSeries.objects.get(pk=self.series.pk).generated_until, today)
+
+        self.client.get(reverse('user_sessions:calendar_feed', args=[feed_token(self.students[0])]))
+        self.assertEqual(SessionSeries.objects.get(pk=self.series.pk).generated_until, today + timedelta(days=28))
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.creator = make_user('bob')
+        self.group = make_group(self.creator)
+        self.other_group = make_group(make_user('carol'), name='Other')
+        self.student = make_user('alice')
+        GroupMember.objects.create(user=self.student, group=self.group)
+        self.session = StudySession.objects.create(
+            group=self.group, title='Review, part 1', description='Chapter 4; ' + 'proofs ' * 30,
+            date=timezone.localdate() + timedelta(days=3), time=time(18, 0), duration=90, location='Library',
+            created_by=self.creator,
+        )
+        StudySession.objects.create(
+            group=self.other_group, title='Not mine', description='', date=self.session.date,
+            time=time(9, 0), duration=60, location='Lab', created_by=self.other_group.creator,
+        )
+
+    def feed_url(self, user, group_id=None):
+        return reverse('user_sessions:calendar_feed', args=[feed_token(user, group_id)])
+
+    def test_user_feed_lists_only_the_users_groups(self):
+        response = self.client.get(self.feed_url(self.student))
+
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn('SUMMARY:Review\\, part 1', body)
+        self.assertIn(f'DTSTART:{self.session.date:%Y%m%d}T180000Z', body)
+        self.assertIn(f'DTEND:{self.session.date:%Y%m%d}T193000Z', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_conditional_get_costs_two_queries(self):
+        url = self.feed_url(self.student, self.group.pk)
+        response = self.client.get(url)
+        b''.join(response.streaming_content)
+
+        # The token check, then the aggregate behind the validators
+        with self.assertNumQueries(2):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        self.session.is_cancelled = True
+        self.session.save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn('STATUS:CANCELLED', b''.join(changed.streaming_content).decode())
+
+    def test_tampered_token_is_rejected(self):
+        token = feed_token(self.student).replace(f'{self.student.pk}:', f'{self.creator.pk}:')
+
+        response = self.client.get(reverse('user_sessions:calendar_feed', args=[token]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_links_stop_working_after_leaving_or_resetting(self):
+        group_url, user_url = self.feed_url(self.student, self.group.pk), self.feed_url(self.student)
+        # A token for a group the user never joined
+        self.assertEqual(self.client.get(self.feed_url(self.student, self.other_group.pk)).status_code, 404)
+
+        GroupMember.objects.filter(user=self.student, group=self.group).delete()
+        self.assertEqual(self.client.get(group_url).status_code, 404)
+        self.assertEqual(self.client.get(user_url).status_code, 200)
+
+        self.client.force_login(self.student)
+        self.client.post(reverse('user_sessions:reset_calendar_feeds'))
+        self.assertEqual(self.client.get(user_url).status_code, 404)
+        self.student.profile.refresh_from_db()
+        self.assertEqual(self.client.get(self.feed_url(self.student)).status_code, 200)
@@ -6,8 +6,13 @@ app_name = 'user_sessions'
 urlpatterns = [
     path('group/<int:group_id>/create/', views.create_session, name='create_session'),
     path('<int:pk>/', views.session_detail, name='session_detail'),
+    path('<int:pk>/rsvps/', views.session_rsvps, name='session_rsvps'),
     path('<int:pk>/rsvp/<str:status>/', views.rsvp_session, name='rsvp_session'),
     path('group/<int:group_id>/', views.group_sessions, name='group_sessions'),
+    path('group/<int:group_id>/series/create/', views.create_series, name='create_series'),
+    path('series/<int:pk>/rsvp/<str:status>/', views.rsvp_series, name='rsvp_series'),
     path('<int:pk>/cancel/', views.cancel_session, name='cancel_session'),
     path('<int:pk>/delete/', views.delete_session, name='delete_session'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    path('calendar/reset/', views.reset_calendar_feeds, name='reset_calendar_feeds'),
 ]
\ No newline at end of file
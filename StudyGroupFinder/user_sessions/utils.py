@@ -0,0 +1,56 @@
+from django.apps import apps as global_apps
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import TALLY_FIELDS
+
+
+def load_session_rsvps(session, user):
+    """
+    Every RSVP to session with its user and profile in one query, partitioned
+    by status in memory; user_rsvp is the given user's own RSVP, if any.
+    """
+    rsvps = {status: [] for status in TALLY_FIELDS}
+    user_rsvp = None
+    for rsvp in session.rsvps.select_related('user__profile').order_by('created_at', 'id'):
+        rsvps[rsvp.status].append(rsvp)
+        if rsvp.user_id == user.pk:
+            user_rsvp = rsvp
+    return {**rsvps, 'user_rsvp': user_rsvp}
+
+
+def rsvp_count_subquery(status, apps=global_apps):
+    """Correlated subquery counting a session's RSVPs with status"""
+    SessionRSVP = apps.get_model('user_sessions', 'SessionRSVP')
+    return Coalesce(Subquery(
+        SessionRSVP.objects.filter(session=OuterRef('pk'), status=status).order_by()
+        .values('session').annotate(total=Count('id')).values('total'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def find_rsvp_tally_drift(sessions=None):
+    """(session id, {status: (stored, actual)}) for every session whose tallies drifted"""
+    from .models import StudySession
+    sessions = StudySession.objects.all() if sessions is None else sessions
+    actual = {f'actual_{status}': rsvp_count_subquery(status) for status in TALLY_FIELDS}
+    drifted = Q()
+    for status, field in TALLY_FIELDS.items():
+        drifted |= ~Q(**{field: F(f'actual_{status}')})
+    rows = sessions.annotate(**actual).filter(drifted).order_by('pk').values(
+        'pk', *TALLY_FIELDS.values(), *actual
+    )
+    return [
+        (row['pk'], {
+            status: (row[field], row[f'actual_{status}'])
+            for status, field in TALLY_FIELDS.items() if row[field] != row[f'actual_{status}']
+        })
+        for row in rows
+    ]
+
+
+def repair_rsvp_tallies(session_ids=None, apps=global_apps):
+    """Recount RSVPs in a single UPDATE, so concurrent RSVPs are not lost"""
+    StudySession = apps.get_model('user_sessions', 'StudySession')
+    sessions = StudySession.objects.all() if session_ids is None else StudySession.objects.filter(pk__in=session_ids)
+    return sessions.update(**{field: rsvp_count_subquery(status, apps) for status, field in TALLY_FIELDS.items()})
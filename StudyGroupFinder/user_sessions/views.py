@@ -1,10 +1,25 @@
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse, Http404
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_POST
 from datetime import datetime, timedelta
-from .models import StudySession, SessionRSVP
+from .models import StudySession, SessionRSVP, SessionSeries, SeriesRSVP, SeriesException, TALLY_FIELDS
+from groups.membership import get_membership
 from groups.models import StudyGroup
-from .forms import StudySessionForm, RSVPForm
+from .forms import StudySessionForm, RSVPForm, SessionSeriesForm
+from .calendar import (
+    USER_FEED, feed_token, resolve_feed_token, rotate_calendar_key, feed_sessions, feed_validators, stream_feed,
+)
+from .series import extend_series, extend_shown_series, set_series_rsvp
+from .utils import load_session_rsvps
 
 @login_required
 def create_session(request, group_id):
@@ -12,7 +27,7 @@ def create_session(request, group_id):
     group = get_object_or_404(StudyGroup, pk=group_id)
     
     # Check if user is a member of the group
-    if request.user not in group.members.all():
+    if not get_membership(request).is_member(group):
         messages.error(request, 'You must be a member to create sessions.')
         return redirect('groups:group_detail', pk=group_id)
     
@@ -42,41 +57,58 @@ def create_session(request, group_id):
 @login_required
 def session_detail(request, pk):
     """View session details and RSVP"""
-    session = get_object_or_404(StudySession, pk=pk)
+    session = get_object_or_404(StudySession.objects.select_related('group', 'created_by'), pk=pk)
     group = session.group
-    is_member = request.user in group.members.all()
-    
-    user_rsvp = None
-    if is_member:
-        user_rsvp = SessionRSVP.objects.filter(session=session, user=request.user).first()
-    
-    # Get all RSVPs grouped by status
-    attending = session.rsvps.filter(status='attending').select_related('user')
-    maybe = session.rsvps.filter(status='maybe').select_related('user')
-    cannot = session.rsvps.filter(status='cannot').select_related('user')
+    is_member = get_membership(request).is_member(group)
     
     context = {
         'session': session,
         'group': group,
         'is_member': is_member,
-        'user_rsvp': user_rsvp,
-        'attending': attending,
-        'maybe': maybe,
-        'cannot': cannot,
+        # All RSVPs in one query, split by status; includes the viewer's own user_rsvp
+        **load_session_rsvps(session, request.user),
     }
     return render(request, 'user_sessions/session_detail.html', context)
 
 
+@login_required
+def session_rsvps(request, pk):
+    """RSVP lists for refreshing the session page without a full render"""
+    session = get_object_or_404(StudySession, pk=pk)
+    context = {'session': session, **load_session_rsvps(session, request.user)}
+    user_rsvp = context['user_rsvp']
+    return JsonResponse({
+        'counts': {status: len(context[status]) for status in TALLY_FIELDS},
+        'rsvps': {
+            status: [
+                {
+                    'username': rsvp.user.username,
+                    'name': rsvp.user.get_full_name(),
+                    'avatar': rsvp.user.profile.profile_picture.url,
+                }
+                for rsvp in context[status]
+            ]
+            for status in TALLY_FIELDS
+        },
+        'user_status': user_rsvp.status if user_rsvp else None,
+        'html': render_to_string('user_sessions/_rsvp_lists.html', context, request=request),
+    })
+
+
 @login_required
 def rsvp_session(request, pk, status):
     """RSVP to a session"""
     session = get_object_or_404(StudySession, pk=pk)
     
     # Check if user is a member
-    if request.user not in session.group.members.all():
+    if not get_membership(request).is_member(session.group_id):
         messages.error(request, 'Only group members can RSVP.')
         return redirect('user_sessions:session_detail', pk=pk)
     
+    if status not in TALLY_FIELDS:
+        messages.error(request, 'Invalid RSVP status.')
+        return redirect('user_sessions:session_detail', pk=pk)
+    
     # Update or create RSVP
     rsvp, created = SessionRSVP.objects.update_or_create(
         session=session,
@@ -84,33 +116,92 @@ def rsvp_session(request, pk, status):
         defaults={'status': status}
     )
     
-    # Update gamification (streak and badges)
+    # Streak, badges and points are evaluated by the job queue
     if status == 'attending':
-        from gamification.utils import update_user_streak, check_and_award_badges, award_points
-        update_user_streak(request.user)
-        check_and_award_badges(request.user)
-        award_points(request.user, 5, 'sessions')  # 5 points for attending
+        from gamification.jobs import queue_attendance
+        queue_attendance(request.user)
     
     messages.success(request, f'RSVP updated to: {rsvp.get_status_display()}')
     return redirect('user_sessions:session_detail', pk=pk)
 
 
+@login_required
+def create_series(request, group_id):
+    """Create a recurring session series and generate its upcoming occurrences"""
+    group = get_object_or_404(StudyGroup, pk=group_id)
+    
+    if not get_membership(request).is_member(group):
+        messages.error(request, 'You must be a member to create sessions.')
+        return redirect('groups:group_detail', pk=group_id)
+    
+    if request.method == 'POST':
+        form = SessionSeriesForm(request.POST, group=group)
+        if form.is_valid():
+            form.instance.group = group
+            form.instance.created_by = request.user
+            with transaction.atomic():
+                series = form.save()
+                sessions = extend_series(series)
+            
+            # One digest for the whole series instead of a notification per session
+            from notifications.utils import notify_series_created
+            notify_series_created(series, sessions)
+            
+            messages.success(request, f'Recurring sessions created: {len(sessions)} scheduled so far.')
+            return redirect('user_sessions:group_sessions', group_id=group.pk)
+    else:
+        form = SessionSeriesForm(group=group)
+    
+    return render(request, 'user_sessions/create_series.html', {
+        'form': form,
+        'group': group
+    })
+
+
+@login_required
+def rsvp_series(request, pk, status):
+    """RSVP to every upcoming session of a series at once"""
+    series = get_object_or_404(SessionSeries, pk=pk)
+    if status not in TALLY_FIELDS or not get_membership(request).is_member(series.group_id):
+        messages.error(request, 'Only group members can RSVP.')
+        return redirect('user_sessions:group_sessions', group_id=series.group_id)
+    
+    set_series_rsvp(series, request.user, status)
+    if status == 'attending':
+        from gamification.jobs import queue_attendance
+        queue_attendance(request.user)
+    
+    messages.success(request, f'RSVP for all "{series.title}" sessions updated to: {dict(SessionRSVP.STATUS_CHOICES)[status]}')
+    return redirect('user_sessions:group_sessions', group_id=series.group_id)
+
+
 @login_required
 def group_sessions(request, group_id):
     """View all sessions for a group"""
     group = get_object_or_404(StudyGroup, pk=group_id)
-    is_member = request.user in group.members.all()
+    is_member = get_membership(request).is_member(group)
+    extend_shown_series(f'group-{group.pk}', group_id=group.pk)
     
     # Get upcoming and past sessions
     now = datetime.now()
     upcoming = group.sessions.filter(date__gte=now.date(), is_cancelled=False).order_by('date', 'time')
     past = group.sessions.filter(date__lt=now.date()).order_by('-date', '-time')
+    series_list = list(group.session_series.filter(Q(end_date__isnull=True) | Q(end_date__gte=now.date())))
+    series_rsvps = dict(
+        SeriesRSVP.objects.filter(series__in=series_list, user=request.user).values_list('series_id', 'status')
+    ) if series_list else {}
+    for series in series_list:
+        series.user_status = series_rsvps.get(series.pk)
     
     context = {
         'group': group,
         'is_member': is_member,
         'upcoming_sessions': upcoming,
         'past_sessions': past,
+        'series_list': series_list,
+        'calendar_url': request.build_absolute_uri(
+            reverse('user_sessions:calendar_feed', args=[feed_token(request.user, group.pk)])
+        ) if is_member else None,
     }
     return render(request, 'user_sessions/group_sessions.html', context)
 
@@ -127,6 +218,9 @@ def cancel_session(request, pk):
     
     session.is_cancelled = True
     session.save()
+    if session.series_id:
+        # Keep the date on the series' exception list too
+        SeriesException.objects.get_or_create(series_id=session.series_id, date=session.date)
     
     # Notify all group members
     from notifications.utils import notify_session_cancelled
@@ -149,4 +243,44 @@ def delete_session(request, pk):
     
     session.delete()
     messages.success(request, 'Session deleted successfully.')
-    return redirect('user_sessions:group_sessions', group_id=group_id)
\ No newline at end of file
+    return redirect('user_sessions:group_sessions', group_id=group_id)
+
+
+def calendar_feed(request, token):
+    """Subscribable .ics feed; the signed token stands in for a login"""
+    feed = resolve_feed_token(token)
+    if feed is None:
+        raise Http404('Unknown calendar feed')
+    kind, pk = feed
+    if kind == USER_FEED:
+        extend_shown_series(f'user-{pk}', group__groupmember__user_id=pk)
+    else:
+        extend_shown_series(f'group-{pk}', group_id=pk)
+    sessions = feed_sessions(kind, pk)
+    
+    # Polling clients whose copy is current get a 304 after the token check and this aggregate
+    etag, last_modified = feed_validators(kind, pk, sessions)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        def session_url(session_pk):
+            return request.build_absolute_uri(reverse('user_sessions:session_detail', args=[session_pk]))
+        
+        response = StreamingHttpResponse(
+            stream_feed(sessions, 'My Study Sessions' if kind == USER_FEED else None, session_url),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'inline; filename="sessions.ics"'
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'CALENDAR_FEED_MAX_AGE', 300))
+    return response
+
+
+@login_required
+@require_POST
+def reset_calendar_feeds(request):
+    """Issue a new calendar key, revoking every feed link the user has shared"""
+    rotate_calendar_key(request.user)
+    messages.success(request, 'Your calendar feed links were reset. Subscribe again with the new links.')
+    return redirect('dashboard:dashboard')